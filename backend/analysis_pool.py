@@ -0,0 +1,133 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 工作进程中复用的文件处理器
+_worker_processor = None
+
+
+def _init_worker(settings):
+    """工作进程初始化，按主进程的设置创建文件处理器"""
+    global _worker_processor
+    from .file_processor import FileProcessor
+    _worker_processor = FileProcessor()
+    for name, value in settings.items():
+        setattr(_worker_processor, name, value)
+    _worker_processor.text_detector.text_extensions = _worker_processor.text_extensions
+
+
+def _analyze_batch(items):
+    """
+    在工作进程中分析一批文件
+    items: [(完整路径, 相对路径, 文件大小, 修改时间), ...]
+    返回与输入顺序一致的 [(分析结果字段..., 内容, 是否可缓存), ...]
+    """
+    from .file_processor import FileInfo
+    results = []
+    for full_path, rel_path, size, mtime_ns in items:
+        file_info = FileInfo(rel_path, full_path)
+        file_info.size = size
+        file_info.mtime_ns = mtime_ns
+        cacheable = _worker_processor._analyze_file(file_info)
+        results.append(tuple(getattr(file_info, field) for field in AnalysisPool.RESULT_FIELDS) +
+                       (file_info.content, cacheable))
+    return results
+
+
+class AnalysisPool:
+    """
+    多进程文件分析阶段
+    遍历得到的文件按批次交给进程池分析，工作进程只返回紧凑的结果元组；
+    无需分析的条目（目录、命中缓存的文件）也按原顺序排队，
+    结果总是按提交顺序交回，保持文件列表的遍历顺序
+    """
+
+    # 工作进程返回的FileInfo字段
+    RESULT_FIELDS = ('file_type', 'is_text', 'line_count', 'char_count',
+                     'is_cdn', 'is_minified', 'is_database', 'longest_line', 'line_index')
+
+    def __init__(self, settings, max_workers=None, batch_size=32):
+        """
+        settings: 工作进程中文件处理器的属性设置
+        max_workers: 进程数，为None时使用CPU核数
+        batch_size: 每批交给工作进程的文件数
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = self.max_workers * 2  # 同时在途的批次上限，限制内存占用
+        self._settings = settings
+        self._executor = None  # 第一批文件提交时才启动进程池
+        self._batch = []
+        self._pending = deque()  # [(Future或None, [(FileInfo, 是否需要分析), ...])]
+        self._in_flight = 0
+
+    def add(self, file_info, analyze=True):
+        """
+        加入一个条目，analyze为False时不需要分析（按顺序直接交回）
+        返回已按顺序完成的条目列表 [(FileInfo, 分析结果或None), ...]
+        """
+        self._batch.append((file_info, analyze))
+        if len(self._batch) >= self.batch_size:
+            self._submit_batch()
+        return self._collect()
+
+    def finish(self):
+        """提交剩余条目并等待全部完成，返回按顺序完成的条目列表"""
+        self._submit_batch()
+        return self._collect(drain=True)
+
+    def close(self, cancel=False):
+        """关闭进程池，cancel为True时取消尚未开始的批次"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=not cancel, cancel_futures=cancel)
+            self._executor = None
+        self._pending.clear()
+        self._batch = []
+
+    def _submit_batch(self):
+        if not self._batch:
+            return
+        batch = self._batch
+        self._batch = []
+        items = [(file_info.full_path, file_info.path, file_info.size, file_info.mtime_ns)
+                 for file_info, analyze in batch if analyze]
+        future = None
+        if items:
+            if self._executor is None:
+                # 扫描在多线程的进程中进行，fork 可能复制其他线程持有的锁，统一使用 spawn
+                self._executor = ProcessPoolExecutor(self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker, initargs=(self._settings,))
+            future = self._executor.submit(_analyze_batch, items)
+            self._in_flight += 1
+        self._pending.append((future, batch))
+
+    def _collect(self, drain=False):
+        """
+        按提交顺序取出已完成的批次
+        队首批次未完成时，只有在途批次超过上限或drain为True时才等待
+        """
+        done = []
+        while self._pending:
+            future, batch = self._pending[0]
+            if future is not None and not future.done():
+                if not drain and self._in_flight <= self.max_pending:
+                    break
+            self._pending.popleft()
+
+            results = None
+            if future is not None:
+                results = iter(future.result())
+                self._in_flight -= 1
+            for file_info, analyze in batch:
+                done.append((file_info, next(results) if analyze else None))
+        return done
+
+    @classmethod
+    def apply_result(cls, file_info, result):
+        """将工作进程的分析结果写回FileInfo，返回结果是否可以缓存"""
+        for field, value in zip(cls.RESULT_FIELDS, result):
+            setattr(file_info, field, value)
+        file_info.content = result[-2]
+        return result[-1]
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncScanner:
+    """
+    基于asyncio的扫描接口
+    目录列举、stat和文件读取都交给有界的线程池执行，信号量限制同时进行的I/O数量，
+    多个慢速读取（网络存储）可以同时进行；取消扫描直接取消使用该异步生成器的任务。
+    FileInfo按完成顺序产出，需要原有顺序时可用 file_order_key 排序
+    """
+
+    def __init__(self, processor, max_concurrency=32, executor=None):
+        """
+        processor: 提供分析设置和忽略规则设置的 FileProcessor
+        max_concurrency: 同时进行的I/O操作数上限
+        executor: 执行阻塞I/O的线程池，为None时每次扫描创建并在结束时关闭
+        """
+        self.processor = processor
+        self.max_concurrency = max_concurrency
+        self.executor = executor
+
+    async def scan(self, folder_path):
+        """
+        异步生成器，逐个产出目录和文件的 FileInfo
+        目录在列举时产出，文件在分析完成后产出
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor or ThreadPoolExecutor(self.max_concurrency,
+                                                       thread_name_prefix='async-scan')
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_io(func, *args):
+            async with semaphore:
+                return await loop.run_in_executor(executor, func, *args)
+
+        # 待执行的工作按需创建为任务，任务数量有上限，避免大目录一次创建几十万个任务
+        work = deque()
+        tasks = set()
+        try:
+            walker = await run_io(self._create_walker, folder_path)
+            work.append((self._list_dir, (run_io, walker, folder_path, "")))
+            while work or tasks:
+                while work and len(tasks) < self.max_concurrency * 2:
+                    func, args = work.popleft()
+                    tasks.add(asyncio.ensure_future(func(*args)))
+
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    infos, follow_up = task.result()
+                    work.extend(follow_up)
+                    for info in infos:
+                        yield info
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            if self.executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _create_walker(self, folder_path):
+        """创建提供单目录列举的遍历器，'git' 方式下从git索引列举"""
+        from .file_processor import GitIndexWalker, ScandirWalker
+        processor = self.processor
+        ignore_rules = processor._create_ignore_rules(folder_path)
+        if processor.source == 'git':
+            walker = GitIndexWalker.from_folder(folder_path, ignore_rules=ignore_rules,
+                                                include_untracked=processor.include_untracked,
+                                                trust_index=processor.trust_git_index)
+            if walker is not None:
+                return walker
+        return ScandirWalker(ignore_rules=ignore_rules)
+
+    async def _list_dir(self, run_io, walker, full_path, rel_path):
+        """列举目录，返回子目录的 FileInfo 以及子目录列举和文件分析的后续工作"""
+        from .file_processor import FileInfo
+        listing = await run_io(walker.list_directory, full_path, rel_path)
+        if listing is None:
+            return [], []
+
+        dirs, files = listing
+        infos = []
+        follow_up = []
+        for dir_name, dir_path in dirs:
+            dir_rel_path = os.path.join(rel_path, dir_name).replace('\\', '/')
+            infos.append(FileInfo(dir_rel_path, dir_path, is_dir=True))
+            follow_up.append((self._list_dir, (run_io, walker, dir_path, dir_rel_path)))
+        for file_name, file_path, stat in files:
+            file_rel_path = os.path.join(rel_path, file_name).replace('\\', '/')
+            follow_up.append((self._analyze, (run_io, file_path, file_rel_path, stat)))
+        return infos, follow_up
+
+    async def _analyze(self, run_io, file_path, file_rel_path, stat):
+        """分析单个文件"""
+        try:
+            file_info = await run_io(self._build_file_info, file_path, file_rel_path, stat)
+        except OSError:
+            return [], []  # 文件在扫描过程中被删除
+        return [file_info], []
+
+    def _build_file_info(self, file_path, file_rel_path, stat):
+        """在线程池中stat（列举时未获取时）并分析文件，不使用扫描缓存（其数据库连接属于扫描线程）"""
+        from .file_processor import FileInfo
+        if stat is None:
+            stat = os.stat(file_path)
+        file_info = FileInfo(file_rel_path, file_path)
+        file_info.size = stat.st_size
+        file_info.mtime_ns = stat.st_mtime_ns
+        self.processor._analyze_file(file_info)
+        return file_info
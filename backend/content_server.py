@@ -0,0 +1,356 @@
+import hmac
+import logging
+import os
+import re
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+# 前端页面从 file:// 加载（Origin 为 "null"），需要允许跨域访问，访问权限由令牌控制
+_CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Range, If-None-Match, If-Range, X-Content-Token',
+    'Access-Control-Expose-Headers': 'ETag, Content-Range, Content-Length, Accept-Ranges',
+}
+
+
+class FileResource:
+    """磁盘上的文件，按需分块读取，支持Range请求和ETag"""
+
+    def __init__(self, path, content_type='application/octet-stream'):
+        self.path = path
+        self.content_type = content_type
+
+
+class BytesResource:
+    """
+    内存中的响应内容（如高亮后的预览）
+    data 可以是返回字节的函数，ETag未变化（304）和HEAD请求时不会调用；
+    函数返回None表示请求已被放弃（如预览已被新的请求取消），此时返回503且不带ETag
+    """
+
+    def __init__(self, data, content_type='application/octet-stream', etag=None):
+        self.data = data
+        self.content_type = content_type
+        self.etag = etag
+
+
+class StreamResource:
+    """
+    逐块生成的响应（如导出），以分块传输编码发送，不支持Range
+    write_to: 函数，参数为可写对象，把内容逐块写入其中
+    """
+
+    def __init__(self, write_to, content_type='application/octet-stream', filename=None):
+        self.write_to = write_to
+        self.content_type = content_type
+        self.filename = filename
+
+
+class _ChunkedWriter:
+    """将写入的数据以HTTP分块传输编码发送"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class ContentServer:
+    """
+    仅监听本机的HTTP内容服务
+    使用随机端口和每次会话生成的令牌，按注册的路由提供文件内容、预览和导出等大块数据，
+    前端可以用 fetch 分段或流式获取，不必经过 webview 桥接整体编码传输。
+    URL 形如 http://127.0.0.1:<端口>/<路由名>/<参数>...?token=<令牌>
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, token=None, chunk_size=64 * 1024):
+        self.host = host
+        self.port = port
+        self.token = token or secrets.token_urlsafe(24)
+        self.chunk_size = chunk_size
+        self._routes = {}  # 路由名 -> 处理函数(参数列表, 查询参数) -> 资源对象或None
+        self._streams = {}  # 一次性流的ID -> StreamResource
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def route(self, name, handler):
+        """
+        注册路由
+        handler(parts, query): parts 为路由名之后的路径段，query 为查询参数字典，
+        返回 FileResource/BytesResource/StreamResource，资源不存在时返回None
+        """
+        self._routes[name] = handler
+
+    def add_stream(self, resource):
+        """注册只能GET一次的流式资源（如一次导出，HEAD请求不消耗），返回其URL"""
+        stream_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._streams[stream_id] = resource
+        return self.url('stream', stream_id)
+
+    def start(self):
+        """在后台线程中启动服务"""
+        server = self
+
+        class Handler(_RequestHandler):
+            content_server = server
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='content-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Content server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, name, *parts):
+        """资源URL（包含令牌）"""
+        path = '/'.join(quote(str(part), safe='') for part in (name,) + parts)
+        return f"{self.base_url}/{path}?token={self.token}"
+
+    def info(self):
+        """供前端使用的连接信息"""
+        return {'base_url': self.base_url, 'token': self.token}
+
+    def _check_token(self, token):
+        return token is not None and hmac.compare_digest(token, self.token)
+
+    def _resolve(self, parts, query, head=False):
+        """head: HEAD请求只查看一次性流，不消耗它，之后的GET仍可取得"""
+        name, args = parts[0], parts[1:]
+        if name == 'stream':
+            if len(args) != 1:
+                return None
+            with self._lock:
+                return self._streams.get(args[0]) if head else self._streams.pop(args[0], None)
+        handler = self._routes.get(name)
+        return handler(args, query) if handler else None
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """内容服务的请求处理"""
+
+    protocol_version = 'HTTP/1.1'
+    content_server = None
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._send_cors()
+        self.send_header('Access-Control-Allow-Methods', 'GET, HEAD, OPTIONS')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._handle(head=True)
+
+    def do_GET(self):
+        self._handle(head=False)
+
+    def log_message(self, format, *args):
+        logger.debug("content server: " + format, *args)
+
+    def _handle(self, head):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        server = self.content_server
+        if not server._check_token(query.get('token') or self.headers.get('X-Content-Token')):
+            return self._send_error(403, 'forbidden')
+
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        if not parts:
+            return self._send_error(404, 'not found')
+        try:
+            resource = server._resolve(parts, query, head)
+        except (LookupError, ValueError, FileNotFoundError):
+            resource = None
+        except Exception as e:
+            logger.error(f"Content server error for {url.path}: {e}")
+            return self._send_error(500, str(e))
+        if resource is None:
+            return self._send_error(404, 'not found')
+
+        try:
+            if isinstance(resource, FileResource):
+                self._send_file(resource, head)
+            elif isinstance(resource, BytesResource):
+                self._send_bytes(resource, head)
+            else:
+                self._send_stream(resource, head)
+        except FileNotFoundError:
+            self._send_error(404, 'not found')
+        except (BrokenPipeError, ConnectionResetError):
+            # 前端取消了请求
+            self.close_connection = True
+
+    def _send_cors(self):
+        for key, value in _CORS_HEADERS.items():
+            self.send_header(key, value)
+
+    def _send_error(self, code, message):
+        body = message.encode('utf-8')
+        self.send_response(code)
+        self._send_cors()
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _not_modified(self, etag):
+        """If-None-Match 与当前ETag一致时返回304"""
+        if etag is None:
+            return False
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match or etag not in [tag.strip() for tag in if_none_match.split(',')]:
+            return False
+        self.send_response(304)
+        self._send_cors()
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return True
+
+    def _requested_range(self, size, etag):
+        """
+        解析单个字节范围，返回 (开始, 结束)（含结束位置），没有有效的Range时返回None；
+        范围无法满足时返回 False
+        """
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            return None  # 资源已变化，返回完整内容
+        match = _RANGE_PATTERN.match(header.strip())
+        if not match:
+            return None  # 不支持多个范围，返回完整内容
+        start, end = match.groups()
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        elif end:
+            start = max(0, size - int(end))  # 最后N个字节
+            end = size - 1
+        else:
+            return None
+        if start >= size or start > end:
+            return False
+        return start, end
+
+    def _send_file(self, resource, head):
+        with open(resource.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+            if self._not_modified(etag):
+                return
+
+            byte_range = self._requested_range(size, etag)
+            if byte_range is False:
+                self.send_response(416)
+                self._send_cors()
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = max(0, end - start + 1)
+            self.send_response(206 if byte_range else 200)
+            self._send_cors()
+            self.send_header('Content-Type', resource.content_type)
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+            if head:
+                return
+
+            # 分块从磁盘复制，不整体读入内存
+            f.seek(start)
+            remaining = length
+            chunk_size = self.content_server.chunk_size
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def _send_bytes(self, resource, head):
+        if self._not_modified(resource.etag):
+            return
+        # HEAD请求不生成内容（生成预览会取消正在进行的预览），长度未知时不发送 Content-Length
+        lazy = callable(resource.data)
+        data = None if head and lazy else resource.data() if lazy else resource.data
+        if data is None and not head:
+            return self._send_error(503, 'cancelled')
+        self.send_response(200)
+        self._send_cors()
+        self.send_header('Content-Type', resource.content_type)
+        if data is not None:
+            self.send_header('Content-Length', str(len(data)))
+        if resource.etag:
+            self.send_header('ETag', resource.etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def _send_stream(self, resource, head):
+        self.send_response(200)
+        self._send_cors()
+        self.send_header('Content-Type', resource.content_type)
+        self.send_header('Cache-Control', 'no-store')
+        if resource.filename:
+            self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(resource.filename)}")
+        if head:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        writer = _ChunkedWriter(self.wfile)
+        try:
+            resource.write_to(writer)
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            # 不发送结束块，前端会得到不完整响应的错误
+            logger.error(f"Content stream failed: {e}")
+            self.close_connection = True
+            return
+        writer.close()
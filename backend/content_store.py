@@ -0,0 +1,64 @@
+import sys
+import threading
+from collections import OrderedDict
+from .file_analyzer import read_text_file
+
+
+class ContentStore:
+    """
+    文件内容的LRU缓存
+    仅扫描元数据时文件内容不随FileInfo常驻内存，需要时从磁盘读取并放入缓存，
+    缓存总大小超过内存预算时淘汰最久未使用的内容，之后再次访问会重新读取
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes  # 内存预算（字节）
+        self.current_bytes = 0
+        self._items = OrderedDict()  # 完整路径 -> (内容, 占用字节数)
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """获取文件内容，未缓存时从磁盘读取"""
+        with self._lock:
+            item = self._items.get(file_path)
+            if item is not None:
+                self._items.move_to_end(file_path)
+                return item[0]
+
+        content = self.read_file(file_path)
+        self.put(file_path, content)
+        return content
+
+    def put(self, file_path, content):
+        """放入缓存，必要时淘汰旧内容"""
+        cost = sys.getsizeof(content)
+        with self._lock:
+            old = self._items.pop(file_path, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            # 超过整个预算的内容不缓存
+            if cost > self.max_bytes:
+                return
+
+            self._items[file_path] = (content, cost)
+            self.current_bytes += cost
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_cost) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_cost
+
+    def invalidate(self, file_path=None):
+        """移除指定文件的缓存，不指定时清空全部"""
+        with self._lock:
+            if file_path is None:
+                self._items.clear()
+                self.current_bytes = 0
+                return
+            item = self._items.pop(file_path, None)
+            if item is not None:
+                self.current_bytes -= item[1]
+
+    @staticmethod
+    def read_file(file_path):
+        """以与扫描相同的方式读取文本内容"""
+        return read_text_file(file_path)
@@ -0,0 +1,316 @@
+import os
+import codecs
+import mimetypes
+import threading
+
+# 短于该字节数的行不逐行测量，最长行统计只保证对更长的行精确
+LONG_LINE_THRESHOLD = 1024
+
+# 文本/二进制检测只检查文件开头的这些字节
+SNIFF_BYTES = 8000
+
+# 控制字符占比超过该值时视为二进制（\t \n \r \f \b 和 ESC 属于正常文本）
+CONTROL_RATIO_LIMIT = 0.1
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in (8, 9, 10, 12, 13, 27)) + b'\x7f'
+
+# 不需要读取内容即可判定为二进制的MIME类型
+_BINARY_MIME_MAJORS = ('image', 'audio', 'video', 'font')
+_BINARY_MIME_TYPES = {
+    'application/zip', 'application/gzip', 'application/x-tar', 'application/x-bzip2',
+    'application/x-xz', 'application/x-7z-compressed', 'application/x-rar-compressed',
+    'application/pdf', 'application/octet-stream', 'application/java-archive',
+    'application/x-sharedlib', 'application/x-executable', 'application/wasm',
+    'application/vnd.ms-excel', 'application/msword', 'application/x-python-code',
+}
+# 属于上述大类但实际是文本的类型
+_TEXT_MIME_TYPES = {'image/svg+xml'}
+
+
+def sniff_encoding(head):
+    """
+    根据文件开头的内容判断是否为文本
+    返回编码 'utf-8' 或 'utf-16'，判定为二进制时返回None
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8'
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        # 检查BOM之后的内容是否为有效的UTF-16（末尾可能截断在字符中间）
+        decoder = codecs.getincrementaldecoder('utf-16')('strict')
+        try:
+            decoder.decode(head, False)
+            return 'utf-16'
+        except UnicodeDecodeError:
+            pass
+    if b'\0' in head:
+        return None
+    control = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    if control > len(head) * CONTROL_RATIO_LIMIT:
+        return None
+    return 'utf-8'
+
+
+def decode_text(data, encoding='utf-8'):
+    """
+    将字节解码为文本，UTF-8内容的结果与以文本模式 (utf-8, errors='ignore') 读取一致：
+    无效字节被忽略，\\r\\n 和单独的 \\r 转换为 \\n
+    """
+    text = str(data, encoding, 'ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def read_text_file(file_path):
+    """读取文本文件的完整内容，按检测到的编码解码"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return decode_text(data, sniff_encoding(data[:SNIFF_BYTES]) or 'utf-8')
+
+
+class TextStats:
+    """
+    单遍分析得到的文件统计信息，换行和字符数与以文本模式读取后统计的结果一致
+    （唯一的例外是 \\r 与 \\n 之间夹有无效UTF-8字节的情况，文本模式下会合并为一个换行）
+    """
+
+    __slots__ = ('newlines', 'chars', 'semicolons', 'longest_line', 'binary', 'encoding')
+
+    def __init__(self):
+        self.newlines = 0  # 换行数（\r\n、\r、\n 各计一次）
+        self.chars = 0  # 解码后的字符数
+        self.semicolons = 0  # 分号数
+        self.longest_line = 0  # 最长行的长度（UTF-8为字节数，UTF-16为字符数）
+        self.binary = False  # 内容检测是否为二进制
+        self.encoding = 'utf-8'  # 检测到的编码
+
+
+class _StatsAccumulator:
+    """逐块累积统计信息，块之间的跨界状态（未完成的行、\\r\\n、多字节字符）在此保存"""
+
+    def __init__(self, count_chars=True):
+        self.stats = TextStats()
+        self.count_chars = count_chars
+        self._decoder = None  # 遇到非ASCII内容或UTF-16文件时才创建
+        self._current_line = 0  # 跨块未结束的行的长度
+        self._crlf = 0
+        self._carriage_returns = 0
+        self._line_feeds = 0
+        self._ends_with_cr = False
+        self._first = True
+        self._tokens = (b'\n', b'\r', b'\r\n', b';')
+
+    def feed(self, buf, n):
+        """处理缓冲区的前n个字节，检测为二进制后不再统计"""
+        stats = self.stats
+        if self._first:
+            self._first = False
+            encoding = sniff_encoding(bytes(buf[:min(n, SNIFF_BYTES)]))
+            if encoding is None:
+                stats.binary = True
+                return
+            stats.encoding = encoding
+            if encoding == 'utf-16':
+                self._decoder = codecs.getincrementaldecoder('utf-16')('ignore')
+                self._tokens = ('\n', '\r', '\r\n', ';')
+        elif stats.binary:
+            return
+
+        if stats.encoding == 'utf-16':
+            # UTF-16在解码后的文本上统计，每块只分配块大小的字符串
+            text = self._decoder.decode(memoryview(buf)[:n])
+            stats.chars += len(text)
+            self._feed_units(text, len(text))
+        else:
+            if self.count_chars:
+                self._count_chars(buf, n)
+            self._feed_units(buf, n)
+
+    def _feed_units(self, buf, n):
+        """统计换行、分号和最长行（buf为字节或文本，分隔符与之对应）"""
+        lf, cr, crlf, semicolon = self._tokens
+        line_feeds = buf.count(lf, 0, n)
+        self._line_feeds += line_feeds
+        self.stats.semicolons += buf.count(semicolon, 0, n)
+        # 大多数文件不含 \r，先用find快速排除
+        if self._ends_with_cr or buf.find(cr, 0, n) >= 0:
+            self._carriage_returns += buf.count(cr, 0, n)
+            self._crlf += buf.count(crlf, 0, n)
+            if self._ends_with_cr and buf[0:1] == lf:
+                self._crlf += 1
+            self._ends_with_cr = buf[n - 1:n] == cr
+        self._measure_lines(buf, n, line_feeds, lf)
+
+    def _count_chars(self, buf, n):
+        # 纯ASCII的块字节数即字符数，其余的块交给增量解码器（保持跨块的多字节字符状态）
+        if self._decoder is None or not self._decoder.getstate()[0]:
+            chunk = buf if n == len(buf) else buf[:n]
+            if chunk.isascii():
+                self.stats.chars += n
+                return
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder('utf-8')('ignore')
+        self.stats.chars += len(self._decoder.decode(memoryview(buf)[:n]))
+
+    def _measure_lines(self, buf, n, line_feeds, lf):
+        stats = self.stats
+        if not line_feeds:
+            self._current_line += n
+            return
+
+        first = buf.find(lf, 0, n)
+        last = buf.rfind(lf, 0, n) if line_feeds > 1 else first
+        stats.longest_line = max(stats.longest_line, self._current_line + first)
+
+        # 块内的完整行：窗口内存在换行说明窗口内的行都不超过当前上限，可以整段跳过
+        pos = first + 1
+        limit = max(stats.longest_line, LONG_LINE_THRESHOLD)
+        rfind = buf.rfind
+        while pos + limit < last:
+            k = rfind(lf, pos, pos + limit + 1)
+            if k >= 0:
+                pos = k + 1
+                continue
+            end = buf.find(lf, pos, last + 1)
+            stats.longest_line = limit = end - pos
+            pos = end + 1
+
+        self._current_line = n - last - 1
+
+    def finish(self):
+        """结束分析，返回统计结果"""
+        stats = self.stats
+        if stats.binary:
+            return stats
+        if self._decoder is not None:
+            tail = self._decoder.decode(b'', True)
+            stats.chars += len(tail)
+            if stats.encoding == 'utf-16' and tail:
+                self._feed_units(tail, len(tail))
+        stats.longest_line = max(stats.longest_line, self._current_line)
+        # 文本模式下 \r\n 计为一个换行和一个字符
+        stats.newlines = self._line_feeds + self._carriage_returns - self._crlf
+        stats.chars -= self._crlf
+        return stats
+
+
+class ByteAnalyzer:
+    """
+    字节级单遍文件分析器
+    以二进制方式分块读入可复用的缓冲区，一次遍历得到换行数、UTF-8字符数、
+    分号数、最长行和二进制检测结果，统计时不解码整个文件
+    """
+
+    def __init__(self, chunk_size=1024 * 1024):
+        self.chunk_size = chunk_size
+        self._local = threading.local()  # 每个线程复用自己的缓冲区
+
+    def _buffer(self):
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            buf = self._local.buffer = bytearray(self.chunk_size)
+        return buf
+
+    def analyze_file(self, file_path, line_index=None):
+        """
+        分块读取文件并统计，不保留文件内容；检测为二进制时立即停止读取
+        line_index: LineIndexBuilder，在同一遍读取中记录行首位置
+        """
+        buf = self._buffer()
+        accumulator = _StatsAccumulator()
+        with open(file_path, 'rb', buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                accumulator.feed(buf, n)
+                if accumulator.stats.binary:
+                    break
+                if line_index is not None:
+                    line_index.feed(buf, n)
+        return accumulator.finish()
+
+    @staticmethod
+    def analyze_bytes(data, count_chars=True):
+        """
+        统计已读入内存的内容
+        count_chars: 为False时不统计字符数（调用方会解码内容，可直接用解码结果的长度）
+        """
+        accumulator = _StatsAccumulator(count_chars)
+        if data:
+            accumulator.feed(data, len(data))
+        return accumulator.finish()
+
+    def read_text(self, file_path, line_index=None):
+        """
+        读取并解码文件内容，同时返回统计信息；检测为二进制时内容为空字符串
+        line_index: LineIndexBuilder，从已读入的内容记录行首位置
+        """
+        with open(file_path, 'rb') as f:
+            # 先检测文件开头，二进制文件不整体读入
+            if sniff_encoding(f.read(SNIFF_BYTES)) is None:
+                stats = TextStats()
+                stats.binary = True
+                return '', stats
+            f.seek(0)
+            data = f.read()
+        stats = self.analyze_bytes(data, count_chars=False)
+        if stats.binary:
+            return '', stats
+        if line_index is not None:
+            line_index.feed(data, len(data))
+        content = decode_text(data, stats.encoding)
+        # 解码后的内容已完成换行转换，其长度即文本模式下的字符数
+        stats.chars = len(content)
+        return content, stats
+
+
+class TextDetector:
+    """
+    判断文件是否为文本文件
+    已知的文本扩展名和MIME类型直接判定，明确的二进制类型（图片、压缩包等）不读取内容，
+    这类判定只取决于扩展名，按扩展名缓存；
+    其余类型（含没有扩展名的文件）每个都读取文件开头检测，检测结果不缓存——
+    同一未知扩展名下可能既有文本也有二进制文件，一个二进制文件不能让其余文件都被当作二进制
+    """
+
+    def __init__(self, text_extensions):
+        self.text_extensions = text_extensions
+        self._verdicts = {}  # 扩展名 -> 按扩展名和MIME类型得出的判定，None表示需要检测内容
+        self._lock = threading.Lock()
+
+    def is_text(self, file_path):
+        """判断文件是否为文本（已知文本类型的文件在读取时还会再检测内容）"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext and ext in self._verdicts:
+            verdict = self._verdicts[ext]
+        else:
+            verdict = self._known_verdict(file_path, ext)
+            if ext:
+                with self._lock:
+                    self._verdicts.setdefault(ext, verdict)
+        if verdict is None:
+            verdict = self.sniff_file(file_path) is not None
+        return verdict
+
+    def _known_verdict(self, file_path, ext):
+        """根据扩展名和MIME类型判断，无法确定时返回None"""
+        if ext in self.text_extensions:
+            return True
+        mime_type, _ = mimetypes.guess_type(file_path)
+        if not mime_type:
+            return None
+        if mime_type.startswith('text') or mime_type in _TEXT_MIME_TYPES:
+            return True
+        if mime_type.split('/', 1)[0] in _BINARY_MIME_MAJORS or mime_type in _BINARY_MIME_TYPES:
+            return False
+        return None
+
+    @staticmethod
+    def sniff_file(file_path):
+        """读取文件开头检测编码，二进制或无法读取时返回None"""
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(SNIFF_BYTES)
+        except OSError:
+            return None
+        return sniff_encoding(head)
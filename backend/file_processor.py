@@ -1,12 +1,29 @@
 import os
+import gzip
+import lzma
 import mimetypes
 import re
 import time
 import threading
+import queue
+import stat as stat_module
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 from pathlib import Path
-import pygments
-from pygments import lexers
-from pygments.formatters import HtmlFormatter
+from .analysis_pool import AnalysisPool
+from .async_scanner import AsyncScanner
+from .content_store import ContentStore
+from .file_analyzer import ByteAnalyzer, TextDetector, sniff_encoding, SNIFF_BYTES
+from .highlighter import Highlighter
+from .ignore_rules import IgnoreRules
+from .line_index import LineIndex, LineIndexBuilder
+from .progress import ProgressThrottle
+from .git_index import find_git_dir, read_index, read_info_exclude, IndexStat, MODE_GITLINK, MODE_DIRECTORY
+from .scan_cache import ScanCache
+from .watcher import compute_delta, delta_is_empty, file_order_key
+
+
+# 文件分析规则的版本号，修改 _analyze_file 的判定逻辑时递增
+ANALYZER_VERSION = 3
 
 
 class FileInfo:
@@ -26,34 +43,547 @@ class FileInfo:
         self.is_database = False  # 是否是数据库文件
         self.content = ''  # 文件内容
         self.is_text = False  # 是否是文本文件
+        self.mtime_ns = 0  # 修改时间（纳秒），用于增量刷新
+        self.longest_line = 0  # 最长行的字节数
+        self.line_index = None  # 行偏移索引（扫描时按设置建立，见 LineIndex）
 
-    def to_dict(self):
-        """将对象转换为字典，方便JSON序列化"""
-        return {
-            'path': self.path,
-            'full_path': self.full_path,
-            'is_dir': self.is_dir,
-            'selected': self.selected,
-            'size': self.size,
-            'line_count': self.line_count,
-            'char_count': self.char_count,
-            'file_type': self.file_type,
-            'is_cdn': self.is_cdn,
-            'is_minified': self.is_minified,
-            'is_database': self.is_database,
-            'content': self.content if len(self.content) < 100000 else self.content[:100000] + '... (内容过长已截断)',
-            'is_text': self.is_text
-        }
+    # to_dict 包含的字段
+    DICT_FIELDS = ('path', 'full_path', 'is_dir', 'selected', 'size', 'line_count', 'char_count',
+                   'file_type', 'is_cdn', 'is_minified', 'is_database', 'content', 'is_text')
+
+    def to_dict(self, fields=None):
+        """
+        将对象转换为字典，方便JSON序列化
+        fields: 只包含这些字段（DICT_FIELDS 中的字段），为None时包含全部字段
+        """
+        data = {}
+        for field in self.DICT_FIELDS if fields is None else fields:
+            if field == 'content':
+                content = self.content
+                data[field] = content if len(content) < 100000 else content[:100000] + '... (内容过长已截断)'
+            elif field in self.DICT_FIELDS:
+                data[field] = getattr(self, field)
+        return data
+
+
+class ScandirWalker:
+    """
+    基于os.scandir的单遍目录遍历器
+    复用DirEntry缓存的类型信息，每个文件只需一次stat获取大小，
+    按"目录优先、名称排序"的顺序产出 (相对路径, 完整路径, 是否目录, stat结果)；
+    指定忽略规则时，被忽略的目录在进入之前就被整个跳过
+    """
+
+    def __init__(self, is_stopped=None, ignore_rules=None):
+        self.is_stopped = is_stopped or (lambda: False)
+        self.ignore_rules = ignore_rules  # IgnoreRules，为None时不过滤
+        self.estimated_total = 0  # 已发现的文件数，作为进度总数的动态估算
+        self.ignored_dirs = []  # 被忽略规则跳过的目录（相对路径）
+
+    def walk(self, full_path, rel_path=""):
+        """按原有顺序遍历目录，跳过隐藏文件和目录"""
+        listing = self._resolve_listing(self._schedule_listings([full_path])[0])
+        if listing is None or self.is_stopped():
+            return
+        yield from self._walk_listing(listing, rel_path)
+
+    def _walk_listing(self, listing, rel_path):
+        """产出已列出目录的条目，并递归进入子目录"""
+        dirs, files = listing
+        if self.ignore_rules is not None:
+            kept, files = self.ignore_rules.filter_listing(rel_path, dirs, files)
+            if len(kept) < len(dirs):
+                kept_names = {dir_name for dir_name, _ in kept}
+                self.ignored_dirs.extend(os.path.join(rel_path, dir_name).replace('\\', '/')
+                                         for dir_name, _ in dirs if dir_name not in kept_names)
+            dirs = kept
+        self.estimated_total += len(files)
+
+        # 提前安排子目录的列举（并行模式下会同时进行）
+        pending = self._schedule_listings([dir_path for _, dir_path in dirs])
+
+        # 先处理目录
+        for (dir_name, dir_path), task in zip(dirs, pending):
+            if self.is_stopped():
+                return
+            dir_rel_path = os.path.join(rel_path, dir_name).replace('\\', '/')
+            yield dir_rel_path, dir_path, True, None
+
+            child_listing = self._resolve_listing(task)
+            if child_listing is not None:
+                yield from self._walk_listing(child_listing, dir_rel_path)
+
+        # 再处理文件
+        for file_name, file_path, stat in files:
+            if self.is_stopped():
+                return
+            file_rel_path = os.path.join(rel_path, file_name).replace('\\', '/')
+            yield file_rel_path, file_path, False, stat
+
+    def _schedule_listings(self, dir_paths):
+        """安排目录列举任务，串行模式下延迟到真正需要时再列举"""
+        return dir_paths
+
+    def _resolve_listing(self, task):
+        """获取目录列举结果"""
+        return self._read_listing(task)
+
+    def _read_listing(self, full_path):
+        """列举单个目录，子类可替换列举的来源"""
+        return self._list_directory(full_path)
+
+    def list_directory(self, full_path, rel_path=""):
+        """立即列举单个目录并应用忽略规则，无法访问时返回None"""
+        listing = self._read_listing(full_path)
+        if listing is not None and self.ignore_rules is not None:
+            listing = self.ignore_rules.filter_listing(rel_path, *listing)
+        return listing
+
+    @staticmethod
+    def _list_directory(full_path):
+        """
+        列出单个目录，返回排序后的 (目录列表, 文件列表)
+        无权限访问时返回None
+        """
+        dirs = []
+        files = []
+        try:
+            with os.scandir(full_path) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):  # 跳过隐藏文件和目录
+                        continue
+                    try:
+                        if entry.is_dir():
+                            dirs.append((entry.name, entry.path))
+                        elif entry.is_file():
+                            files.append((entry.name, entry.path, entry.stat()))
+                    except OSError:
+                        # 条目在遍历过程中被删除或无法访问
+                        continue
+        except PermissionError:
+            return None
+
+        dirs.sort()
+        files.sort()
+        return dirs, files
+
+
+class _ListingTask:
+    """并行列举任务，记录提交时间用于超时判断"""
+
+    def __init__(self, dir_path):
+        self.dir_path = dir_path
+        self.future = Future()
+        self.submitted = time.monotonic()  # 提交列举任务的时间
+        self.started = None  # 工作线程开始列举的时间，None表示仍在排队
+
+
+class ParallelScandirWalker(ScandirWalker):
+    """
+    并行目录遍历器，适用于NFS/SMB等高延迟文件系统
+    使用有限数量的工作线程同时列举兄弟目录，结果仍按原有顺序产出；
+    单个目录列举超时后跳过该目录，避免挂起的挂载点拖住整个扫描
+    """
+
+    def __init__(self, is_stopped=None, max_workers=8, dir_timeout=30.0, ignore_rules=None):
+        super().__init__(is_stopped, ignore_rules)
+        self.max_workers = max(1, max_workers)
+        self.dir_timeout = dir_timeout  # 单个目录从提交到列举完成的超时（秒），None表示不限制
+        self.timed_out_dirs = []  # 列举超时被跳过的目录（完整路径）
+        self._queue = queue.Queue()
+        self._workers = 0
+        self._closed = False
+
+    def walk(self, full_path, rel_path=""):
+        for _ in range(self.max_workers):
+            self._spawn_worker()
+        try:
+            yield from super().walk(full_path, rel_path)
+        finally:
+            self.close()
+
+    def close(self):
+        """停止工作线程并取消未开始的列举任务"""
+        self._closed = True
+        while True:
+            try:
+                task = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task.future.cancel()
+        for _ in range(self._workers):
+            self._queue.put(None)
+
+    def _spawn_worker(self):
+        """启动一个守护工作线程（守护线程不会因挂起的挂载点阻塞程序退出）"""
+        thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._workers += 1
+        thread.start()
+
+    def _worker_loop(self):
+        """工作线程循环，依次执行列举任务"""
+        while not self._closed:
+            task = self._queue.get()
+            if task is None or self._closed:
+                return
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            task.started = time.monotonic()
+            try:
+                task.future.set_result(self._read_listing(task.dir_path))
+            except Exception as e:
+                task.future.set_exception(e)
+
+    def _schedule_listings(self, dir_paths):
+        tasks = []
+        for dir_path in dir_paths:
+            task = _ListingTask(dir_path)
+            self._queue.put(task)
+            tasks.append(task)
+        return tasks
+
+    def _resolve_listing(self, task):
+        while True:
+            if self.is_stopped():
+                task.future.cancel()
+                return None
+
+            # 从提交时开始计时，工作线程全部挂起时排队的任务也会按时超时
+            wait_time = 0.1
+            if self.dir_timeout is not None:
+                remaining = self.dir_timeout - (time.monotonic() - task.submitted)
+                if remaining <= 0:
+                    if not task.future.done():
+                        self.timed_out_dirs.append(task.dir_path)
+                        if not task.future.cancel():
+                            # 正在列举的线程挂起无法回收，补充一个工作线程维持并发数
+                            self._workers -= 1
+                            self._spawn_worker()
+                        return None
+                wait_time = min(wait_time, max(remaining, 0))
+
+            try:
+                return task.future.result(timeout=wait_time)
+            except FuturesTimeoutError:
+                continue
+
+
+class GitIndexWalker(ScandirWalker):
+    """
+    从git索引枚举已跟踪的文件，不遍历工作区目录
+    只访问索引中出现的目录，被忽略的构建目录等完全不会被列举；
+    子模块和稀疏索引中的目录仍从磁盘列举。
+    可选同时列出未跟踪且未被 .gitignore 忽略的文件（需要列举已跟踪的目录）
+    """
+
+    def __init__(self, root, entries, is_stopped=None, ignore_rules=None,
+                 untracked_rules=None, trust_index=False):
+        """
+        root: 工作区根目录
+        entries: read_index() 返回的索引条目
+        untracked_rules: 判断未跟踪文件是否被忽略的规则，为None时不列出未跟踪文件
+        trust_index: 直接使用索引中缓存的大小和修改时间，不再stat工作区文件
+        """
+        super().__init__(is_stopped, ignore_rules)
+        self.root = root
+        self.untracked_rules = untracked_rules
+        self.trust_index = trust_index
+        self._tree = {'': (set(), [])}  # 目录相对路径 -> (子目录名集合, [(文件名, 索引条目)])
+        self._disk_dirs = set()  # 需要从磁盘列举的目录（子模块、稀疏目录）
+        for entry in entries:
+            self._add_entry(entry)
+
+    @classmethod
+    def from_folder(cls, folder_path, is_stopped=None, ignore_rules=None,
+                    include_untracked=False, trust_index=False):
+        """为git工作区根目录创建遍历器，不是git工作区或索引无法解析时返回None"""
+        git_dir = find_git_dir(folder_path)
+        if git_dir is None:
+            return None
+        try:
+            entries = read_index(git_dir)
+        except (OSError, ValueError, IndexError):
+            return None
+
+        untracked_rules = None
+        if include_untracked:
+            untracked_rules = IgnoreRules(folder_path, profiles=(), patterns=read_info_exclude(git_dir))
+        return cls(folder_path, entries, is_stopped, ignore_rules, untracked_rules, trust_index)
+
+    def _add_entry(self, entry):
+        """将索引条目加入目录树（与遍历一致，跳过隐藏的文件和目录）"""
+        parts = entry.path.rstrip('/').split('/')
+        if any(part.startswith('.') for part in parts):
+            return
+
+        # 确保所有上级目录都存在
+        parent = ''
+        for part in parts[:-1]:
+            self._tree[parent][0].add(part)
+            parent = f"{parent}/{part}" if parent else part
+            if parent not in self._tree:
+                self._tree[parent] = (set(), [])
+
+        name = parts[-1]
+        if entry.mode == MODE_GITLINK or entry.mode == MODE_DIRECTORY or entry.path.endswith('/'):
+            self._tree[parent][0].add(name)
+            self._disk_dirs.add(f"{parent}/{name}" if parent else name)
+        else:
+            self._tree[parent][1].append((name, entry))
+
+    def _rel_path(self, full_path):
+        rel_path = os.path.relpath(full_path, self.root).replace('\\', '/')
+        return '' if rel_path == '.' else rel_path
+
+    def _read_listing(self, full_path):
+        rel_dir = self._rel_path(full_path)
+        node = self._tree.get(rel_dir)
+        if node is None:
+            # 子模块、稀疏目录或未跟踪的目录
+            listing = self._list_directory(full_path)
+            if listing is not None and self.untracked_rules is not None and not self._under_disk_dir(rel_dir):
+                listing = self.untracked_rules.filter_listing(rel_dir, *listing)
+            return listing
+
+        dir_names, file_entries = node
+        dirs = [(name, os.path.join(full_path, name)) for name in dir_names]
+        if not self.trust_index:
+            dirs = [d for d in dirs if os.path.isdir(d[1])]
+        files = []
+        for name, entry in file_entries:
+            file_path = os.path.join(full_path, name)
+            if self.trust_index:
+                stat = IndexStat(entry.size, entry.mtime_ns)
+            else:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue  # 已从工作区删除
+                if not stat_module.S_ISREG(stat.st_mode):
+                    continue
+            files.append((name, file_path, stat))
+
+        if self.untracked_rules is not None:
+            # 合并磁盘上未跟踪且未被忽略的条目
+            listing = self._list_directory(full_path)
+            if listing is not None:
+                disk_dirs, disk_files = self.untracked_rules.filter_listing(rel_dir, *listing)
+                tracked_files = {name for name, _ in file_entries}
+                dirs.extend(d for d in disk_dirs if d[0] not in dir_names)
+                files.extend(f for f in disk_files if f[0] not in tracked_files)
+
+        dirs.sort()
+        files.sort(key=lambda item: item[0])
+        return dirs, files
+
+    def _under_disk_dir(self, rel_dir):
+        """目录是否位于子模块或稀疏目录之下"""
+        while rel_dir:
+            if rel_dir in self._disk_dirs:
+                return True
+            rel_dir = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ''
+        return False
+
+
+class ProjectExporter:
+    """
+    流式导出"文件结构和文件内容"文本
+    依次写出结构头和每个文件的内容段，文件内容分块从磁盘读取并写入目标，
+    不在内存中拼接整个导出文本；格式与 restore_project_from_text 读取的格式一致
+    """
+
+    def __init__(self, chunk_size=256 * 1024, buffer_size=256 * 1024):
+        """
+        chunk_size: 每次从文件读取的字符数
+        buffer_size: 累积到该字符数后才写入目标，减少对目标的小块写入
+        """
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+
+    def export(self, sink, structure_text, files, callback=None, stop_event=None, progress=None):
+        """
+        导出到可写对象
+        sink: 有 write(str) 方法的对象（StringIO、文本文件、HTTP流等）
+        structure_text: 文件结构文本
+        files: 要导出内容的文件（有 path、full_path、line_count、is_text 属性），按此顺序写出
+        callback: 进度回调 callback(状态, 已完成文件数, 文件总数, 已写出字符数)，
+                  状态为 'progress'、'finished' 或 'stopped'
+        stop_event: 取消导出的 threading.Event
+        progress: 进度事件的合并设置（ProgressThrottle），为None时每100毫秒最多一次
+        返回 {'files': 已写出的文件数, 'chars': 已写出的字符数, 'stopped': 是否被取消}
+        """
+        files = list(files)
+        progress = progress or ProgressThrottle(interval=0.1)
+        out = _BufferedTextSink(sink, self.buffer_size)
+        out.write(f"文件结构:\n\n{structure_text}\n\n文件内容:\n\n")
+
+        done = 0
+        for file_info in files:
+            if stop_event is not None and stop_event.is_set():
+                out.flush()
+                if callback:
+                    callback('stopped', done, len(files), out.chars)
+                return {'files': done, 'chars': out.chars, 'stopped': True}
+
+            out.write(f"--- {file_info.path} ({file_info.line_count}行) ---\n")
+            if file_info.is_text:
+                self._write_content(out, file_info.full_path, stop_event)
+            out.write("\n\n")
+
+            done += 1
+            if callback and progress.ready(done):
+                callback('progress', done, len(files), out.chars)
+
+        out.flush()
+        if callback:
+            callback('finished', done, len(files), out.chars)
+        return {'files': done, 'chars': out.chars, 'stopped': False}
+
+    def export_to_file(self, file_path, structure_text, files, compression=None, callback=None, stop_event=None):
+        """
+        导出到文件，可选流式压缩，内存占用与导出大小无关
+        先写入同目录下的临时文件，完成后再替换目标文件；取消或出错时删除临时文件
+        compression: None、'gzip' 或 'xz'
+        返回 export 的结果，另附 'path'、'bytes'（写入磁盘的字节数）、'seconds'（耗时）
+        和 'throughput'（每秒导出的字符数）
+        """
+        temp_path = f"{file_path}.part"
+        start = time.monotonic()
+        try:
+            with open_project_text(temp_path, 'wt', compression) as f:
+                result = self.export(f, structure_text, files, callback, stop_event)
+            if result['stopped']:
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        seconds = time.monotonic() - start
+        result.update({
+            'path': file_path,
+            'bytes': 0 if result['stopped'] else os.path.getsize(file_path),
+            'seconds': seconds,
+            'throughput': result['chars'] / seconds if seconds > 0 else 0,
+        })
+        return result
+
+    def _write_content(self, out, file_path, stop_event=None):
+        """分块读取并写出文件内容，解码方式与扫描时一致（\\r\\n 和 \\r 转换为 \\n）"""
+        try:
+            with open(file_path, 'rb') as f:
+                encoding = sniff_encoding(f.read(SNIFF_BYTES)) or 'utf-8'
+            with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    if stop_event is not None and stop_event.is_set():
+                        return
+        except OSError as e:
+            out.write(f"无法读取文件内容: {str(e)}")
+
+
+# 导出文件支持的压缩格式 -> 默认扩展名
+EXPORT_COMPRESSIONS = {'gzip': '.gz', 'xz': '.xz'}
+
+# 压缩文件的魔数，读取时据此识别格式
+_COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+)
+
+
+def open_project_text(file_path, mode='rt', compression=None):
+    """
+    以文本方式打开导出文件（UTF-8）
+    mode: 'rt' 读取时按文件头自动识别 gzip/xz 压缩，'wt' 写入时按 compression 压缩
+    compression: 写入时使用的压缩格式（EXPORT_COMPRESSIONS 的键），None 表示不压缩
+    """
+    if 'r' in mode:
+        with open(file_path, 'rb') as f:
+            head = f.read(6)
+        compression = next((name for magic, name in _COMPRESSION_MAGIC if head.startswith(magic)), None)
+    elif compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise ValueError(f"不支持的压缩格式: {compression}")
+
+    newline = '' if 'w' in mode else None  # 写入时保持 \n，不转换为系统换行符
+    if compression == 'gzip':
+        return gzip.open(file_path, mode, compresslevel=6, encoding='utf-8', newline=newline)
+    if compression == 'xz':
+        return lzma.open(file_path, mode, encoding='utf-8', newline=newline)
+    return open(file_path, mode, encoding='utf-8', newline=newline)
+
+
+class _BufferedTextSink:
+    """累积小块文本后再写入目标，并统计写出的字符数"""
+
+    def __init__(self, sink, buffer_size):
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.chars = 0
+        self._parts = []
+        self._pending = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._pending += len(text)
+        self.chars += len(text)
+        if self._pending >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.sink.write(''.join(self._parts))
+            self._parts = []
+            self._pending = 0
 
 
 class FileProcessor:
     """处理文件结构的主要类"""
 
-    def __init__(self):
-        self.stop_flag = False
+    def __init__(self, content_budget=64 * 1024 * 1024, cache_dir=None):
+        """
+        content_budget: 按需加载的文件内容缓存的内存预算（字节）
+        cache_dir: 增量扫描缓存的存放目录，为None时使用默认目录
+        """
+        self.stop_event = threading.Event()  # 停止当前扫描的信号
         self.files_list = []
         self.current_count = 0
         self.total_files = 0
+        self.parallel = False  # 是否使用并行目录遍历
+        self.parallel_workers = 8  # 并行遍历的工作线程数
+        self.dir_timeout = 30.0  # 并行遍历时单个目录的列举超时（秒）
+        self.timed_out_dirs = []  # 上次扫描中列举超时被跳过的目录
+        self.ignored_dirs = []  # 上次扫描中被忽略规则跳过的目录（相对路径）
+        self.metadata_only = False  # 是否只扫描元数据，不保留文件内容
+        self.content_store = ContentStore(content_budget)  # 按需加载的文件内容缓存
+        self.exporter = ProjectExporter()  # 流式导出
+        self.highlighter = Highlighter()  # 代码高亮及其缓存，可由多个处理器共享
+        self.analyzer = ByteAnalyzer()  # 字节级单遍分析器
+        self.stream_threshold = 16 * 1024 * 1024  # 超过该大小的文件流式分析，不整体读入内存（字节）
+        self.build_line_index = False  # 扫描时是否在统计换行的同一遍读取中为文本文件建立行偏移索引
+        self.line_indexes = {}  # 完整路径 -> LineIndex，按行读取文件时使用
+        self.analysis_processes = 0  # 文件分析使用的进程数，0表示在扫描线程中分析
+        self.analysis_batch_size = 32  # 每批交给分析进程的文件数
+        self.progress = ProgressThrottle(interval=0.1)  # 进度事件的合并设置
+        self.result_dicts = True  # 完成回调是否附带所有文件的 to_dict 结果，为False时结果从 files_list 分页获取
+        self.use_cache = False  # 是否使用持久化的增量扫描缓存
+        self.cache_dir = cache_dir
+        self.scan_cache = None  # 当前扫描使用的缓存
+        self.use_ignore_rules = False  # 是否应用忽略规则（.gitignore/.ignore 和规则配置）
+        self.ignore_profiles = ['default']  # 使用的内置忽略规则配置
+        self.ignore_patterns = []  # 用户自定义的忽略规则（.gitignore语法）
+        self.ignore_rules = None  # 当前扫描使用的忽略规则
+        self.source = 'walk'  # 文件枚举方式：'walk' 遍历目录，'git' 读取git索引（非git目录时退回遍历）
+        self.include_untracked = False  # 'git' 方式下是否同时列出未跟踪且未被忽略的文件
+        self.trust_git_index = False  # 'git' 方式下直接使用索引中缓存的大小和修改时间
+        self.enumeration_source = None  # 上次扫描实际使用的枚举方式
+        self._refresh_lock = threading.Lock()
         mimetypes.init()
         self.text_extensions = {
             '.py', '.js', '.html', '.css', '.php', '.json', '.xml', '.txt', '.md',
@@ -61,16 +591,59 @@ class FileProcessor:
             '.tsx', '.yml', '.yaml', '.toml', '.ini', '.cfg', '.conf', '.sh',
             '.bat', '.ps1', '.sql', '.go', '.rb', '.rs', '.dart', '.swift', '.wxss', '.wxml'
         }
+        # 其他类型逐个检测文件开头的内容判断
+        self.text_detector = TextDetector(self.text_extensions)
 
-    def process_directory(self, folder_path, callback=None):
+    def process_directory(self, folder_path, callback=None, parallel=None, metadata_only=None, use_cache=None,
+                          ignore=None, source=None, include_untracked=None, processes=None, stop_event=None,
+                          progress_interval=None, progress_every=None, result_dicts=None, line_index=None):
         """
         处理目录
         folder_path: 要处理的文件夹路径
         callback: 回调函数，用于更新进度
+        parallel: 是否并行遍历目录（适用于网络文件系统），为None时使用当前设置
+        metadata_only: 是否只扫描元数据，文件内容按需加载，为None时使用当前设置
+        use_cache: 是否使用增量扫描缓存，命中缓存的文件不再读取内容，为None时使用当前设置
+        ignore: 是否应用忽略规则，跳过被忽略的目录和文件，为None时使用当前设置
+        source: 文件枚举方式，'walk' 或 'git'，为None时使用当前设置
+        include_untracked: 'git' 方式下是否包含未跟踪且未被忽略的文件，为None时使用当前设置
+        processes: 文件分析使用的进程数，True表示使用CPU核数，0或False表示不使用多进程，为None时使用当前设置
+        stop_event: 停止本次扫描的 threading.Event，为None时新建
+        progress_interval: 进度事件的最短间隔（秒），为None时使用当前设置
+        progress_every: 每处理多少个文件至少发送一次进度，为None时使用当前设置
+        result_dicts: 完成回调是否附带完整的文件列表，为None时使用当前设置
+        line_index: 是否为文本文件建立行偏移索引（超大文件为抽样索引），为None时使用当前设置
+        进度事件 callback('progress', 已处理数, 估算总数, None) 只携带计数
         """
-        self.stop_flag = False
+        self.stop_event = stop_event or threading.Event()
         self.files_list = []
         self.current_count = 0
+        self.line_indexes = {}
+        self.content_store.invalidate()
+        if parallel is not None:
+            self.parallel = parallel
+        if metadata_only is not None:
+            self.metadata_only = metadata_only
+        if use_cache is not None:
+            self.use_cache = use_cache
+        if ignore is not None:
+            self.use_ignore_rules = ignore
+        if source is not None:
+            self.source = source
+        if include_untracked is not None:
+            self.include_untracked = include_untracked
+        if result_dicts is not None:
+            self.result_dicts = result_dicts
+        if line_index is not None:
+            self.build_line_index = line_index
+        if progress_interval is not None:
+            self.progress.interval = progress_interval
+        if progress_every is not None:
+            self.progress.every = progress_every
+        self.progress.reset()
+        if processes is not None:
+            self.analysis_processes = (os.cpu_count() or 1) if processes is True else int(processes or 0)
+        self.ignore_rules = self._create_ignore_rules(folder_path)
 
         # 创建线程处理文件
         thread = threading.Thread(target=self._process_directory_thread,
@@ -79,23 +652,38 @@ class FileProcessor:
         thread.start()
         return thread
 
+    def scan_async(self, folder_path, max_concurrency=32):
+        """
+        异步扫描目录，返回逐个产出 FileInfo 的异步生成器
+        使用当前的分析和忽略规则设置，不修改 files_list 等扫描状态；
+        取消扫描时取消迭代该生成器的任务即可
+        """
+        return AsyncScanner(self, max_concurrency).scan(folder_path)
+
+    @property
+    def stop_flag(self):
+        """当前扫描是否已被要求停止"""
+        return self.stop_event.is_set()
+
+    @stop_flag.setter
+    def stop_flag(self, value):
+        if value:
+            self.stop_event.set()
+        else:
+            self.stop_event.clear()
+
     def stop_processing(self):
         """停止处理"""
-        self.stop_flag = True
+        self.stop_event.set()
 
     def _process_directory_thread(self, folder_path, callback):
         """线程函数，处理目录"""
         try:
-            # 先计算总文件数
-            self.total_files = 0
-            for root, _, files in os.walk(folder_path):
-                self.total_files += len(files)
-                if self.stop_flag:
-                    if callback:
-                        callback('stopped', 0, 0, None)
-                    return
+            if self.use_cache:
+                self.scan_cache = ScanCache(folder_path, self.cache_dir, self.analyzer_version).open()
 
-            # 获取结构和文件内容
+            # 单遍遍历目录，总文件数随遍历动态估算
+            self.total_files = 0
             self._process_directory(folder_path, "", callback)
 
             # 检查是否停止线程
@@ -104,163 +692,407 @@ class FileProcessor:
                     callback('stopped', 0, 0, None)
                 return
 
+            # 遍历结束后总数即为实际处理的文件数
+            self.total_files = self.current_count
+
+            # 完整扫描结束后清理已删除文件的缓存记录
+            if self.scan_cache:
+                self.scan_cache.prune(f.path for f in self.files_list if not f.is_dir)
+
             # 返回结果
             if callback:
-                result_list = [file_info.to_dict() for file_info in self.files_list]
+                result_list = None
+                if self.result_dicts:
+                    result_list = [file_info.to_dict() for file_info in self.files_list]
                 callback('finished', self.current_count, self.total_files, result_list)
 
         except Exception as e:
             if callback:
                 callback('error', 0, 0, str(e))
+        finally:
+            if self.scan_cache:
+                self.scan_cache.close()
+                self.scan_cache = None
+
+    def _create_walker(self, folder_path):
+        """创建目录遍历器，'git' 方式下优先从git索引枚举文件"""
+        is_stopped = self.stop_event.is_set
+        if self.source == 'git':
+            walker = GitIndexWalker.from_folder(folder_path, is_stopped, self.ignore_rules,
+                                                include_untracked=self.include_untracked,
+                                                trust_index=self.trust_git_index)
+            if walker is not None:
+                self.enumeration_source = 'git'
+                return walker
+
+        self.enumeration_source = 'walk'
+        if self.parallel:
+            return ParallelScandirWalker(is_stopped,
+                                         max_workers=self.parallel_workers,
+                                         dir_timeout=self.dir_timeout,
+                                         ignore_rules=self.ignore_rules)
+        return ScandirWalker(is_stopped, self.ignore_rules)
+
+    def _create_ignore_rules(self, folder_path):
+        """按当前设置创建忽略规则，未启用时返回None"""
+        if not self.use_ignore_rules:
+            return None
+        return IgnoreRules(folder_path, self.ignore_profiles, self.ignore_patterns)
+
+    def is_ignored(self, rel_path, is_dir):
+        """判断相对路径是否被当前的忽略规则排除"""
+        return self.ignore_rules is not None and self.ignore_rules.is_ignored(rel_path, is_dir)
 
     def _process_directory(self, full_path, rel_path, callback):
         """处理目录及其文件"""
+        walker = self._create_walker(full_path)
+        pool = self._create_analysis_pool()
         try:
-            items = os.listdir(full_path)
-        except PermissionError:
-            return
+            for entry_rel_path, entry_path, is_dir, stat in walker.walk(full_path, rel_path):
+                # 检查是否停止线程
+                if self.stop_flag:
+                    return
 
-        # 检查是否停止线程
-        if self.stop_flag:
-            return
+                # 已发现的文件数作为进度总数的估算值
+                self.total_files = walker.estimated_total
 
-        # 先处理目录
-        dirs = sorted([item for item in items if os.path.isdir(os.path.join(full_path, item))])
-        for dir_name in dirs:
-            if dir_name.startswith('.'):  # 跳过隐藏目录
-                continue
-
-            # 检查是否停止线程
-            if self.stop_flag:
-                return
-
-            dir_path = os.path.join(full_path, dir_name)
-            dir_rel_path = os.path.join(rel_path, dir_name).replace('\\', '/')
+                if is_dir:
+                    # 创建目录信息对象
+                    dir_info = FileInfo(entry_rel_path, entry_path, is_dir=True)
+                    if pool is None:
+                        self.files_list.append(dir_info)
+                    else:
+                        self._finish_analyzed(pool.add(dir_info, analyze=False), callback)
+                elif pool is None:
+                    # 处理文件
+                    self._process_file(entry_path, entry_rel_path, callback, stat)
+                else:
+                    # 未命中缓存的文件交给分析进程，结果按遍历顺序取回
+                    file_info, cached = self._lookup_file_info(entry_path, entry_rel_path, stat)
+                    self._finish_analyzed(pool.add(file_info, analyze=not cached), callback)
+
+            if pool is not None and not self.stop_flag:
+                self._finish_analyzed(pool.finish(), callback)
+        finally:
+            if pool is not None:
+                pool.close(cancel=self.stop_flag)
+
+        # 记录并行遍历时因超时被跳过的目录，以及被忽略规则跳过的目录
+        self.timed_out_dirs = getattr(walker, 'timed_out_dirs', [])
+        self.ignored_dirs = walker.ignored_dirs
+
+    def _create_analysis_pool(self):
+        """按当前设置创建多进程分析阶段，未启用时返回None"""
+        if self.analysis_processes <= 0:
+            return None
+        settings = {
+            'text_extensions': self.text_extensions,
+            'metadata_only': self.metadata_only,
+            'stream_threshold': self.stream_threshold,
+            'build_line_index': self.build_line_index,
+        }
+        return AnalysisPool(settings, self.analysis_processes, self.analysis_batch_size)
 
-            # 创建目录信息对象
-            dir_info = FileInfo(dir_rel_path, dir_path, is_dir=True)
-            self.files_list.append(dir_info)
+    def _finish_analyzed(self, entries, callback):
+        """
+        处理分析进程按顺序交回的条目
+        entries: [(FileInfo, 分析结果或None), ...]，结果为None表示目录或命中缓存的文件
+        """
+        for file_info, result in entries:
+            if file_info.is_dir:
+                self.files_list.append(file_info)
+                continue
+            if result is not None and AnalysisPool.apply_result(file_info, result) and self.scan_cache:
+                self.scan_cache.store(file_info, file_info.mtime_ns)
+            self._add_file(file_info, callback)
 
-            # 递归处理子目录
-            self._process_directory(dir_path, dir_rel_path, callback)
+    def _process_file(self, file_path, file_rel_path, callback, stat=None):
+        """
+        处理单个文件
+        stat: 遍历时已获取的stat结果，为None时重新读取
+        """
+        file_info = self._build_file_info(file_path, file_rel_path, stat)
+        self._add_file(file_info, callback)
 
-        # 再处理文件
-        files = sorted([item for item in items if os.path.isfile(os.path.join(full_path, item))])
-        for file_name in files:
-            if file_name.startswith('.'):  # 跳过隐藏文件
-                continue
+    def _add_file(self, file_info, callback):
+        """将文件信息添加到列表并更新进度"""
+        self.files_list.append(file_info)
+        if file_info.line_index is not None:
+            self.line_indexes[file_info.full_path] = file_info.line_index
 
-            # 检查是否停止线程
-            if self.stop_flag:
-                return
+        # 更新进度，按设置合并为较少的事件
+        self.current_count += 1
+        if callback and self.progress.ready(self.current_count):
+            callback('progress', self.current_count, self.total_files, None)
 
-            file_path = os.path.join(full_path, file_name)
-            file_rel_path = os.path.join(rel_path, file_name).replace('\\', '/')
+    def _build_file_info(self, file_path, file_rel_path, stat=None):
+        """创建并分析单个文件的信息对象"""
+        file_info, cached = self._lookup_file_info(file_path, file_rel_path, stat)
+        if not cached and self._analyze_file(file_info) and self.scan_cache:
+            self.scan_cache.store(file_info, file_info.mtime_ns)
+        return file_info
 
-            # 处理文件
-            self._process_file(file_path, file_rel_path, callback)
+    def _lookup_file_info(self, file_path, file_rel_path, stat=None):
+        """
+        创建文件信息对象并查找缓存的分析结果
+        返回 (FileInfo, 是否命中缓存)
+        """
+        if stat is None:
+            stat = os.stat(file_path)
 
-    def _process_file(self, file_path, file_rel_path, callback):
-        """处理单个文件"""
         # 创建文件信息对象
         file_info = FileInfo(file_rel_path, file_path)
-        file_info.size = os.path.getsize(file_path)
+        file_info.size = stat.st_size
+        file_info.mtime_ns = stat.st_mtime_ns
+
+        # 文件未变化时直接使用缓存的分析结果，内容在需要时再加载
+        cached = self.scan_cache.lookup(file_rel_path, stat.st_size, stat.st_mtime_ns) if self.scan_cache else None
+        if cached:
+            for field, value in cached.items():
+                setattr(file_info, field, value)
+        return file_info, bool(cached)
+
+    def refresh(self, folder_path, dirty_dirs=None):
+        """
+        增量刷新已扫描的文件列表，只重新分析发生变化的文件
+        folder_path: 项目根目录
+        dirty_dirs: 需要重新检查的目录相对路径集合（根目录为空字符串），
+                    为None时重新比对整个目录树
+        返回变化集合 {'added': [FileInfo...], 'removed': [路径...], 'modified': [FileInfo...]}
+        """
+        with self._refresh_lock:
+            # 忽略文件变化后重新加载规则，并完整比对
+            if self.ignore_rules is not None and self.ignore_rules.files_changed(dirty_dirs):
+                self.ignore_rules = self._create_ignore_rules(folder_path)
+                dirty_dirs = None
+
+            old_list = self.files_list
+            old_by_path = {f.path: f for f in old_list}
+
+            if dirty_dirs is None:
+                new_list = self._rescan_all(folder_path, old_by_path)
+                delta = compute_delta(old_list, new_list)
+            else:
+                delta = self._rescan_dirs(folder_path, dirty_dirs, old_by_path)
+                if not delta_is_empty(delta):
+                    new_list = self._apply_delta(old_list, delta)
+
+            if delta_is_empty(delta):
+                return delta
+
+            # 修改和删除的文件内容需要重新读取
+            for path in delta['removed']:
+                old = old_by_path.get(path)
+                if old is not None and not old.is_dir:
+                    self.content_store.invalidate(old.full_path)
+                    self.line_indexes.pop(old.full_path, None)
+            for file_info in delta['modified']:
+                self.content_store.invalidate(file_info.full_path)
+            for file_info in delta['modified'] + delta['added']:
+                if file_info.line_index is not None:
+                    self.line_indexes[file_info.full_path] = file_info.line_index
+
+            self.files_list = new_list
+            self.current_count = self.total_files = sum(1 for f in new_list if not f.is_dir)
+            return delta
+
+    def _reuse_or_build(self, entry_path, entry_rel_path, is_dir, stat, old_by_path):
+        """大小和修改时间未变化的条目复用原对象，否则重新分析"""
+        old = old_by_path.get(entry_rel_path)
+        if is_dir:
+            if old is not None and old.is_dir:
+                return old
+            return FileInfo(entry_rel_path, entry_path, is_dir=True)
+        if (old is not None and not old.is_dir and
+                old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns):
+            return old
+        return self._build_file_info(entry_path, entry_rel_path, stat)
+
+    def _rescan_all(self, folder_path, old_by_path):
+        """完整遍历目录树，返回新的文件列表"""
+        walker = self._create_walker(folder_path)
+        return [self._reuse_or_build(entry_path, entry_rel_path, is_dir, stat, old_by_path)
+                for entry_rel_path, entry_path, is_dir, stat in walker.walk(folder_path, "")]
+
+    def _rescan_dirs(self, folder_path, dirty_dirs, old_by_path):
+        """只重新列举发生变化的目录，返回变化集合"""
+        # 按父目录分组现有条目
+        children = {}
+        for path in old_by_path:
+            parent = path.rsplit('/', 1)[0] if '/' in path else ''
+            children.setdefault(parent, []).append(path)
+
+        added = []
+        removed = set()
+        modified = []
+        walker = self._create_walker(folder_path)
+
+        for rel_dir in sorted(dirty_dirs):
+            # 已随上级目录删除或新增的目录无需重复处理
+            if rel_dir in removed or (rel_dir and rel_dir not in old_by_path):
+                continue
+            full_dir = os.path.join(folder_path, rel_dir) if rel_dir else folder_path
+            listing = walker.list_directory(full_dir, rel_dir) if os.path.isdir(full_dir) else None
+            if listing is None:
+                listing = ([], [])
+            dirs, files = listing
+
+            current = {}
+            for name, path in dirs:
+                current[f"{rel_dir}/{name}" if rel_dir else name] = (path, True, None)
+            for name, path, stat in files:
+                current[f"{rel_dir}/{name}" if rel_dir else name] = (path, False, stat)
+
+            # 已删除的条目（目录连同其所有子项）
+            for path in children.get(rel_dir, []):
+                entry = current.get(path)
+                if entry is None or entry[1] != old_by_path[path].is_dir:
+                    removed.update(p for p in old_by_path if p == path or p.startswith(path + '/'))
+
+            # 新增和修改的条目
+            for path, (entry_path, is_dir, stat) in current.items():
+                old = old_by_path.get(path)
+                if old is not None and path not in removed:
+                    if not is_dir:
+                        file_info = self._reuse_or_build(entry_path, path, False, stat, old_by_path)
+                        if file_info is not old:
+                            modified.append(file_info)
+                    continue
+                added.append(self._reuse_or_build(entry_path, path, is_dir, stat, {}))
+                if is_dir:
+                    # 新目录需要完整遍历
+                    for sub_rel, sub_path, sub_is_dir, sub_stat in walker.walk(entry_path, path):
+                        added.append(self._reuse_or_build(sub_path, sub_rel, sub_is_dir, sub_stat, {}))
+
+        return {'added': added, 'removed': sorted(removed), 'modified': modified}
+
+    @staticmethod
+    def _apply_delta(old_list, delta):
+        """将变化集合应用到文件列表，保持原有的遍历顺序"""
+        removed = set(delta['removed'])
+        replaced = {f.path: f for f in delta['modified']}
+        new_list = [replaced.get(f.path, f) for f in old_list if f.path not in removed]
+        if delta['added']:
+            new_list.extend(delta['added'])
+            new_list.sort(key=file_order_key)
+        return new_list
+
+    def _analyze_file(self, file_info):
+        """
+        分析文件类型和内容统计信息
+        返回分析结果是否可以缓存（读取失败时不缓存）
+        """
+        file_path = file_info.full_path
+        file_rel_path = file_info.path
         file_info.file_type = os.path.splitext(file_path)[1][1:] if os.path.splitext(file_path)[1] else 'txt'
 
         # 检查是否为文本文件
-        mime_type, _ = mimetypes.guess_type(file_path)
-        is_text = (mime_type and mime_type.startswith('text')) or file_path.lower().endswith(
-            tuple(self.text_extensions))
+        is_text = self.text_detector.is_text(file_path)
         file_info.is_text = is_text
 
         if is_text:
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    file_info.content = content
-                    file_info.line_count = content.count('\n') + 1
-                    file_info.char_count = len(content)
-
-                    # 检查是否是CDN或压缩JS文件
-                    file_info.is_cdn = bool(re.search(r'(cdn|unpkg|jsdelivr|cloudflare)', file_rel_path.lower()))
-                    file_info.is_minified = file_path.lower().endswith('.min.js') or (
-                            len(content) > 1000 and '.' in file_path and
-                            content.count('\n') < content.count(';') / 10
-                    )
-
-                    # 检查是否是数据库文件 (JSON等大文件)
-                    file_info.is_database = (
-                                                    file_path.lower().endswith('.json') and len(content) > 50000
-                                            ) or file_path.lower().endswith(('.db', '.sqlite', '.sqlite3'))
+                # 按设置在同一遍读取中记录行首位置
+                builder = LineIndexBuilder(LineIndex.stride_for(file_info.size)) if self.build_line_index else None
+                if self.metadata_only or file_info.size > self.stream_threshold:
+                    # 仅统计元数据（或文件过大），不解码内容，内容在需要时通过内容缓存加载
+                    stats = self.analyzer.analyze_file(file_path, builder)
+                else:
+                    file_info.content, stats = self.analyzer.read_text(file_path, builder)
+                if stats.binary:
+                    # 内容检测为二进制文件
+                    file_info.is_text = False
+                    return True
+                if builder is not None:
+                    file_info.line_index = builder.finish(file_path, file_info.mtime_ns)
+                newlines, chars, semicolons = stats.newlines, stats.chars, stats.semicolons
+
+                file_info.line_count = newlines + 1
+                file_info.char_count = chars
+                file_info.longest_line = stats.longest_line
+
+                # 检查是否是CDN或压缩JS文件
+                file_info.is_cdn = bool(re.search(r'(cdn|unpkg|jsdelivr|cloudflare)', file_rel_path.lower()))
+                file_info.is_minified = file_path.lower().endswith('.min.js') or (
+                        chars > 1000 and '.' in file_path and
+                        newlines < semicolons / 10
+                )
+
+                # 检查是否是数据库文件 (JSON等大文件)
+                file_info.is_database = (
+                                                file_path.lower().endswith('.json') and chars > 50000
+                                        ) or file_path.lower().endswith(('.db', '.sqlite', '.sqlite3'))
             except Exception as e:
                 file_info.content = f"无法读取文件内容: {str(e)}"
                 file_info.is_text = False
+                return False
 
-        # 将文件信息添加到列表
-        self.files_list.append(file_info)
+        return True
 
-        # 更新进度
-        self.current_count += 1
-        if callback:
-            callback('progress', self.current_count, self.total_files, file_info.to_dict())
+    @property
+    def analyzer_version(self):
+        """分析规则的版本标识，规则变化时扫描缓存自动失效"""
+        return f"{ANALYZER_VERSION}:{','.join(sorted(self.text_extensions))}"
 
-    def highlight_code(self, content, filename):
-        """高亮显示代码"""
-        try:
-            # 获取文件扩展名
-            file_ext = os.path.splitext(filename)[1].lower()
-
-            # 处理WXML和WXSS文件的特殊情况
-            if file_ext == '.wxml':
-                # WXML类似于HTML，使用HTML词法分析器
-                lexer = lexers.get_lexer_by_name('html', stripall=False)
-            elif file_ext == '.wxss':
-                # WXSS类似于CSS，使用CSS词法分析器
-                lexer = lexers.get_lexer_by_name('css', stripall=False)
-            else:
-                # 其他文件类型，尝试根据文件扩展名获取合适的词法分析器
-                try:
-                    lexer = lexers.get_lexer_for_filename(filename, stripall=False)
-                except pygments.util.ClassNotFound:
-                    # 如果找不到匹配的词法分析器，尝试根据文件类型获取
-                    try:
-                        file_type = file_ext[1:] if file_ext else 'txt'
-                        if file_type and file_type != 'txt':
-                            lexer = lexers.get_lexer_by_name(file_type, stripall=False)
-                        else:
-                            lexer = lexers.get_lexer_by_name('text', stripall=False)
-                    except pygments.util.ClassNotFound:
-                        lexer = lexers.get_lexer_by_name('text', stripall=False)
-
-        except pygments.util.ClassNotFound:
-            # 如果所有尝试都失败，使用文本词法分析器
-            lexer = lexers.get_lexer_by_name('text', stripall=False)
-
-        # 使用IDE风格的格式化器，并设置行号
-        formatter = HtmlFormatter(
-            style='monokai',
-            linenos='table',
-            linenostart=1,
-            linespans='line',
-            cssclass='code-highlight',
-            full=False
-        )
-
-        # 生成高亮代码
-        highlighted_code = pygments.highlight(content, lexer, formatter)
-
-        # CSS样式
-        css = formatter.get_style_defs('.code-highlight')
+    def export_project(self, sink, structure_text, files, callback=None, stop_event=None):
+        """
+        将文件结构和所选文件的内容流式写入可写对象，见 ProjectExporter.export
+        files: FileInfo 列表（通常为 files_list 中选中的文件）
+        """
+        return self.exporter.export(sink, structure_text, files, callback, stop_event)
+
+    def export_project_to_file(self, file_path, structure_text, files, compression=None, callback=None,
+                               stop_event=None):
+        """将文件结构和所选文件的内容导出到文件，可选 gzip/xz 压缩，见 ProjectExporter.export_to_file"""
+        return self.exporter.export_to_file(file_path, structure_text, files, compression, callback, stop_event)
+
+    def get_file_content(self, file_path):
+        """获取文件内容，通过内容缓存按需从磁盘加载"""
+        return self.content_store.get(file_path)
 
+    def highlight_code(self, content, filename, stop_event=None):
+        """高亮显示代码，stop_event 被设置时放弃并返回None"""
+        return self.highlighter.highlight(content, filename, stop_event=stop_event)
+
+    def highlight_file(self, file_path, content=None, stop_event=None, output='html'):
+        """
+        高亮显示磁盘上的文件，文件未变化时使用缓存的结果；stop_event 被设置时放弃并返回None
+        output: 'html' 或 'tokens'（紧凑的词法单元流），见 Highlighter.highlight_file
+        """
+        return self.highlighter.highlight_file(file_path, content, loader=self.get_file_content,
+                                               stop_event=stop_event, output=output)
+
+    def highlight_window(self, file_path, start, count, stop_event=None, output='html'):
+        """只高亮文件的第start行起的count行（从0开始），见 Highlighter.highlight_window"""
+        return self.highlighter.highlight_window(file_path, start, count, index=self.get_line_index(file_path),
+                                                 stop_event=stop_event, output=output)
+
+    def get_line_index(self, file_path):
+        """文件的行偏移索引，优先使用扫描时建立的索引，没有索引或文件已变化时重新建立"""
+        index = self.line_indexes.get(file_path)
+        if index is None or not index.is_current(os.stat(file_path)):
+            index = self.line_indexes[file_path] = LineIndex.build(file_path)
+        return index
+
+    def get_file_lines(self, file_path, start, count):
+        """
+        读取文件第start行起的count行（从0开始），通过行偏移索引和 mmap 只访问这一段内容
+        返回 {'start', 'count', 'total_lines', 'content'}，count 为实际的行数（到文件末尾时可能更少）
+        """
+        index = self.get_line_index(file_path)
+        start = max(0, min(start, index.line_count))
+        count = max(0, min(count, index.line_count - start))
         return {
-            'highlighted_code': highlighted_code,
-            'css': css
+            'start': start,
+            'count': count,
+            'total_lines': index.line_count,
+            'content': index.read_lines(start, count),
         }
 
     def restore_project_from_text(self, text_content, target_folder, callback=None):
         """
         从文本内容还原项目结构
-        text_content: 文本内容(包含结构和可能的文件内容)
+        text_content: 文本内容(包含结构和可能的文件内容)，也可以是逐行读取的文本文件对象
         target_folder: 目标文件夹
         callback: 回调函数，用于更新进度
         """
@@ -348,14 +1180,24 @@ class FileProcessor:
             'missing_content': missing_content
         }
 
+    def restore_project_from_file(self, file_path, target_folder, callback=None):
+        """
+        从导出文件还原项目结构，gzip/xz 压缩的导出文件直接逐行解压读取
+        """
+        with open_project_text(file_path) as f:
+            return self.restore_project_from_text(f, target_folder, callback)
+
     def _parse_project_text(self, text_content):
         """
         解析项目文本，提取结构和文件内容
-        text_content: 项目文本
+        text_content: 项目文本，或逐行读取的文本文件对象
         返回: 文件数据列表
         """
         files_data = []
-        lines = text_content.split('\n')
+        if isinstance(text_content, str):
+            lines = text_content.split('\n')
+        else:
+            lines = (line.rstrip('\n') for line in text_content)
 
         # 检查是否包含文件结构和文件内容
         structure_section = True
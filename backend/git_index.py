@@ -0,0 +1,149 @@
+import os
+import struct
+from collections import namedtuple
+
+# 索引中的一个已跟踪条目（路径使用 "/" 分隔，相对于工作区根目录）
+IndexEntry = namedtuple('IndexEntry', ['path', 'mode', 'size', 'mtime_ns'])
+
+# 由索引中缓存的信息构造的stat结果
+IndexStat = namedtuple('IndexStat', ['st_size', 'st_mtime_ns'])
+
+_HEADER = struct.Struct('>4sII')
+# ctime秒/纳秒, mtime秒/纳秒, dev, ino, mode, uid, gid, size
+_ENTRY_STAT = struct.Struct('>10I')
+
+MODE_GITLINK = 0o160000  # 子模块
+MODE_DIRECTORY = 0o040000  # 稀疏索引中的目录条目
+
+_FLAG_EXTENDED = 0x4000
+_NAME_MASK = 0x0FFF
+
+
+def find_git_dir(folder_path):
+    """
+    查找工作区根目录对应的git目录
+    folder_path 必须是工作区根目录（包含 .git），否则返回None；
+    支持 .git 为 "gitdir: ..." 文件的工作树和子模块
+    """
+    dot_git = os.path.join(folder_path, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        try:
+            with open(dot_git, 'r', encoding='utf-8') as f:
+                line = f.readline().strip()
+        except OSError:
+            return None
+        if line.startswith('gitdir:'):
+            git_dir = line[len('gitdir:'):].strip()
+            if not os.path.isabs(git_dir):
+                git_dir = os.path.join(folder_path, git_dir)
+            return os.path.normpath(git_dir) if os.path.isdir(git_dir) else None
+    return None
+
+
+def _hash_size(git_dir):
+    """对象哈希长度，SHA-256仓库为32字节"""
+    for config_dir in (git_dir, _common_dir(git_dir)):
+        try:
+            with open(os.path.join(config_dir, 'config'), 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    key, _, value = line.partition('=')
+                    if key.strip().lower() == 'objectformat':
+                        return 32 if value.strip().lower() == 'sha256' else 20
+        except OSError:
+            continue
+    return 20
+
+
+def _common_dir(git_dir):
+    """工作树共享的主git目录"""
+    try:
+        with open(os.path.join(git_dir, 'commondir'), 'r', encoding='utf-8') as f:
+            common = f.read().strip()
+    except OSError:
+        return git_dir
+    return os.path.normpath(os.path.join(git_dir, common))
+
+
+def read_info_exclude(git_dir):
+    """读取 info/exclude 中的忽略规则行"""
+    try:
+        with open(os.path.join(_common_dir(git_dir), 'info', 'exclude'), 'r',
+                  encoding='utf-8', errors='ignore') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+
+def _read_varint(data, offset):
+    """读取索引v4使用的偏移量编码整数"""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def read_index(git_dir):
+    """
+    解析 .git/index（版本2、3、4），返回已跟踪条目的列表
+    冲突中的文件只保留一个条目；使用分离索引（split index）时
+    条目不完整，抛出ValueError，调用方应退回目录遍历
+    """
+    with open(os.path.join(git_dir, 'index'), 'rb') as f:
+        data = f.read()
+
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b'DIRC' or version not in (2, 3, 4):
+        raise ValueError(f"不支持的git索引格式: {signature!r} v{version}")
+
+    hash_size = _hash_size(git_dir)
+    entries = []
+    offset = _HEADER.size
+    previous_path = b''
+    last_path = None
+    for _ in range(count):
+        entry_start = offset
+        fields = _ENTRY_STAT.unpack_from(data, offset)
+        offset += _ENTRY_STAT.size + hash_size
+        flags, = struct.unpack_from('>H', data, offset)
+        offset += 2
+        if flags & _FLAG_EXTENDED and version >= 3:
+            offset += 2
+
+        if version == 4:
+            # 路径前缀压缩：先去掉上一条路径末尾的N个字节，再拼接本条后缀
+            strip, offset = _read_varint(data, offset)
+            end = data.index(b'\0', offset)
+            path = previous_path[:len(previous_path) - strip] + data[offset:end]
+            offset = end + 1
+        else:
+            name_len = flags & _NAME_MASK
+            if name_len < _NAME_MASK:
+                end = offset + name_len
+            else:
+                end = data.index(b'\0', offset)
+            path = data[offset:end]
+            # 条目以NUL填充到8字节的整数倍
+            offset = entry_start + ((end - entry_start + 8) // 8) * 8
+        previous_path = path
+
+        if path == last_path:
+            continue  # 冲突文件的其他阶段
+        last_path = path
+
+        mtime_ns = fields[2] * 1000000000 + fields[3]
+        entries.append(IndexEntry(os.fsdecode(path), fields[6], fields[9], mtime_ns))
+
+    # 检查扩展，分离索引中的条目存放在共享索引里
+    while offset + 8 <= len(data) - hash_size:
+        ext_signature, ext_size = struct.unpack_from('>4sI', data, offset)
+        if ext_signature == b'link':
+            raise ValueError("不支持分离的git索引")
+        offset += 8 + ext_size
+
+    return entries
@@ -0,0 +1,149 @@
+import multiprocessing
+import threading
+import time
+
+# 等待结果时检查取消信号的间隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+def _worker_main(conn):
+    """工作进程：循环接收高亮任务，返回HTML（出错时返回None）"""
+    from .highlighter import Highlighter
+    highlighter = Highlighter()
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        try:
+            html = highlighter.render(*task)
+        except Exception:
+            html = None
+        try:
+            conn.send(html)
+        except (BrokenPipeError, OSError):
+            break
+
+
+class _Worker:
+    """一个高亮工作进程及与其通信的管道"""
+
+    def __init__(self):
+        # 调用方是多线程的（HTTP服务、事件分发等），fork 可能复制其他线程持有的锁，统一使用 spawn
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,),
+                                       name='highlight-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        """强制结束进程（正在处理的任务可能陷入病态的正则回溯，无法正常中断）"""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class HighlightPool:
+    """
+    进程外的代码高亮
+    Pygments 的正则词法分析器遇到压缩过的JS或特殊数据文件时可能耗时极长，
+    在工作进程中高亮不会占用调用线程（和GIL）；每个请求有截止时间，
+    超时或被取消时结束该工作进程并另行启动，调用方的等待时间因此有上限
+    """
+
+    def __init__(self, max_workers=2, deadline=2.0):
+        """
+        max_workers: 最多同时运行的工作进程数
+        deadline: 每个请求（含等待空闲进程）的默认时限（秒）
+        """
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.timeouts = 0
+        self.cancelled = 0
+        self._idle = []  # 空闲的工作进程，第一个请求时才启动
+        self._workers = 0  # 已启动的工作进程数
+        self._closed = False
+        self._available = threading.Condition()
+
+    def render(self, task, deadline=None, stop_event=None):
+        """
+        在工作进程中执行 Highlighter.render(*task)
+        deadline: 本次请求的时限（秒），为None时使用默认时限
+        stop_event: 设置后放弃本次请求（如用户已切换到其他文件）
+        返回HTML；超时、被取消或工作进程出错时返回None
+        """
+        end = time.monotonic() + (self.deadline if deadline is None else deadline)
+        worker = self._acquire(end, stop_event)
+        if worker is None:
+            return None
+        try:
+            worker.conn.send(task)
+            while not worker.conn.poll(min(_POLL_INTERVAL, max(0.0, end - time.monotonic()))):
+                if stop_event is not None and stop_event.is_set():
+                    self.cancelled += 1
+                    break
+                if time.monotonic() >= end:
+                    self.timeouts += 1
+                    break
+            else:
+                html = worker.conn.recv()
+                self._release(worker)
+                return html
+        except (EOFError, OSError):
+            pass
+        self._discard(worker)
+        return None
+
+    def close(self):
+        """结束所有空闲的工作进程，正在处理请求的进程在请求结束后退出"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._available.notify_all()
+        for worker in idle:
+            worker.kill()
+
+    def _acquire(self, end, stop_event):
+        """取得空闲的工作进程，未达上限时启动新进程；超时、被取消或已关闭时返回None"""
+        with self._available:
+            while not self._closed:
+                if self._idle:
+                    return self._idle.pop()
+                if self._workers < self.max_workers:
+                    self._workers += 1
+                    break
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    return None
+                if stop_event is not None and stop_event.is_set():
+                    self.cancelled += 1
+                    return None
+                self._available.wait(min(_POLL_INTERVAL, remaining))
+            else:
+                return None
+        try:
+            return _Worker()
+        except OSError:
+            with self._available:
+                self._workers -= 1
+                self._available.notify()
+            return None
+
+    def _release(self, worker):
+        with self._available:
+            if not self._closed:
+                self._idle.append(worker)
+                self._available.notify()
+                return
+            self._workers -= 1
+        worker.kill()
+
+    def _discard(self, worker):
+        """结束超时、被取消或出错的工作进程，空出的名额可以启动新进程"""
+        worker.kill()
+        with self._available:
+            self._workers -= 1
+            self._available.notify()
@@ -0,0 +1,444 @@
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+import pygments
+from pygments import lexers
+from pygments.formatters import HtmlFormatter
+from pygments.token import STANDARD_TYPES, Text
+from .file_analyzer import read_text_file
+from .line_index import LineIndex
+
+# 高亮输出格式的版本号，修改格式化器设置时递增，使磁盘缓存失效
+HIGHLIGHT_VERSION = 1
+
+DEFAULT_STYLE = 'monokai'
+
+# 窗口高亮时在窗口之前额外词法分析的行数，使窗口开头处于正确的词法状态（如多行注释中）
+WINDOW_CONTEXT_LINES = 200
+
+# 高亮超时（或工作进程出错）时显示在纯文本之前的提示
+SKIPPED_MARKER = '<div class="highlight-skipped">高亮已跳过：文件过于复杂，以纯文本显示</div>'
+
+# 按类似语言高亮的扩展名
+_LEXER_ALIASES = {
+    '.wxml': 'html',  # WXML类似于HTML
+    '.wxss': 'css',  # WXSS类似于CSS
+}
+
+
+_NAMED_FILES = None
+
+
+def _named_files():
+    """Pygments 中按完整文件名（不含通配符）匹配的文件名"""
+    global _NAMED_FILES
+    if _NAMED_FILES is None:
+        _NAMED_FILES = frozenset(
+            pattern for _, _, patterns, _ in lexers.get_all_lexers(plugins=False)
+            for pattern in patterns if not any(c in pattern for c in '*?[')
+        )
+    return _NAMED_FILES
+
+
+class Highlighter:
+    """
+    代码高亮服务，三层缓存：
+    1. 按扩展名缓存词法分析器，不再每次按文件名查找
+    2. 每个主题只创建一个格式化器并生成一次CSS
+    3. 按 (路径, mtime, 大小, 主题) 缓存高亮结果，内存中为LRU，可选再写入磁盘
+    文件未变化时重复预览直接返回缓存的结果
+    设置 pool（HighlightPool）后词法分析在工作进程中进行，超时的文件以转义的纯文本显示，
+    结果带有 skipped 标记（只缓存在内存中）
+    输出格式 output 为 'html'（Pygments 表格HTML）或 'tokens'（紧凑的词法单元流，见 _token_lines，
+    由前端生成DOM和行号，体积和解析时间都远小于HTML）
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, cache_dir=None, max_disk_entries=2000):
+        """
+        max_bytes: 内存中高亮结果的预算（字节）
+        cache_dir: 磁盘缓存目录，为None时不使用磁盘缓存
+        max_disk_entries: 磁盘缓存最多保留的文件数，超过时删除最久未使用的
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lexers = {}  # 扩展名或小写文件名 -> 词法分析器
+        self._formatters = {}  # 主题 -> (格式化器, CSS)
+        self._results = OrderedDict()  # (路径, mtime_ns, 大小, 主题[, 起始行, 行数][, 'tokens']) -> (结果, 占用字节数)
+        self._indexes = OrderedDict()  # (路径, mtime_ns, 大小) -> LineIndex
+        self.max_indexes = 8
+        self.pool = None  # 高亮工作进程池，为None时在调用线程中高亮
+        self.skipped = 0
+        self._disk_writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_cache_dir():
+        """默认磁盘缓存目录"""
+        return os.path.join(os.path.expanduser('~'), '.projectxt', 'highlight_cache')
+
+    def get_lexer(self, filename, stripnl=True):
+        """
+        按扩展名获取词法分析器，同一扩展名只查找一次
+        没有扩展名或有专门词法分析器的文件名（如 Makefile、CMakeLists.txt）按文件名缓存
+        stripnl: 是否去掉开头和结尾的空行（窗口高亮需要保留，行号才能对应）
+        """
+        name = os.path.basename(filename)
+        file_ext = os.path.splitext(name)[1].lower()
+        key = (file_ext if file_ext and name not in _named_files() else name.lower(), stripnl)
+        lexer = self._lexers.get(key)
+        if lexer is None:
+            lexer = self._find_lexer(filename, file_ext)
+            if not stripnl:
+                lexer = type(lexer)(**dict(lexer.options, stripnl=False))
+            self._lexers[key] = lexer
+        return lexer
+
+    @staticmethod
+    def _find_lexer(filename, file_ext):
+        if file_ext in _LEXER_ALIASES:
+            return lexers.get_lexer_by_name(_LEXER_ALIASES[file_ext], stripall=False)
+        try:
+            # 尝试根据文件扩展名获取合适的词法分析器
+            return lexers.get_lexer_for_filename(filename, stripall=False)
+        except pygments.util.ClassNotFound:
+            pass
+        try:
+            # 如果找不到匹配的词法分析器，尝试根据文件类型获取
+            if file_ext and file_ext != '.txt':
+                return lexers.get_lexer_by_name(file_ext[1:], stripall=False)
+        except pygments.util.ClassNotFound:
+            pass
+        return lexers.get_lexer_by_name('text', stripall=False)
+
+    def get_formatter(self, style=DEFAULT_STYLE):
+        """获取主题对应的格式化器和CSS，每个主题只创建一次"""
+        item = self._formatters.get(style)
+        if item is None:
+            # 使用IDE风格的格式化器，并设置行号
+            formatter = HtmlFormatter(
+                style=style,
+                linenos='table',
+                linenostart=1,
+                linespans='line',
+                cssclass='code-highlight',
+                full=False
+            )
+            item = self._formatters[style] = (formatter, formatter.get_style_defs('.code-highlight'))
+        return item
+
+    def render(self, content, filename, style=DEFAULT_STYLE, skip=0, linenostart=None, output='html'):
+        """
+        词法分析并格式化（在工作进程中也通过此方法高亮）
+        linenostart 为None时整体高亮（表格行号）；否则为窗口高亮：跳过前 skip 行，
+        其余各行使用从 linenostart 开始的内联行号
+        output 为 'tokens' 时返回 {'classes', 'lines', 'text'}（见 _token_lines），否则返回HTML
+        """
+        if output == 'tokens':
+            tokens = self.get_lexer(filename, stripnl=False).get_tokens(content)
+            return _token_lines(_skip_lines(tokens, skip))
+        if linenostart is None:
+            return pygments.highlight(content, self.get_lexer(filename), self.get_formatter(style)[0])
+        tokens = self.get_lexer(filename, stripnl=False).get_tokens(content)
+        return pygments.format(_skip_lines(tokens, skip), self._window_formatter(style, linenostart))
+
+    def render_plain(self, content, style=DEFAULT_STYLE, skip=0, linenostart=None, output='html'):
+        """不做词法分析，以转义的纯文本输出（格式与 render 一致），HTML前面加上跳过高亮的提示"""
+        tokens = _skip_lines([(Text, content)], skip)
+        if output == 'tokens':
+            return _token_lines(tokens)
+        formatter = self.get_formatter(style)[0] if linenostart is None else self._window_formatter(style, linenostart)
+        return SKIPPED_MARKER + pygments.format(tokens, formatter)
+
+    def _render_bounded(self, content, filename, style=DEFAULT_STYLE, skip=0, linenostart=None, stop_event=None,
+                        output='html'):
+        """
+        按设置在工作进程中高亮，返回 (结果, 是否跳过了高亮)
+        超时或出错时返回纯文本；被取消时返回 (None, False)
+        词法单元流的结果中记录 skipped，HTML 以 SKIPPED_MARKER 开头表示跳过
+        """
+        if self.pool is None:
+            value, skipped = self.render(content, filename, style, skip, linenostart, output), False
+        else:
+            value, skipped = self.pool.render((content, filename, style, skip, linenostart, output),
+                                              stop_event=stop_event), False
+            if value is None:
+                if stop_event is not None and stop_event.is_set():
+                    return None, False
+                self.skipped += 1
+                value, skipped = self.render_plain(content, style, skip, linenostart, output), True
+        if output == 'tokens':
+            value['skipped'] = skipped
+        return value, skipped
+
+    @staticmethod
+    def _result(value, css):
+        """缓存的结果（HTML 或词法单元流）转换为返回给调用方的字典"""
+        if isinstance(value, str):
+            return {'highlighted_code': value, 'css': css, 'skipped': value.startswith(SKIPPED_MARKER)}
+        return dict(value, format='tokens', css=css)
+
+    @staticmethod
+    def _window_formatter(style, linenostart):
+        return HtmlFormatter(
+            style=style,
+            linenos='inline',
+            linenostart=linenostart,
+            linespans='line',
+            cssclass='code-highlight',
+            full=False
+        )
+
+    def highlight(self, content, filename, style=DEFAULT_STYLE, stop_event=None):
+        """
+        高亮一段代码（不缓存结果），返回 {'highlighted_code', 'css', 'skipped'}
+        stop_event: 设置后放弃高亮（使用工作进程池时），此时返回None
+        """
+        css = self.get_formatter(style)[1]
+        html, skipped = self._render_bounded(content, filename, style, stop_event=stop_event)
+        if html is None:
+            return None
+        return {'highlighted_code': html, 'css': css, 'skipped': skipped}
+
+    def highlight_file(self, file_path, content=None, loader=None, style=DEFAULT_STYLE, stop_event=None,
+                       output='html'):
+        """
+        高亮磁盘上的文件，文件未变化时返回缓存的结果
+        content: 已读取的文件内容，为None时在需要渲染时才读取
+        loader: 读取文件内容的函数 loader(路径)，默认与扫描相同的方式读取
+        stop_event: 设置后放弃高亮（使用工作进程池时），此时返回None
+        output: 'html' 返回 {'highlighted_code', 'css', 'skipped'}；
+                'tokens' 返回 {'format', 'classes', 'lines', 'text', 'css', 'skipped'}（不写入磁盘缓存）
+        """
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size, style)
+        if output == 'tokens':
+            key += (output,)
+        css = self.get_formatter(style)[1]
+
+        with self._lock:
+            item = self._results.get(key)
+            if item is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._result(item[0], css)
+
+        value = self._read_disk(key) if output == 'html' else None
+        if value is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            if content is None:
+                content = (loader or read_text_file)(file_path)
+            value, skipped = self._render_bounded(content, file_path, style, stop_event=stop_event, output=output)
+            if value is None:
+                return None
+            if output == 'html' and not skipped:
+                self._write_disk(key, value)
+        # 跳过高亮的结果也缓存在内存中，文件变化前不再重复尝试
+        self._put(key, value)
+        return self._result(value, css)
+
+    def highlight_window(self, file_path, start, count, style=DEFAULT_STYLE, context=WINDOW_CONTEXT_LINES,
+                         index=None, stop_event=None, output='html'):
+        """
+        只高亮第start行起的count行（从0开始），用于超大文件的分段预览
+        通过行偏移索引只读取窗口及其之前 context 行的内容，
+        之前的行只参与词法分析，不输出；行号从 start + 1 开始（内联行号，不使用表格）
+        返回 {'start', 'count', 'total_lines', 'highlighted_code', 'css', 'skipped'}，
+        count 为实际的行数（到文件末尾时可能更少）；output 为 'tokens' 时以词法单元流
+        （'format', 'classes', 'lines', 'text'）代替 highlighted_code
+        index: 文件当前的行偏移索引（如扫描时建立的），为None时建立并缓存
+        stop_event: 设置后放弃高亮（使用工作进程池时），此时返回None
+        """
+        index = index or self.line_index(file_path)
+        total = index.line_count
+        start = max(0, min(start, total))
+        count = max(0, min(count, total - start))
+        css = self.get_formatter(style)[1]
+        result = {'start': start, 'count': count, 'total_lines': total, 'css': css}
+
+        key = (file_path, index.mtime_ns, index.size, style, start, count)
+        if output == 'tokens':
+            key += (output,)
+        with self._lock:
+            item = self._results.get(key)
+            if item is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return dict(result, **self._result(item[0], css))
+
+        self.misses += 1
+        context_start = max(0, start - context)
+        text = index.read_lines(context_start, start + count - context_start)
+        value, _ = self._render_bounded(text, file_path, style, start - context_start, start + 1, stop_event, output)
+        if value is None:
+            return None
+        self._put(key, value)
+        return dict(result, **self._result(value, css))
+
+    def line_index(self, file_path):
+        """文件的行偏移索引，文件未变化时复用"""
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+
+        index = LineIndex.build(file_path)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def cached(self, file_path, style=DEFAULT_STYLE):
+        """文件当前版本的高亮结果是否已在内存中"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            return (file_path, stat.st_mtime_ns, stat.st_size, style) in self._results
+
+    def invalidate(self, file_path=None):
+        """移除指定文件的内存缓存，不指定时清空全部（磁盘缓存按mtime和大小自然失效）"""
+        with self._lock:
+            for key in [key for key in self._results if file_path is None or key[0] == file_path]:
+                self.current_bytes -= self._results.pop(key)[1]
+            for key in [key for key in self._indexes if file_path is None or key[0] == file_path]:
+                del self._indexes[key]
+
+    def _put(self, key, value):
+        """放入内存缓存（HTML 或词法单元流），必要时淘汰最久未使用的结果"""
+        if isinstance(value, str):
+            cost = sys.getsizeof(value)
+        else:
+            cost = sys.getsizeof(value['text']) + sum(map(sys.getsizeof, value['lines']))
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._results.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._results[key] = (value, cost)
+            self.current_bytes += cost
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_cost) = self._results.popitem(last=False)
+                self.current_bytes -= evicted_cost
+
+    def _disk_path(self, key):
+        file_path, mtime_ns, size, style = key
+        digest = hashlib.sha1(
+            f"{HIGHLIGHT_VERSION}:{pygments.__version__}:{style}:{size}:{mtime_ns}:{file_path}".encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.html")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                html = f.read()
+            os.utime(path)  # 记录最近使用时间，清理时保留
+            return html
+        except OSError:
+            return None
+
+    def _write_disk(self, key, html):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(html)
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        self._disk_writes += 1
+        if self._disk_writes % 100 == 1:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """磁盘缓存超过上限时删除最久未使用的文件"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.html')]
+        except OSError:
+            return
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _skip_lines(tokens, lines):
+    """跳过词法单元流中的前 lines 行"""
+    for token_type, value in tokens:
+        if lines > 0:
+            newlines = value.count('\n')
+            if newlines < lines:
+                lines -= newlines
+                continue
+            position = -1
+            for _ in range(lines):
+                position = value.index('\n', position + 1)
+            value = value[position + 1:]
+            lines = 0
+            if not value:
+                continue
+        yield token_type, value
+
+
+def _css_class(token_type):
+    """词法单元类型对应的CSS类名（非标准类型使用最近的标准父类型），普通文本为空字符串"""
+    while token_type not in STANDARD_TYPES:
+        token_type = token_type.parent
+    return STANDARD_TYPES[token_type]
+
+
+def _token_lines(tokens):
+    """
+    把词法单元流编码为紧凑的按行游程格式：
+    {'classes': [CSS类名...], 'lines': [[类名序号, 长度, 类名序号, 长度, ...], ...], 'text': 文本}
+    classes[0] 为普通文本（空类名）；每行中相邻的同类单元合并，只有普通文本的行为空列表；
+    长度按 UTF-16 码元计算，与 JavaScript 字符串一致；text 中各行以 \\n 分隔（末尾不带换行）
+    """
+    classes = {'': 0}
+    class_ids = {}  # 词法单元类型 -> 类名序号
+    lines = []
+    runs = []
+    parts = []
+    for token_type, value in tokens:
+        class_id = class_ids.get(token_type)
+        if class_id is None:
+            class_id = class_ids[token_type] = classes.setdefault(_css_class(token_type), len(classes))
+        for i, piece in enumerate(value.split('\n')):
+            if i:
+                lines.append([] if len(runs) == 2 and runs[0] == 0 else runs)
+                runs = []
+            if piece:
+                length = len(piece) if piece.isascii() else len(piece.encode('utf-16-le')) // 2
+                if runs and runs[-2] == class_id:
+                    runs[-1] += length
+                else:
+                    runs += (class_id, length)
+        parts.append(value)
+    if runs:
+        lines.append([] if len(runs) == 2 and runs[0] == 0 else runs)
+    text = ''.join(parts)
+    return {'classes': list(classes), 'lines': lines, 'text': text[:-1] if text.endswith('\n') else text}
@@ -0,0 +1,258 @@
+import os
+import re
+
+# 内置的忽略规则配置，使用与.gitignore相同的语法
+# （隐藏文件和目录在遍历时已被跳过，无需列出）
+# 'default' 只包含版本控制元数据、字节码缓存和安装的依赖目录；build/、dist/、env/ 等目录名
+# 在一些项目中保存的是源代码，只在按语言选择的配置中忽略
+IGNORE_PROFILES = {
+    'default': [
+        'CVS/', '_darcs/', '__pycache__/', '*.py[co]',
+        'node_modules/', 'bower_components/', 'jspm_packages/',
+    ],
+    'build': ['build/', 'dist/', 'out/', 'target/', 'coverage/'],
+    'node': ['node_modules/', 'bower_components/', 'jspm_packages/', 'dist/', 'coverage/'],
+    'python': ['venv/', 'env/', '__pycache__/', '*.pyc', '*.egg-info/', 'build/', 'dist/'],
+    'java': ['target/', 'build/', '*.class'],
+    'rust': ['target/'],
+}
+
+# 每个目录中读取的忽略文件
+IGNORE_FILES = ('.gitignore', '.ignore')
+
+
+def _glob_to_regex(pattern):
+    """将.gitignore通配符转换为正则表达式（不含锚定部分）"""
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                # "**/" 匹配零个或多个目录，末尾的 "/**" 匹配其下所有内容
+                at_start = i == 0 or pattern[i - 1] == '/'
+                if at_start and pattern.startswith('**/', i):
+                    parts.append('(?:.*/)?')
+                    i += 3
+                    continue
+                if at_start and i + 2 == n:
+                    parts.append('.*')
+                    i += 2
+                    continue
+            parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern.startswith('[!', i) or pattern.startswith('[^', i) else i + 1)
+            if end < 0:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+
+class IgnorePattern:
+    """单条忽略规则"""
+
+    __slots__ = ('negated', 'dir_only', 'regex')
+
+    def __init__(self, negated, dir_only, regex):
+        self.negated = negated  # "!" 开头，重新包含被忽略的路径
+        self.dir_only = dir_only  # "/" 结尾，只匹配目录
+        self.regex = regex  # 匹配相对于规则所在目录的路径
+
+    @classmethod
+    def parse(cls, line):
+        """解析一行规则，空行和注释返回None"""
+        line = line.rstrip('\n\r')
+        # 末尾未转义的空格被忽略
+        while line.endswith(' ') and not line.endswith('\\ '):
+            line = line[:-1]
+        if not line or line.startswith('#'):
+            return None
+
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith('\\'):
+            line = line[1:]  # "\#" 和 "\!" 表示字面字符
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+
+        # 包含 "/" 的规则相对于所在目录锚定，否则匹配任意层级的名称
+        anchored = '/' in line
+        line = line.lstrip('/')
+        regex = _glob_to_regex(line)
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        return cls(negated, dir_only, regex)
+
+
+class IgnoreRuleSet:
+    """
+    一个目录下的编译后规则
+    规则中没有 "!" 时将所有规则合并为单个正则表达式，一次匹配即可得出结果
+    """
+
+    def __init__(self, base, patterns):
+        self.base = base  # 规则所在目录的相对路径（根目录为空字符串）
+        self.patterns = patterns
+        self.has_negation = any(p.negated for p in patterns)
+        if not self.has_negation:
+            self._dir_regex = self._combine(patterns)
+            self._file_regex = self._combine([p for p in patterns if not p.dir_only])
+        else:
+            self._compiled = [(p, re.compile(p.regex)) for p in patterns]
+
+    @staticmethod
+    def _combine(patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join(f'(?:{p.regex})' for p in patterns))
+
+    def match(self, rel_path, is_dir):
+        """
+        判断路径是否被忽略
+        返回True（忽略）、False（被 "!" 重新包含）或None（没有规则匹配）
+        """
+        if self.base:
+            rel_path = rel_path[len(self.base) + 1:]
+
+        if not self.has_negation:
+            regex = self._dir_regex if is_dir else self._file_regex
+            if regex is not None and regex.fullmatch(rel_path):
+                return True
+            return None
+
+        # 有 "!" 规则时以最后匹配的规则为准
+        for pattern, regex in reversed(self._compiled):
+            if pattern.dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not pattern.negated
+        return None
+
+
+class IgnoreRules:
+    """
+    遍历时使用的忽略规则
+    合并用户配置的规则和各级目录中的 .gitignore/.ignore 文件，
+    下级目录的规则优先于上级目录，所有忽略文件优先于用户配置的规则。
+    被忽略的目录整个跳过，不会再进入其中列举或读取忽略文件
+    """
+
+    def __init__(self, root, profiles=('default',), patterns=(), use_ignore_files=True):
+        """
+        root: 项目根目录
+        profiles: 使用的内置规则配置名称，见 IGNORE_PROFILES
+        patterns: 额外的用户规则（.gitignore语法）
+        use_ignore_files: 是否读取目录中的 .gitignore/.ignore 文件
+        """
+        self.root = os.path.abspath(root)
+        self.use_ignore_files = use_ignore_files
+        lines = []
+        for name in profiles or ():
+            lines.extend(IGNORE_PROFILES.get(name, ()))
+        lines.extend(patterns or ())
+        user_patterns = [p for p in map(IgnorePattern.parse, lines) if p is not None]
+        self._user_rules = IgnoreRuleSet('', user_patterns) if user_patterns else None
+        self._chains = {}  # 目录相对路径 -> 适用的规则集（由深到浅）
+        self._signatures = {}  # 目录相对路径 -> 忽略文件的修改时间
+
+    def is_ignored(self, rel_path, is_dir):
+        """判断相对路径是否被忽略（其上级目录需未被忽略）"""
+        parent = rel_path.rsplit('/', 1)[0] if '/' in rel_path else ''
+        return self._match_chain(self._chain(parent), rel_path, is_dir)
+
+    def filter_listing(self, rel_dir, dirs, files):
+        """
+        过滤目录列举结果，返回保留的 (目录列表, 文件列表)
+        dirs、files 的元素第一项为名称
+        """
+        chain = self._chain(rel_dir)
+        if not chain:
+            return dirs, files
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        dirs = [d for d in dirs if not self._match_chain(chain, prefix + d[0], True)]
+        files = [f for f in files if not self._match_chain(chain, prefix + f[0], False)]
+        return dirs, files
+
+    @staticmethod
+    def _match_chain(chain, rel_path, is_dir):
+        for rule_set in chain:
+            verdict = rule_set.match(rel_path, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def _chain(self, rel_dir):
+        """获取目录适用的规则集，按需读取各级忽略文件"""
+        chain = self._chains.get(rel_dir)
+        if chain is not None:
+            return chain
+
+        if rel_dir:
+            parent = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ''
+            chain = self._chain(parent)
+        else:
+            chain = (self._user_rules,) if self._user_rules else ()
+
+        if self.use_ignore_files:
+            rule_set = self._load_dir(rel_dir)
+            if rule_set is not None:
+                chain = (rule_set,) + chain
+        self._chains[rel_dir] = chain
+        return chain
+
+    def _load_dir(self, rel_dir):
+        """读取目录中的忽略文件"""
+        full_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        patterns = []
+        signature = []
+        for name in IGNORE_FILES:
+            try:
+                with open(os.path.join(full_dir, name), 'r', encoding='utf-8', errors='ignore') as f:
+                    signature.append(os.fstat(f.fileno()).st_mtime_ns)
+                    patterns.extend(p for p in map(IgnorePattern.parse, f) if p is not None)
+            except OSError:
+                signature.append(None)
+        self._signatures[rel_dir] = tuple(signature)
+        return IgnoreRuleSet(rel_dir, patterns) if patterns else None
+
+    def _read_signature(self, rel_dir):
+        full_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        signature = []
+        for name in IGNORE_FILES:
+            try:
+                signature.append(os.stat(os.path.join(full_dir, name)).st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def files_changed(self, rel_dirs=None):
+        """
+        检查已读取的忽略文件是否发生变化（新增、修改或删除）
+        rel_dirs: 只检查这些目录，为None时检查所有已读取的目录
+        """
+        if not self.use_ignore_files:
+            return False
+        dirs = self._signatures.keys() if rel_dirs is None else rel_dirs
+        for rel_dir in dirs:
+            signature = self._signatures.get(rel_dir)
+            if signature is not None and signature != self._read_signature(rel_dir):
+                return True
+        return False
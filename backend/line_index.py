@@ -0,0 +1,186 @@
+import codecs
+import mmap
+import operator
+import os
+from array import array
+from itertools import accumulate, islice, repeat
+from .file_analyzer import SNIFF_BYTES, decode_text, sniff_encoding
+
+
+class LineIndex:
+    """
+    文件的行偏移索引
+    offsets[i] 为第 i * stride 行（从0开始）首字节在文件中的位置，只按 \\n 分行
+    （\\r\\n 结尾的行读取时会转换为 \\n）。stride 为1时记录每一行；
+    超大文件使用抽样索引，只记录每 stride 行中的一行，其余行从最近的记录处向后查找。
+    读取任意行范围时通过 mmap 只访问这一段字节，不必读入和解码整个文件
+    """
+
+    # 超过该大小的文件使用抽样索引（字节）
+    SAMPLE_THRESHOLD = 64 * 1024 * 1024
+    # 抽样索引每隔多少行记录一次
+    SAMPLE_STRIDE = 64
+
+    def __init__(self, file_path, offsets, size, encoding='utf-8', mtime_ns=0, stride=1, line_count=None,
+                 newline=b'\n'):
+        """
+        offsets: array('Q')，每 stride 行记录一次的行首位置
+        size: 建立索引时的文件大小
+        encoding: 解码一段字节使用的编码（UTF-16 文件为带字节序、不含BOM的编码）
+        mtime_ns: 建立索引时文件的修改时间，用于判断索引是否过期
+        line_count: 行数，为None时由 offsets 得出（只适用于 stride 为1的索引）
+        newline: 换行符在该编码下的字节
+        """
+        self.file_path = file_path
+        self.offsets = offsets
+        self.size = size
+        self.encoding = encoding
+        self.mtime_ns = mtime_ns
+        self.stride = stride
+        self.line_count = len(offsets) if line_count is None else line_count
+        self.newline = newline
+
+    @classmethod
+    def stride_for(cls, size):
+        """按文件大小选择索引的抽样间隔"""
+        return cls.SAMPLE_STRIDE if size > cls.SAMPLE_THRESHOLD else 1
+
+    @classmethod
+    def build(cls, file_path, chunk_size=1024 * 1024, stride=None):
+        """分块读取文件建立索引，内存占用只与行数有关；stride为None时按文件大小选择"""
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            builder = LineIndexBuilder(cls.stride_for(stat.st_size) if stride is None else stride)
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                builder.feed(chunk, len(chunk))
+        return builder.finish(file_path, stat.st_mtime_ns)
+
+    def is_current(self, stat):
+        """索引是否与文件的当前状态（os.stat 结果）一致"""
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def read_lines(self, start, count):
+        """读取第start行起的count行（从0开始），解码方式与扫描时一致"""
+        if self.size == 0 or count <= 0:
+            return ''
+        with open(self.file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                begin = self._line_start(mm, start)
+                end = self._line_start(mm, start + count)
+                return decode_text(mm[begin:end], self.encoding)
+
+    def _line_start(self, mm, line):
+        """第line行首字节的位置，抽样索引从最近的记录处向后查找"""
+        size = min(self.size, len(mm))
+        if line <= 0:
+            return self.offsets[0]
+        if line >= self.line_count:
+            return size
+        position = self.offsets[line // self.stride]
+        for _ in range(line % self.stride):
+            found = _find_newline(mm, self.newline, position, self.offsets[0])
+            if found < 0:
+                return size
+            position = found + len(self.newline)
+        return position
+
+
+class LineIndexBuilder:
+    """
+    逐块记录行首位置，可以在扫描统计换行的同一遍读取中建立索引
+    按顺序调用 feed() 传入文件的全部字节，最后调用 finish()
+    """
+
+    def __init__(self, stride=1):
+        self.stride = stride
+        self.offsets = array('Q', [0])
+        self.encoding = 'utf-8'
+        self.newline = b'\n'
+        self.position = 0  # 已传入的字节数
+        self.lines = 0  # 已遇到的换行数
+        self._start = 0  # 第一行的起始位置（跳过BOM）
+        self._last_start = 0  # 最后一行的起始位置
+        self._first = True
+
+    def feed(self, buf, n):
+        """处理缓冲区的前n个字节"""
+        if not n:
+            return
+        data = buf if n == len(buf) else buf[:n]
+        if self._first:
+            self._first = False
+            self.encoding, self.newline, self._start = _detect_layout(bytes(data[:SNIFF_BYTES]))
+            self.offsets[0] = self._last_start = self._start
+
+        if len(self.newline) == 1:
+            # 每行的长度加上换行符即为下一行的起始位置，全部在C层面计算
+            parts = data.split(self.newline)
+            found = len(parts) - 1
+            starts = accumulate(map(operator.add, map(len, parts[:-1]), repeat(1)), initial=self.position)
+            next(starts)
+            if found:
+                self._last_start = self.position + n - len(parts[-1])
+        else:
+            starts = _aligned_starts(data, self.newline, self.position, self._start)
+            found = len(starts)
+            if found:
+                self._last_start = starts[-1]
+
+        if self.stride == 1:
+            self.offsets.extend(starts)
+        else:
+            # 新的行号为 lines + 1 ... lines + found，只记录行号能被 stride 整除的行
+            self.offsets.extend(islice(starts, (-(self.lines + 1)) % self.stride, None, self.stride))
+        self.lines += found
+        self.position += n
+
+    def finish(self, file_path, mtime_ns=0):
+        """结束建立索引，返回 LineIndex"""
+        line_count = self.lines + 1
+        # 文件以换行结尾时不计最后的空行
+        if self.lines and self._last_start >= self.position:
+            line_count -= 1
+            if self.offsets[-1] >= self.position:
+                self.offsets.pop()
+        return LineIndex(file_path, self.offsets, self.position, self.encoding, mtime_ns, self.stride,
+                         line_count, self.newline)
+
+
+def _detect_layout(head):
+    """根据文件开头判断 (解码一段字节用的编码, 换行符的字节, 第一行的起始位置)"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8', b'\n', len(codecs.BOM_UTF8)
+    if sniff_encoding(head) == 'utf-16':
+        if head.startswith(codecs.BOM_UTF16_LE):
+            return 'utf-16-le', '\n'.encode('utf-16-le'), 2
+        return 'utf-16-be', '\n'.encode('utf-16-be'), 2
+    return 'utf-8', b'\n', 0
+
+
+def _aligned_starts(data, newline, position, start):
+    """
+    多字节编码：返回与字符边界对齐的换行符之后的位置
+    （分块大小为偶数时换行符不会跨块）
+    """
+    width = len(newline)
+    starts = []
+    found = data.find(newline)
+    while found >= 0:
+        if (position + found - start) % width == 0:
+            starts.append(position + found + width)
+            found = data.find(newline, found + width)
+        else:
+            found = data.find(newline, found + 1)
+    return starts
+
+
+def _find_newline(mm, newline, position, start):
+    """从position开始查找与字符边界对齐的换行符，找不到时返回-1"""
+    width = len(newline)
+    found = mm.find(newline, position)
+    while width > 1 and found >= 0 and (found - start) % width:
+        found = mm.find(newline, found + 1)
+    return found
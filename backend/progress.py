@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressThrottle:
+    """
+    合并进度事件
+    距上次发送超过时间窗口，或新处理的文件数达到指定数量时才发送一次进度，
+    进度事件只携带计数，不携带文件信息
+    """
+
+    def __init__(self, interval=0.1, every=0):
+        """
+        interval: 两次进度事件的最短间隔（秒），0表示不按时间合并
+        every: 每处理多少个文件至少发送一次，0表示只按时间窗口发送
+        """
+        self.interval = interval
+        self.every = every
+        self._last_time = 0.0
+        self._last_count = 0
+
+    def reset(self):
+        """开始新的扫描"""
+        self._last_time = 0.0
+        self._last_count = 0
+
+    def ready(self, count):
+        """处理到第count个文件时，判断是否应该发送进度事件"""
+        if self.every and count - self._last_count >= self.every:
+            return self._mark(count)
+        if self.interval <= 0:
+            return not self.every and self._mark(count)
+        now = time.monotonic()
+        if now - self._last_time >= self.interval:
+            return self._mark(count, now)
+        return False
+
+    def _mark(self, count, now=None):
+        self._last_time = time.monotonic() if now is None else now
+        self._last_count = count
+        return True
+
+
+class EventDispatcher:
+    """
+    扫描线程与界面之间的事件队列
+    扫描线程只把事件放入队列，由独立的分发线程调用界面回调，
+    渲染进程繁忙时不会拖慢目录遍历。
+    队列容量有限：可合并的事件（进度）在队列中只保留最新的一个，队列已满时直接丢弃；
+    其他事件（完成、错误、停止等）总会送达，队列已满时等待空位
+    """
+
+    def __init__(self, capacity=256, mergeable=('progress',), name='event-dispatcher'):
+        """
+        capacity: 队列中最多保留的事件数
+        mergeable: 可以合并或丢弃的事件类型
+        """
+        self.capacity = capacity
+        self.mergeable = set(mergeable)
+        self.name = name
+        self.dropped = 0  # 因队列已满被丢弃的事件数
+        self._events = deque()  # [(合并键或None, 处理函数, 参数)]
+        self._merged = {}  # 合并键 -> 最新的参数
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        """启动分发线程"""
+        with self._cond:
+            self._stopped = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, drain=True):
+        """停止分发线程，drain为True时先送达队列中剩余的事件"""
+        with self._cond:
+            if not drain:
+                self._events.clear()
+                self._merged.clear()
+            self._stopped = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def callback(self, handler, key=None):
+        """
+        返回与 process_directory 回调签名相同的函数 callback(status, *args)，
+        事件经过队列后在分发线程中调用 handler(status, *args)
+        key: 区分事件来源，不同来源的进度事件互不合并
+        """
+        def post(status, *args):
+            self.post(handler, status, *args, key=key)
+        return post
+
+    def post(self, handler, status, *args, key=None):
+        """放入一个事件，返回是否已放入队列（被合并的事件也算放入）"""
+        args = (status,) + args
+        with self._cond:
+            if status in self.mergeable:
+                merge_key = (key, handler, status)
+                if merge_key in self._merged:
+                    # 队列中已有同类事件，只更新为最新的数据，位置不变
+                    self._merged[merge_key] = args
+                    return True
+                if len(self._events) >= self.capacity:
+                    self.dropped += 1
+                    return False
+                self._merged[merge_key] = args
+                self._events.append((merge_key, handler, None))
+            else:
+                # 必须送达的事件：队列已满时等待（分发线程自身放入事件时不等待）
+                while (len(self._events) >= self.capacity and not self._stopped and
+                       threading.current_thread() is not self._thread):
+                    self._cond.wait()
+                self._events.append((None, handler, args))
+            self._cond.notify_all()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._events and not self._stopped:
+                    self._cond.wait()
+                if not self._events:
+                    return
+                merge_key, handler, args = self._events.popleft()
+                if merge_key is not None:
+                    args = self._merged.pop(merge_key)
+                self._cond.notify_all()
+            try:
+                handler(*args)
+            except Exception:
+                logger.exception("事件处理失败: %s", args[0])
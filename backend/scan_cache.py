@@ -0,0 +1,126 @@
+import os
+import hashlib
+import sqlite3
+
+
+class ScanCache:
+    """
+    按项目根目录持久化的增量扫描缓存
+    以 (相对路径, 大小, mtime_ns) 为键保存每个文件的分析结果，
+    重新扫描时未变化的文件只需stat，无需重新读取和分类
+    """
+
+    SCHEMA_VERSION = 2
+
+    # 缓存的FileInfo字段
+    FIELDS = ('file_type', 'is_text', 'line_count', 'char_count',
+              'is_cdn', 'is_minified', 'is_database', 'longest_line')
+
+    def __init__(self, root, cache_dir=None, analyzer_version=''):
+        """
+        root: 项目根目录
+        cache_dir: 缓存文件所在目录，默认为 ~/.projectxt/scan_cache
+        analyzer_version: 分析规则版本，规则变化时旧缓存自动失效
+        """
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir or self.default_cache_dir()
+        self.analyzer_version = analyzer_version
+        self.conn = None
+        self.hits = 0
+        self.misses = 0
+        self._pending = []  # 待写入的记录
+
+    @staticmethod
+    def default_cache_dir():
+        """默认缓存目录"""
+        return os.path.join(os.path.expanduser('~'), '.projectxt', 'scan_cache')
+
+    @property
+    def db_path(self):
+        """缓存数据库路径，每个项目根目录对应一个文件"""
+        digest = hashlib.sha1(self.root.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.sqlite")
+
+    def open(self):
+        """打开缓存数据库，版本不一致时清空旧数据"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+        version = f"{self.SCHEMA_VERSION}:{self.analyzer_version}"
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if not row or row[0] != version:
+            # 表结构可能已变化，重建文件表
+            self.conn.execute('DROP TABLE IF EXISTS files')
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (self.root,))
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, '
+            'file_type TEXT, is_text INTEGER, line_count INTEGER, char_count INTEGER, '
+            'is_cdn INTEGER, is_minified INTEGER, is_database INTEGER, longest_line INTEGER)'
+        )
+        self.conn.commit()
+        return self
+
+    def close(self):
+        """写入未提交的记录并关闭数据库"""
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.close()
+        self.conn = None
+
+    def lookup(self, rel_path, size, mtime_ns):
+        """
+        查找未变化文件的缓存结果
+        返回字段字典，文件大小或修改时间变化时返回None
+        """
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, ' + ', '.join(self.FIELDS) + ' FROM files WHERE path = ?',
+            (rel_path,)
+        ).fetchone()
+        if not row or row[0] != size or row[1] != mtime_ns:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        values = dict(zip(self.FIELDS, row[2:]))
+        for key in ('is_text', 'is_cdn', 'is_minified', 'is_database'):
+            values[key] = bool(values[key])
+        return values
+
+    def store(self, file_info, mtime_ns):
+        """记录文件的分析结果"""
+        self._pending.append((file_info.path, file_info.size, mtime_ns) +
+                             tuple(getattr(file_info, field) for field in self.FIELDS))
+        if len(self._pending) >= 1000:
+            self.flush()
+
+    def flush(self):
+        """批量写入待提交的记录"""
+        if self._pending:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, ' + ', '.join(self.FIELDS) + ') '
+                'VALUES (?, ?, ?, ' + ', '.join('?' * len(self.FIELDS)) + ')',
+                self._pending
+            )
+            self._pending = []
+        self.conn.commit()
+
+    def prune(self, current_paths):
+        """删除已不存在的文件的记录（仅在完整扫描结束后调用）"""
+        self.flush()
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS current_paths (path TEXT PRIMARY KEY)')
+        self.conn.execute('DELETE FROM current_paths')
+        self.conn.executemany('INSERT OR IGNORE INTO current_paths (path) VALUES (?)',
+                              ((path,) for path in current_paths))
+        self.conn.execute('DELETE FROM files WHERE path NOT IN (SELECT path FROM current_paths)')
+        self.conn.commit()
+
+    def clear(self):
+        """清空该项目的缓存"""
+        self.conn.execute('DELETE FROM files')
+        self.conn.commit()
@@ -0,0 +1,283 @@
+import os
+import itertools
+import threading
+import time
+from collections import deque
+
+from .file_processor import FileInfo, FileProcessor
+from .watcher import file_order_key
+from .wire_format import encode_columnar
+
+# 分页获取结果时默认包含的字段（不含文件内容）
+PAGE_FIELDS = tuple(field for field in FileInfo.DICT_FIELDS if field != 'content')
+
+# 结果摘要中最多列出的被跳过目录数
+SUMMARY_DIRS_LIMIT = 100
+
+
+class ScanJob:
+    """
+    一次独立的扫描任务
+    每个任务使用自己的 FileProcessor、结果缓冲和停止信号，互不干扰
+    """
+
+    def __init__(self, job_id, folder_path, options, processor, callback=None):
+        self.job_id = job_id
+        self.folder_path = folder_path
+        self.options = options  # 传给 process_directory 的扫描设置
+        self.processor = processor
+        self.callback = callback  # 与 process_directory 相同的进度回调
+        self.cancel_event = threading.Event()  # 取消本任务的信号
+        self.status = 'queued'  # queued、running、finished、stopped、error
+        self.current = 0
+        self.total = 0
+        self.results = None  # 完成回调附带的文件列表（to_dict 结果，未要求时为None）
+        self.files = []  # 完成后的 FileInfo 列表，列表下标即文件ID（刷新后已删除的条目仍占据其ID）
+        self._dir_ids = None  # 目录相对路径 -> 文件ID，列式分页时查找父目录
+        self._ids = None  # 相对路径 -> 文件ID，应用变化集合时建立
+        self._removed = set()  # 刷新后已删除的文件ID（不再复用）
+        self._delta_lock = threading.Lock()
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.thread = None
+
+    @property
+    def done(self):
+        """任务是否已经结束"""
+        return self.status in ('finished', 'stopped', 'error')
+
+    def page(self, offset=0, limit=1000, fields=None):
+        """
+        分页获取结果
+        fields: 包含的字段，为None时使用 PAGE_FIELDS（不含文件内容）
+        返回 [to_dict 结果, ...]，每项附带文件ID 'id'
+        """
+        fields = PAGE_FIELDS if fields is None else fields
+        offset = max(0, offset)
+        page = []
+        for file_id, file_info in enumerate(self.files[offset:offset + max(0, limit)], offset):
+            if file_id in self._removed:
+                continue
+            data = file_info.to_dict(fields)
+            data['id'] = file_id
+            page.append(data)
+        return page
+
+    def columnar_page(self, offset=0, limit=None):
+        """
+        以列式结构分页获取结果（见 wire_format.encode_columnar），limit为None时获取到末尾
+        用于扫描完成后的首次加载，之后的变化通过 apply_delta 返回的文件ID增量更新
+        已删除的文件ID仍占一行（带 FLAG_REMOVED 标志，解码时跳过），前端应分页到 offset 达到 len(files)
+        """
+        if self._dir_ids is None:
+            self._dir_ids = {f.path: file_id for file_id, f in enumerate(self.files)
+                             if f.is_dir and file_id not in self._removed}
+        offset = max(0, offset)
+        end = len(self.files) if limit is None else offset + max(0, limit)
+        return encode_columnar(self.files[offset:end], self.folder_path, offset, dict(self._dir_ids),
+                               self._removed)
+
+    def summary(self):
+        """完成后的结果摘要，用于通知前端分页获取"""
+        files = [file_info for file_id, file_info in enumerate(self.files) if file_id not in self._removed]
+        dirs = sum(1 for file_info in files if file_info.is_dir)
+        return {
+            'job_id': self.job_id,
+            'folder': self.folder_path,
+            'count': len(files),
+            'dirs': dirs,
+            'files': len(files) - dirs,
+            'text_files': sum(1 for file_info in files if not file_info.is_dir and file_info.is_text),
+            # 被忽略规则跳过的目录（最多列出 SUMMARY_DIRS_LIMIT 个，总数见 ignored_count）
+            'ignored_dirs': self.processor.ignored_dirs[:SUMMARY_DIRS_LIMIT],
+            'ignored_count': len(self.processor.ignored_dirs),
+            # 并行列举超时被跳过的目录（相对路径，最多列出 SUMMARY_DIRS_LIMIT 个）
+            'timed_out_dirs': [os.path.relpath(path, self.folder_path).replace('\\', '/')
+                               for path in self.processor.timed_out_dirs[:SUMMARY_DIRS_LIMIT]],
+            'timed_out_count': len(self.processor.timed_out_dirs),
+        }
+
+    def file(self, file_id):
+        """按文件ID获取 FileInfo，ID无效或文件已被删除时抛出 LookupError"""
+        file_id = int(file_id)
+        if file_id < 0 or file_id in self._removed:
+            raise LookupError(file_id)
+        return self.files[file_id]
+
+    def apply_delta(self, delta):
+        """
+        将增量刷新或目录监视得到的变化集合（见 FileProcessor.refresh）应用到文件ID表：
+        修改的文件保持原ID并指向新的 FileInfo，新增的文件追加新的ID，删除的文件ID失效
+        返回 相对路径 -> 文件ID（新增和修改的条目）
+        """
+        with self._delta_lock:
+            if self._ids is None:
+                self._ids = {file_info.path: file_id for file_id, file_info in enumerate(self.files)}
+            files = list(self.files)
+            for path in delta['removed']:
+                file_id = self._ids.pop(path, None)
+                if file_id is not None:
+                    self._removed.add(file_id)
+
+            ids = {}
+            added = []
+            for file_info in delta['modified']:
+                file_id = self._ids.get(file_info.path)
+                if file_id is None:
+                    added.append(file_info)
+                else:
+                    files[file_id] = file_info
+                    ids[file_info.path] = file_id
+            # 目录先于其子项获得ID，列式分页时父条目总在子条目之前
+            for file_info in sorted(added + list(delta['added']), key=file_order_key):
+                ids[file_info.path] = self._ids[file_info.path] = len(files)
+                files.append(file_info)
+
+            self.files = files
+            self._dir_ids = None
+            return ids
+
+    def progress(self):
+        """任务进度摘要"""
+        return {
+            'job_id': self.job_id,
+            'folder': self.folder_path,
+            'status': self.status,
+            'current': self.current,
+            'total': self.total,
+            'error': self.error,
+        }
+
+
+class ScanJobManager:
+    """
+    扫描任务管理器
+    为每次扫描分配任务ID，超过并发上限的任务排队等待，
+    可以按任务查询进度、获取结果和取消
+    """
+
+    def __init__(self, max_concurrent=2, processor_factory=FileProcessor, keep_finished=8):
+        """
+        max_concurrent: 同时运行的扫描任务数上限
+        processor_factory: 为每个任务创建 FileProcessor 的函数
+        keep_finished: 保留结果的已结束任务数，更早的任务自动移除
+        """
+        self.max_concurrent = max_concurrent
+        self.processor_factory = processor_factory
+        self.keep_finished = keep_finished
+        self._jobs = {}  # 任务ID -> ScanJob（按提交顺序）
+        self._queue = deque()  # 等待运行的任务
+        self._running = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, folder_path, callback=None, processor=None, **options):
+        """
+        提交扫描任务并排队运行，返回 ScanJob
+        callback: 进度回调，参数与 process_directory 的回调相同
+        processor: 任务使用的 FileProcessor，为None时新建
+        options: 传给 process_directory 的扫描设置
+        """
+        return self.start(self.create(folder_path, callback, processor, **options))
+
+    def create(self, folder_path, callback=None, processor=None, **options):
+        """创建任务但不运行，调用方可先记录任务ID再调用 start()（回调中需要用到任务ID时）"""
+        with self._lock:
+            job_id = f"scan-{next(self._ids)}"
+            job = ScanJob(job_id, folder_path, options, processor or self.processor_factory(), callback)
+            self._jobs[job_id] = job
+        return job
+
+    def start(self, job):
+        """将 create() 创建的任务加入运行队列"""
+        with self._lock:
+            self._queue.append(job)
+        self._start_queued()
+        return job
+
+    def get(self, job_id):
+        """获取任务，不存在时返回None"""
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        """所有任务的进度摘要"""
+        return [job.progress() for job in list(self._jobs.values())]
+
+    def cancel(self, job_id):
+        """取消任务，排队中的任务直接结束，返回是否找到未结束的任务"""
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_event.set()
+        with self._lock:
+            if job in self._queue:
+                self._queue.remove(job)
+                job.status = 'stopped'
+                job.finished_at = time.time()
+                dequeued = True
+            else:
+                dequeued = False
+        if dequeued and job.callback:
+            job.callback('stopped', 0, 0, None)
+        return True
+
+    def cancel_all(self):
+        """取消所有未结束的任务"""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    def remove(self, job_id):
+        """移除已结束的任务及其结果，返回是否已移除"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.done:
+                return False
+            del self._jobs[job_id]
+            return True
+
+    def _start_queued(self):
+        """在并发上限内启动排队的任务"""
+        while True:
+            with self._lock:
+                if not self._queue or self._running >= self.max_concurrent:
+                    return
+                job = self._queue.popleft()
+                job.status = 'running'
+                self._running += 1
+            options = dict(job.options)
+            options['stop_event'] = job.cancel_event
+            job.thread = job.processor.process_directory(
+                job.folder_path, lambda *args, job=job: self._on_event(job, *args), **options)
+
+    def _on_event(self, job, status, current, total, data):
+        """记录任务进度，任务结束时启动下一个排队的任务"""
+        if status == 'progress':
+            job.current = current
+            job.total = total
+        elif status in ('finished', 'stopped', 'error'):
+            if status == 'finished':
+                job.current = current
+                job.total = total
+                job.results = data
+                job.files = job.processor.files_list
+            elif status == 'error':
+                job.error = data
+            job.status = status
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                self._prune_finished()
+
+        try:
+            if job.callback:
+                job.callback(status, current, total, data)
+        finally:
+            if job.done:
+                self._start_queued()
+
+    def _prune_finished(self):
+        """只保留最近结束的若干个任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
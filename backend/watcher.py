@@ -0,0 +1,330 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from .ignore_rules import IGNORE_FILES
+
+# inotify 事件标志
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def compute_delta(old_list, new_list):
+    """
+    比较两次扫描的文件列表，返回变化部分
+    未变化的条目应复用同一个对象，路径相同但对象不同的条目视为已修改
+    返回: {'added': [...], 'removed': [路径...], 'modified': [...]}
+    """
+    old_by_path = {f.path: f for f in old_list}
+    new_paths = set()
+    added = []
+    modified = []
+    for file_info in new_list:
+        new_paths.add(file_info.path)
+        old = old_by_path.get(file_info.path)
+        if old is None:
+            added.append(file_info)
+        elif old is not file_info:
+            modified.append(file_info)
+    removed = [f.path for f in old_list if f.path not in new_paths]
+    return {'added': added, 'removed': removed, 'modified': modified}
+
+
+def delta_is_empty(delta):
+    """变化集合是否为空"""
+    return not (delta['added'] or delta['removed'] or delta['modified'])
+
+
+def delta_to_dict(delta, ids=None):
+    """
+    将变化集合转换为可JSON序列化的字典
+    ids: 相对路径 -> 文件ID（见 ScanJob.apply_delta），给出时新增和修改的条目附带 'id'
+    """
+    def entry(file_info):
+        data = file_info.to_dict()
+        if ids is not None and file_info.path in ids:
+            data['id'] = ids[file_info.path]
+        return data
+
+    return {
+        'added': [entry(f) for f in delta['added']],
+        'removed': list(delta['removed']),
+        'modified': [entry(f) for f in delta['modified']]
+    }
+
+
+def file_order_key(file_info):
+    """FileInfo 在遍历顺序中的排序键"""
+    parts = file_info.path.split('/')
+    key = [(0, part) for part in parts[:-1]]
+    key.append((0 if file_info.is_dir else 1, parts[-1]))
+    return tuple(key)
+
+
+class _Inotify:
+    """通过ctypes调用Linux inotify接口"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self):
+        """读取所有可用事件，返回 [(wd, mask, name), ...]"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b'\0')
+                offset += name_len
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class DirectoryWatcher:
+    """
+    监视项目目录的变化
+    Linux下使用inotify，其他平台或inotify不可用（如监视数量超过系统上限）时退回定时轮询：
+    轮询只比较各目录及其中文件的修改时间和大小，只报告有变化的目录，不重新扫描整个项目。
+    变化经过短暂的防抖后通过 on_change(dirty_dirs) 通知：
+    dirty_dirs 为发生变化的目录相对路径集合（根目录为空字符串），
+    为None时表示无法确定范围，需要完整重新比对
+    """
+
+    def __init__(self, root, on_change, poll_interval=5.0, debounce=0.2, ignore=None, polling=True):
+        """
+        ignore: 判断 (相对路径, 是否目录) 是否被忽略的函数，被忽略的目录不添加监视
+        polling: inotify不可用时是否退回轮询，为False时不监视（mode 为None）
+        """
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.ignore = ignore
+        self.polling = polling
+        self.poll_interval = poll_interval  # 轮询模式的间隔（秒）
+        self.debounce = debounce  # 合并连续事件的时间窗口（秒）
+        self.mode = None  # 'inotify'、'polling'，或不监视时为None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._watches = {}  # wd -> 相对目录路径
+
+    def start(self):
+        """开始监视"""
+        self._stop_event.clear()
+        self.mode = 'polling' if self.polling else None
+        if sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+                self._add_tree_watches('')
+                self.mode = 'inotify'
+            except OSError:
+                self._close_inotify()
+
+        if self.mode is None:
+            return self
+        target = self._inotify_loop if self.mode == 'inotify' else self._polling_loop
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监视"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        self._close_inotify()
+
+    def _close_inotify(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self._watches = {}
+
+    def _add_tree_watches(self, rel_dir):
+        """为目录及其所有非隐藏子目录添加监视"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            full_path = os.path.join(self.root, current) if current else self.root
+            try:
+                wd = self._inotify.add_watch(full_path, WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # 超过系统的监视数量上限，改用轮询
+                    raise
+                continue
+            self._watches[wd] = current
+            try:
+                with os.scandir(full_path) as it:
+                    for entry in it:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            child = f"{current}/{entry.name}" if current else entry.name
+                            if self.ignore is None or not self.ignore(child, True):
+                                stack.append(child)
+            except OSError:
+                continue
+
+    def _inotify_loop(self):
+        """inotify事件循环"""
+        try:
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._inotify.fd], [], [], 0.5)
+                if not ready:
+                    continue
+
+                # 在防抖窗口内合并事件
+                dirty_dirs = set()
+                deadline = time.monotonic() + self.debounce
+                overflow = False
+                while True:
+                    overflow |= self._collect_events(dirty_dirs)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stop_event.is_set():
+                        break
+                    select.select([self._inotify.fd], [], [], remaining)
+
+                if self._stop_event.is_set():
+                    break
+                if overflow:
+                    self.on_change(None)
+                elif dirty_dirs:
+                    self.on_change(dirty_dirs)
+        except OSError:
+            # inotify不可用时退回轮询
+            if not self._stop_event.is_set():
+                self._close_inotify()
+                self.mode = 'polling' if self.polling else None
+                self.on_change(None)
+                if self.polling:
+                    self._polling_loop()
+
+    def _collect_events(self, dirty_dirs):
+        """读取事件并记录变化的目录，返回是否发生事件队列溢出"""
+        overflow = False
+        for wd, mask, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            rel_dir = self._watches.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & IN_IGNORED:
+                # 被监视的目录已删除
+                self._watches.pop(wd, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # 目录自身被删除或移动，由其父目录负责更新
+                parent = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ''
+                dirty_dirs.add(parent)
+                continue
+            if name.startswith('.') and name not in IGNORE_FILES:  # 隐藏文件不在文件列表中
+                continue
+
+            dirty_dirs.add(rel_dir)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # 新目录需要添加监视
+                child = f"{rel_dir}/{name}" if rel_dir else name
+                if self.ignore is None or not self.ignore(child, True):
+                    self._add_tree_watches(child)
+        return overflow
+
+    def _polling_loop(self):
+        """轮询模式，定期比较目录快照，只报告有变化的目录"""
+        snapshot = self._snapshot()
+        while not self._stop_event.wait(self.poll_interval):
+            current = self._snapshot()
+            dirty_dirs = set()
+            for rel_dir, signature in current.items():
+                if snapshot.get(rel_dir) != signature:
+                    dirty_dirs.add(rel_dir)
+            for rel_dir in snapshot.keys() - current.keys():
+                # 目录已删除，由其父目录负责更新
+                dirty_dirs.add(rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else '')
+            snapshot = current
+            if dirty_dirs and not self._stop_event.is_set():
+                self.on_change(dirty_dirs)
+
+    def _snapshot(self):
+        """
+        记录各非隐藏目录的状态，只调用 scandir/stat，不读取文件内容
+        返回: {相对目录路径: 目录的修改时间及其中文件的 (名称, 修改时间, 大小)}
+        """
+        snapshot = {}
+        stack = ['']
+        while stack and not self._stop_event.is_set():
+            current = stack.pop()
+            full_path = os.path.join(self.root, current) if current else self.root
+            files = []
+            try:
+                mtime = os.stat(full_path).st_mtime_ns
+                with os.scandir(full_path) as it:
+                    for entry in it:
+                        if entry.name.startswith('.') and entry.name not in IGNORE_FILES:
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                child = f"{current}/{entry.name}" if current else entry.name
+                                if not entry.name.startswith('.') and (
+                                        self.ignore is None or not self.ignore(child, True)):
+                                    stack.append(child)
+                            else:
+                                stat = entry.stat()
+                                files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            files.sort()
+            snapshot[current] = (mtime, tuple(files))
+        return snapshot
@@ -0,0 +1,142 @@
+import os
+
+WIRE_VERSION = 1
+
+# flags 字段中每个布尔属性占用的位
+FLAG_DIR = 1
+FLAG_TEXT = 2
+FLAG_CDN = 4
+FLAG_MINIFIED = 8
+FLAG_DATABASE = 16
+FLAG_SELECTED = 32
+# 刷新后已删除的条目：只占据其文件ID，解码时跳过
+FLAG_REMOVED = 64
+
+_FLAG_FIELDS = (
+    (FLAG_DIR, 'is_dir'),
+    (FLAG_TEXT, 'is_text'),
+    (FLAG_CDN, 'is_cdn'),
+    (FLAG_MINIFIED, 'is_minified'),
+    (FLAG_DATABASE, 'is_database'),
+    (FLAG_SELECTED, 'selected'),
+)
+
+
+def _parent_path(path):
+    return path.rsplit('/', 1)[0] if '/' in path else ''
+
+
+def encode_columnar(files, root, offset=0, path_ids=None, removed=None):
+    """
+    将文件列表编码为列式结构，用于传给前端
+    files: FileInfo 列表（通常为 files_list[offset:offset + limit]）
+    root: 扫描的根目录，完整路径由根目录和相对路径拼出
+    offset: files[0] 的文件ID，分页时各列的第i项对应文件ID offset + i
+    path_ids: 目录相对路径 -> 文件ID 的映射，分页时用于引用之前页中的父目录，为None时只在本页内查找
+              （只引用ID小于当前条目的目录，解码时父条目总是先于子条目出现）
+    removed: 已删除条目的文件ID集合，这些条目仍占一行（flags 带 FLAG_REMOVED），使各列与文件ID对齐
+
+    结果中的路径表：names[i] 为相对于父条目的路径（通常是名称），
+    parents[i] 为父条目的文件ID（-1表示根目录）；
+    size、lines、chars 为平行数组，flags 为按位组合的布尔属性，
+    type 为文件类型在 types 表中的下标
+    """
+    path_ids = {} if path_ids is None else path_ids
+    removed = set() if removed is None else removed
+    names = []
+    parents = []
+    sizes = []
+    lines = []
+    chars = []
+    flags = []
+    type_index = {}
+    types = []
+    type_ids = []
+    full_paths = {}  # 无法由根目录和相对路径拼出的完整路径（文件ID -> 完整路径）
+
+    prefix = root.rstrip(os.sep) + os.sep
+    for file_id, file_info in enumerate(files, offset):
+        path = file_info.path
+        # 最近的已编码上级目录作为父条目，名称为相对于它的剩余路径
+        parent = _parent_path(path)
+        while parent and not path_ids.get(parent, file_id) < file_id:
+            parent = _parent_path(parent)
+        parents.append(path_ids[parent] if parent else -1)
+        names.append(path[len(parent) + 1:] if parent else path)
+        is_removed = file_id in removed
+        if file_info.is_dir and not is_removed:
+            path_ids[path] = file_id
+
+        sizes.append(file_info.size)
+        lines.append(file_info.line_count)
+        chars.append(file_info.char_count)
+        bits = 0
+        for bit, field in _FLAG_FIELDS:
+            if getattr(file_info, field):
+                bits |= bit
+        if is_removed:
+            bits |= FLAG_REMOVED
+        flags.append(bits)
+
+        file_type = file_info.file_type
+        index = type_index.get(file_type)
+        if index is None:
+            index = type_index[file_type] = len(types)
+            types.append(file_type)
+        type_ids.append(index)
+
+        if file_info.full_path != prefix + path.replace('/', os.sep):
+            full_paths[file_id] = file_info.full_path
+
+    return {
+        'version': WIRE_VERSION,
+        'root': root,
+        'sep': os.sep,
+        'offset': offset,
+        'count': len(names),
+        'names': names,
+        'parents': parents,
+        'size': sizes,
+        'lines': lines,
+        'chars': chars,
+        'flags': flags,
+        'types': types,
+        'type': type_ids,
+        'full_paths': full_paths,
+    }
+
+
+def decode_columnar(payload, paths=None):
+    """
+    将列式结构还原为与 FileInfo.to_dict 相同键（不含内容）的字典列表，每项附带文件ID 'id'
+    已删除的条目（FLAG_REMOVED）不出现在结果中
+    paths: 文件ID -> 相对路径 的映射，分页解码时用于查找之前页中的父目录
+    """
+    paths = {} if paths is None else paths
+    root = payload['root']
+    sep = payload['sep']
+    full_paths = {int(k): v for k, v in payload.get('full_paths', {}).items()}
+    types = payload['types']
+    files = []
+    for i in range(payload['count']):
+        file_id = payload['offset'] + i
+        parent = payload['parents'][i]
+        name = payload['names'][i]
+        path = f"{paths[parent]}/{name}" if parent >= 0 else name
+        paths[file_id] = path
+        bits = payload['flags'][i]
+        if bits & FLAG_REMOVED:
+            continue
+        data = {
+            'id': file_id,
+            'path': path,
+            'full_path': full_paths.get(file_id) or root.rstrip(sep) + sep + path.replace('/', sep),
+            'size': payload['size'][i],
+            'line_count': payload['lines'][i],
+            'char_count': payload['chars'][i],
+            'file_type': types[payload['type'][i]],
+        }
+        for bit, field in _FLAG_FIELDS:
+            data[field] = bool(bits & bit)
+        files.append(data)
+    return files
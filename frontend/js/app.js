@@ -36,6 +36,27 @@ window.app = (() => {
     let sortKey = 'folder_first';
     let lastMessageTimeout = null;
     let targetRestoreFolder = null;
+    let restoreFilePath = null;  // 从导出文件还原时选择的文件
+    let loadedFolder = null;  // 当前文件树对应的文件夹，用于增量刷新
+    let currentJobId = null;  // 当前文件树对应的扫描任务，文件ID在该任务内有效
+    let contentServer = null;  // 本地内容服务的地址和令牌，大块数据通过 fetch 获取
+
+    let exportStartedAt = 0;  // 当前导出的开始时间，用于计算导出速度
+    let currentExportId = null;  // 正在进行的后端导出，取消导出时使用
+    let exportCancelled = false;  // 当前导出是否已被用户取消
+    let finishedExportId = null;  // 最近完成的导出到文件（完成通知可能早于 export_to_file 返回）
+
+    let previewToken = 0;  // 最近一次预览请求的序号，用于丢弃过期的响应
+
+    // 每次从后端获取的文件条目数
+    const FILES_PAGE_SIZE = 20000;
+    // 预览时向前、向后各预取的文本文件数
+    const PREFETCH_NEIGHBOURS = 2;
+    // 超过该行数的文件分段预览，每段的行数
+    const WINDOWED_PREVIEW_LINES = 5000;
+    const PREVIEW_WINDOW_LINES = 500;
+    // 预览的编码：'tokens' 为紧凑的词法单元流（由查看器生成DOM和行号），'html' 为 Pygments 的HTML
+    const PREVIEW_FORMAT = 'tokens';
 
     // DOM元素引用
     const elements = {
@@ -47,6 +68,7 @@ window.app = (() => {
         newBtn: document.getElementById('newBtn'),
         copySelectedBtn: document.getElementById('copySelectedBtn'),
         copyStructureBtn: document.getElementById('copyStructureBtn'),
+        exportFileBtn: document.getElementById('exportFileBtn'),
         restoreBtn: document.getElementById('restoreBtn'),
         historyBtn: document.getElementById('historyBtn'),
         sortDropdown: document.getElementById('sortDropdown'),
@@ -68,6 +90,7 @@ window.app = (() => {
         copyContentBtn: document.getElementById('copyContentBtn'),
         codeContainer: document.getElementById('codeContainer'),
         statusMessage: document.getElementById('statusMessage'),
+        cancelExportBtn: document.getElementById('cancelExportBtn'),
         statsInfo: document.getElementById('statsInfo'),
         progressContainer: document.querySelector('.progress-container'),
         progressInner: document.getElementById('progressInner'),
@@ -87,6 +110,7 @@ window.app = (() => {
         restoreProjectConfirm: document.getElementById('restoreProjectConfirm'),
         restoreProjectText: document.getElementById('restoreProjectText'),
         pasteFromClipboardBtn: document.getElementById('pasteFromClipboardBtn'),
+        openProjectFileBtn: document.getElementById('openProjectFileBtn'),
         selectTargetFolderBtn: document.getElementById('selectTargetFolderBtn')
     };
 
@@ -105,6 +129,8 @@ window.app = (() => {
             codeContainer: elements.codeContainer,
             copyBtn: elements.copyContentBtn
         });
+        // 按文件ID预览的文件没有随预览传回内容，复制时再获取
+        fileViewer.setContentLoader(file => canFetchById(file) ? fetchFileText(file) : Promise.resolve(''));
 
         // 添加事件监听器
         addEventListeners();
@@ -112,6 +138,9 @@ window.app = (() => {
         // 加载历史记录
         loadHistory();
 
+        // 获取本地内容服务的地址
+        connectContentServer();
+
         // 更新文件类型下拉框
         updateFileTypesDropdown([]);
 
@@ -130,8 +159,10 @@ window.app = (() => {
         // 工具栏按钮
         elements.newBtn.addEventListener('click', clearAll);
         elements.copySelectedBtn.addEventListener('click', copySelectedToClipboard);
+        elements.exportFileBtn.addEventListener('click', exportSelectedToFile);
         elements.copyStructureBtn.addEventListener('click', copyStructureToClipboard);
         elements.restoreBtn.addEventListener('click', restoreProject);
+        elements.cancelExportBtn.addEventListener('click', cancelExport);
         elements.historyBtn.addEventListener('click', showHistory);
         elements.aboutBtn.addEventListener('click', showAbout);
         elements.sortDropdown.addEventListener('change', sortFiles);
@@ -161,6 +192,7 @@ window.app = (() => {
         elements.restoreProjectCancel.addEventListener('click', hideRestoreProjectModal);
         elements.pasteFromClipboardBtn.addEventListener('click', pasteFromClipboard);
         elements.selectTargetFolderBtn.addEventListener('click', selectRestoreTargetFolder);
+        elements.openProjectFileBtn.addEventListener('click', selectRestoreProjectFile);
         elements.restoreProjectConfirm.addEventListener('click', executeProjectRestore);
 
         // 文件树事件
@@ -219,6 +251,12 @@ window.app = (() => {
             return;
         }
 
+        // 已加载的文件夹只刷新变化的部分
+        if (filesList.length > 0 && folderPath === loadedFolder) {
+            await refreshCurrentFolder();
+            return;
+        }
+
         // 清除现有内容
         clearAll();
 
@@ -229,10 +267,20 @@ window.app = (() => {
         showStatusMessage('正在分析文件结构...', 0);
 
         try {
-            const result = await window.pywebview.api.process_folder(folderPath);
+            // 只扫描元数据，文件内容在预览或复制时按需加载；未变化的文件复用扫描缓存
+            const result = await window.pywebview.api.process_folder(folderPath, {
+                metadata_only: true,
+                use_cache: true,
+                watch: true,
+                ignore: true,
+                line_index: true,  // 统计换行时顺便记录行首位置，大文件分段预览直接定位
+                progress_interval: 0.1  // 进度条每100毫秒更新一次即可
+            });
             if (result.status === 'error') {
                 showModal('错误', result.message, 'error');
                 resetProgressUI();
+            } else {
+                loadedFolder = folderPath;
             }
         } catch (error) {
             console.error('Failed to process folder:', error);
@@ -241,6 +289,62 @@ window.app = (() => {
         }
     };
 
+    // 增量刷新当前文件夹
+    const refreshCurrentFolder = async () => {
+        showStatusMessage('正在检查文件变化...', 0);
+        try {
+            const result = await window.pywebview.api.refresh_folder();
+            if (result.status === 'error') {
+                showModal('错误', result.message, 'error');
+                return;
+            }
+            const delta = result.delta;
+            if (delta.added.length === 0 && delta.removed.length === 0 && delta.modified.length === 0) {
+                showStatusMessage('文件没有变化', 2000);
+            } else {
+                applyDelta(delta);
+            }
+        } catch (error) {
+            console.error('Failed to refresh folder:', error);
+            showModal('错误', '刷新文件夹时发生错误', 'error');
+        }
+    };
+
+    // 应用文件变化
+    const applyDelta = (delta) => {
+        if (filesList.length === 0) return;
+
+        // 更新文件列表（删除的目录已包含其所有子项），新增的文件按遍历顺序插入，与重新扫描的顺序一致
+        const removed = new Set(delta.removed);
+        const isRemoved = (path) => removed.has(path);
+        const modified = new Map(delta.modified.map(file => [file.path, file]));
+        filesList = FileTreeComponent.mergeWalkOrder(
+            filesList
+                .filter(file => !isRemoved(file.path))
+                .map(file => modified.get(file.path) || file),
+            delta.added);
+
+        // 更新文件树
+        fileTree.applyDelta(delta);
+
+        // 更新选中的文件和当前预览
+        selectedFiles = fileTree.getSelectedFiles();
+        const currentFile = fileViewer.currentFile;
+        if (currentFile) {
+            if (isRemoved(currentFile.path)) {
+                fileViewer.clear();
+            } else if (modified.has(currentFile.path)) {
+                previewFile(modified.get(currentFile.path));
+            }
+        }
+
+        updateFileTypesDropdown(filesList);
+        updateStats();
+
+        const changed = delta.added.length + delta.removed.length + delta.modified.length;
+        showStatusMessage(`文件已更新: ${changed} 项变化`, 3000);
+    };
+
     // 停止处理
     const stopProcessing = async () => {
         try {
@@ -258,13 +362,22 @@ window.app = (() => {
         showStatusMessage(`处理文件 ${current}/${total}...`, 0);
     };
 
-    // 处理完成
-    const processComplete = (filesData) => {
+    // 处理完成：只收到任务句柄和统计，文件列表分页获取（不含文件内容）
+    const processComplete = async (summary) => {
+        let filesData;
+        try {
+            filesData = await loadFilesPages(summary);
+        } catch (error) {
+            processError(error.message || String(error));
+            return;
+        }
+
         // 恢复UI
         resetProgressUI();
 
         // 保存文件列表
         filesList = filesData;
+        currentJobId = summary.job_id;
 
         // 构建文件树
         buildFileTree();
@@ -278,9 +391,43 @@ window.app = (() => {
         // 更新统计信息
         updateStats();
 
-        // 显示结果信息
-        const textFiles = filesList.filter(f => !f.is_dir && f.is_text);
-        showStatusMessage(`文件结构生成成功，共${textFiles.length}个文本文件`, 5000);
+        // 显示结果信息，列出被忽略规则跳过和列举超时的目录
+        let message = `文件结构生成成功，共${summary.text_files}个文本文件`;
+        if (summary.ignored_count > 0) {
+            message += `，已忽略 ${summary.ignored_count} 个目录: ${summary.ignored_dirs.slice(0, 5).join(', ')}` +
+                (summary.ignored_count > 5 ? ' 等' : '');
+            console.info('Ignored directories:', summary.ignored_dirs);
+        }
+        if (summary.timed_out_count > 0) {
+            message += `，${summary.timed_out_count} 个目录列举超时被跳过: ${summary.timed_out_dirs.slice(0, 5).join(', ')}` +
+                (summary.timed_out_count > 5 ? ' 等' : '');
+            console.warn('Timed out directories:', summary.timed_out_dirs);
+        }
+        showStatusMessage(message, 8000);
+    };
+
+    // 分页获取扫描结果（列式格式，解码为文件对象）
+    // 按文件ID分页直到 total：已删除的ID仍占一行（解码时跳过），刷新新增的ID排在最后
+    const loadFilesPages = async (summary) => {
+        const files = [];
+        const paths = [];
+        let offset = 0;
+        while (true) {
+            const page = await window.pywebview.api.get_files_columnar(summary.job_id, offset, FILES_PAGE_SIZE);
+            if (page.status !== 'success') {
+                throw new Error(page.message || page.error || '获取文件列表失败');
+            }
+            if (page.count === 0) {
+                break;
+            }
+            offset += page.count;
+            files.push(...FileTreeComponent.decodeColumnar(page, paths));
+            showStatusMessage(`加载文件列表 ${files.length}/${summary.count}...`, 0);
+            if (offset >= page.total) {
+                break;
+            }
+        }
+        return files;
     };
 
     // 处理错误
@@ -532,11 +679,47 @@ window.app = (() => {
     // 预览文件
     const previewFile = async (file) => {
         if (!file || file.is_dir) return;
+        const token = ++previewToken;
+        if (!file.is_text && window.pywebview) {
+            // 放弃上一个文件尚未完成的高亮
+            window.pywebview.api.cancel_preview().catch(() => {});
+        }
+
+        // 大文件只高亮可见的行，滚动时再获取后续的行
+        if (file.is_text && canFetchById(file) && file.line_count > WINDOWED_PREVIEW_LINES) {
+            const jobId = currentJobId;
+            fileViewer.displayWindowedFile(file, (start, count) => fetchPreviewWindow(jobId, file, start, count),
+                PREVIEW_WINDOW_LINES);
+            return;
+        }
+
+        // 扫描结果中的文件按任务和文件ID请求预览，后端使用自己缓存的内容，不经桥接回传文件内容
+        if (file.is_text && canFetchById(file)) {
+            try {
+                const response = await fetch(`${contentUrl('preview', currentJobId, file.id)}&format=${PREVIEW_FORMAT}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const preview = await response.json();
+                if (token !== previewToken) return;  // 已切换到其他文件
+                if (preview.format === 'tokens') {
+                    fileViewer.displayTokens(file, preview);
+                } else {
+                    fileViewer.displayFile(file, preview.highlighted_code, preview.css);
+                }
+                prefetchNeighbours(file);
+                return;
+            } catch (error) {
+                if (token !== previewToken) return;  // 已被新的预览取消
+                console.error('Failed to fetch preview:', error);
+            }
+        }
 
         // 如果文件内容还不完整，从后端获取
         if (!file.content && file.is_text) {
             try {
                 const result = await window.pywebview.api.get_file_content(file.full_path);
+                if (token !== previewToken) return;  // 已切换到其他文件
                 if (result.status === 'success') {
                     file.content = result.file_info.content;
                     fileViewer.displayFile(file, result.highlighted_code, result.css);
@@ -552,6 +735,7 @@ window.app = (() => {
             // 使用现有内容
             try {
                 const highlight = await window.pywebview.api.highlight_code(file.content, file.path);
+                if (token !== previewToken) return;  // 已切换到其他文件
                 fileViewer.displayFile(file, highlight.highlighted_code, highlight.css);
             } catch (error) {
                 console.error('Failed to highlight code:', error);
@@ -560,6 +744,39 @@ window.app = (() => {
         }
     };
 
+    // 获取文件第start行起count行的高亮结果（从0开始）
+    const fetchPreviewWindow = async (jobId, file, start, count) => {
+        const response = await fetch(
+            `${contentUrl('window', jobId, file.id)}&start=${start}&count=${count}&format=${PREVIEW_FORMAT}`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    };
+
+    // 预取前后相邻文本文件的预览，切换到它们时无需等待高亮
+    const prefetchNeighbours = (file) => {
+        const index = filesList.indexOf(file);
+        if (index < 0) return;
+        const ids = [];
+        for (const step of [1, -1]) {
+            let found = 0;
+            for (let i = index + step; i >= 0 && i < filesList.length && found < PREFETCH_NEIGHBOURS; i += step) {
+                const neighbour = filesList[i];
+                if (!neighbour.is_dir && neighbour.is_text && neighbour.id !== undefined &&
+                    neighbour.line_count <= WINDOWED_PREVIEW_LINES) {
+                    ids.push(neighbour.id);
+                    found++;
+                }
+            }
+        }
+        if (ids.length > 0) {
+            window.pywebview.api.prefetch_previews(currentJobId, ids, PREVIEW_FORMAT).catch(error => {
+                console.error('Failed to prefetch previews:', error);
+            });
+        }
+    };
+
     // 更新统计信息
     const updateStats = () => {
         if (filesList.length === 0) {
@@ -592,6 +809,7 @@ window.app = (() => {
     // 清除所有内容
     const clearAll = () => {
         filesList = [];
+        loadedFolder = null;
         selectedFiles = [];
         fileTree.clear();
         fileViewer.clear();
@@ -600,22 +818,177 @@ window.app = (() => {
     };
 
     // 复制选中文件到剪贴板
-    const copySelectedToClipboard = () => {
+    const copySelectedToClipboard = async () => {
         if (selectedFiles.length === 0) {
             showModal('警告', '请先选择要复制的文件（在文件树中点击文件名选择）', 'warning');
             return;
         }
 
+        // 扫描结果中的文件由后端从磁盘流式导出，页面只接收最终文本
+        if (selectedFiles.every(canFetchById)) {
+            if (currentExportId !== null) {
+                showModal('警告', '已有导出正在进行，请等待完成或取消后再试', 'warning');
+                return;
+            }
+            let exportText;
+            try {
+                exportText = await exportFromBackend(selectedFiles);
+            } catch (error) {
+                if (exportCancelled) {
+                    showStatusMessage('导出已取消', 3000);
+                } else {
+                    console.error('Failed to export:', error);
+                    showModal('错误', '导出文件内容失败', 'error');
+                }
+                return;
+            } finally {
+                resetExportUI();
+            }
+            writeExportToClipboard(exportText);
+            return;
+        }
+
+        // 获取尚未加载的文件内容，有文件ID的通过内容服务获取，其余经桥接获取
+        const missingFiles = selectedFiles.filter(file => !file.content && file.is_text);
+        const fetchable = missingFiles.filter(canFetchById);
+        const missingPaths = missingFiles.filter(file => !canFetchById(file)).map(file => file.full_path);
+        let loadedContents = {};
+        if (missingFiles.length > 0) {
+            try {
+                showStatusMessage('正在读取文件内容...', 0);
+                const texts = await Promise.all(fetchable.map(fetchFileText));
+                fetchable.forEach((file, index) => {
+                    loadedContents[file.full_path] = texts[index];
+                });
+                if (missingPaths.length > 0) {
+                    Object.assign(loadedContents, await window.pywebview.api.get_files_content(missingPaths));
+                }
+            } catch (error) {
+                console.error('Failed to load file contents:', error);
+                showModal('错误', '读取文件内容失败', 'error');
+                return;
+            }
+        }
+
         // 获取文件结构
         const structureText = getStructureText();
-        let clipboardText = `文件结构:\n\n${structureText}\n\n文件内容:\n\n`;
+        const parts = [`文件结构:\n\n${structureText}\n\n文件内容:\n\n`];
 
         // 添加文件内容到剪贴板文本
         selectedFiles.forEach(file => {
-            clipboardText += `--- ${file.path} (${file.line_count}行) ---\n${file.content}\n\n`;
+            const content = file.content || loadedContents[file.full_path] || '';
+            parts.push(`--- ${file.path} (${file.line_count}行) ---\n${content}\n\n`);
         });
+        writeExportToClipboard(parts.join(''));
+    };
 
-        // 复制到剪贴板
+    // 通过后端导出引擎生成导出文本
+    const exportFromBackend = async (files) => {
+        showStatusMessage('正在导出文件内容...', 0);
+        exportStartedAt = Date.now();
+        const result = await window.pywebview.api.start_export(
+            currentJobId, files.map(file => file.id), getStructureText());
+        if (result.status !== 'success') {
+            throw new Error(result.message);
+        }
+        beginExportUI(result.export_id);
+        const response = await fetch(result.url);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.text();
+    };
+
+    // 显示取消导出按钮
+    const beginExportUI = (exportId) => {
+        if (exportId === finishedExportId) {
+            return;
+        }
+        currentExportId = exportId;
+        exportCancelled = false;
+        elements.cancelExportBtn.style.display = 'block';
+    };
+
+    // 导出结束后隐藏取消导出按钮
+    const resetExportUI = () => {
+        currentExportId = null;
+        elements.cancelExportBtn.style.display = 'none';
+    };
+
+    // 取消正在进行的导出（流式导出的响应提前结束，导出到文件时删除未完成的文件）
+    const cancelExport = async () => {
+        if (currentExportId === null) {
+            return;
+        }
+        exportCancelled = true;
+        elements.cancelExportBtn.style.display = 'none';
+        showStatusMessage('正在取消导出...', 0);
+        try {
+            await window.pywebview.api.cancel_export(currentExportId);
+        } catch (error) {
+            console.error('Failed to cancel export:', error);
+        }
+    };
+
+    // 导出进度
+    const updateExportProgress = (done, total, chars) => {
+        const seconds = (Date.now() - exportStartedAt) / 1000;
+        const rate = seconds > 0 ? `，${formatFileSize(chars / seconds)}/秒` : '';
+        showStatusMessage(`正在导出文件内容 ${done}/${total}（${chars} 个字符${rate}）...`, 0);
+    };
+
+    // 导出选中文件到文件（后台流式写出，文件名以 .gz/.xz 结尾时压缩）
+    const exportSelectedToFile = async () => {
+        if (selectedFiles.length === 0) {
+            showModal('警告', '请先选择要导出的文件（在文件树中点击文件名选择）', 'warning');
+            return;
+        }
+        if (currentJobId === null) {
+            showModal('警告', '文件列表尚未加载完成，请稍后再试', 'warning');
+            return;
+        }
+        if (currentExportId !== null) {
+            showModal('警告', '已有导出正在进行，请等待完成或取消后再试', 'warning');
+            return;
+        }
+
+        try {
+            exportStartedAt = Date.now();
+            const result = await window.pywebview.api.export_to_file(
+                currentJobId, selectedFiles.map(file => file.id), getStructureText(), null);
+            if (result.status === 'processing') {
+                beginExportUI(result.export_id);
+                showStatusMessage(`正在导出到 ${result.path}...`, 0);
+            } else if (result.status === 'error') {
+                showModal('错误', `导出失败: ${result.message}`, 'error');
+            }
+        } catch (error) {
+            console.error('Failed to export to file:', error);
+            showModal('错误', '导出到文件失败', 'error');
+        }
+    };
+
+    // 导出到文件完成
+    const exportFileComplete = (result) => {
+        finishedExportId = result.export_id;
+        resetExportUI();
+        if (result.status === 'success') {
+            showModal(
+                '导出成功',
+                `已将${result.files}个文件的内容导出到:<br>${result.path}<br>` +
+                `${result.chars} 个字符，文件大小 ${formatFileSize(result.bytes)}，` +
+                `用时 ${result.seconds.toFixed(1)} 秒（${formatFileSize(result.throughput)}/秒）。`,
+                'success'
+            );
+        } else if (result.status === 'stopped') {
+            showStatusMessage('导出已取消', 3000);
+        } else {
+            showModal('错误', `导出失败: ${result.message}`, 'error');
+        }
+    };
+
+    // 将导出文本写入剪贴板
+    const writeExportToClipboard = (clipboardText) => {
         navigator.clipboard.writeText(clipboardText).then(() => {
             showModal(
                 '复制成功',
@@ -708,6 +1081,35 @@ window.app = (() => {
     };
 
     // 加载历史记录
+    // 获取本地内容服务的地址和令牌
+    const connectContentServer = async () => {
+        try {
+            await ensureAPIReady();
+            contentServer = await window.pywebview.api.get_content_server();
+        } catch (error) {
+            console.error('Content server unavailable:', error);
+            contentServer = null;
+        }
+    };
+
+    // 内容服务的资源URL
+    const contentUrl = (route, ...parts) => {
+        const path = [route, ...parts].map(part => encodeURIComponent(part)).join('/');
+        return `${contentServer.base_url}/${path}?token=${encodeURIComponent(contentServer.token)}`;
+    };
+
+    // 文件能否通过内容服务按文件ID获取
+    const canFetchById = (file) => contentServer !== null && currentJobId !== null && file.id !== undefined;
+
+    // 通过内容服务获取文件的文本内容（按扫描时的方式解码）
+    const fetchFileText = async (file) => {
+        const response = await fetch(contentUrl('text', currentJobId, file.id));
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.text();
+    };
+
     const loadHistory = async () => {
         try {
             await ensureAPIReady();
@@ -823,7 +1225,9 @@ window.app = (() => {
     // 还原项目对话框
     const restoreProject = () => {
         elements.restoreProjectText.value = '';
+        elements.restoreProjectText.placeholder = '';
         targetRestoreFolder = null;
+        restoreFilePath = null;
         elements.restoreProjectModal.style.display = 'flex';
     };
 
@@ -844,6 +1248,22 @@ window.app = (() => {
         }
     };
 
+    // 选择导出文件（支持 .gz/.xz 压缩文件），还原时由后端直接读取
+    const selectRestoreProjectFile = async () => {
+        try {
+            const result = await window.pywebview.api.browse_project_file();
+            if (result) {
+                restoreFilePath = result;
+                elements.restoreProjectText.value = '';
+                elements.restoreProjectText.placeholder = `将从文件还原: ${result}`;
+                showStatusMessage(`已选择项目文件: ${result}`, 2000);
+            }
+        } catch (error) {
+            console.error('Failed to browse project file:', error);
+            showStatusMessage('选择项目文件失败', 3000);
+        }
+    };
+
     // 选择目标文件夹
     const selectRestoreTargetFolder = async () => {
         try {
@@ -861,8 +1281,8 @@ window.app = (() => {
     // 执行项目还原
     const executeProjectRestore = async () => {
         const textContent = elements.restoreProjectText.value.trim();
-        if (!textContent) {
-            showModal('错误', '请先粘贴项目文本内容', 'error');
+        if (!textContent && !restoreFilePath) {
+            showModal('错误', '请先粘贴项目文本内容或选择项目文件', 'error');
             return;
         }
 
@@ -880,8 +1300,12 @@ window.app = (() => {
             // 隐藏对话框
             hideRestoreProjectModal();
 
-            // 调用后端API
-            await window.pywebview.api.restore_project_from_text(textContent, targetRestoreFolder);
+            // 调用后端API，粘贴的文本优先于选择的文件
+            if (textContent) {
+                await window.pywebview.api.restore_project_from_text(textContent, targetRestoreFolder);
+            } else {
+                await window.pywebview.api.restore_project_from_file(restoreFilePath, targetRestoreFolder);
+            }
         } catch (error) {
             console.error('Failed to restore project:', error);
             showModal('错误', '还原项目时发生错误', 'error');
@@ -901,6 +1325,11 @@ window.app = (() => {
         // 恢复UI
         resetProgressUI();
 
+        if (result.status === 'error') {
+            showModal('错误', result.message, 'error');
+            return;
+        }
+
         if (result.missing_content && result.missing_content.length > 0) {
             // 构建缺少内容文件列表
             const missingFiles = result.missing_content.filter(file => !file.startsWith('跳过'));
@@ -941,6 +1370,9 @@ window.app = (() => {
         processComplete,
         processError,
         processStopped,
+        applyDelta,
+        updateExportProgress,
+        exportFileComplete,
         formatFileSize,
         showStatusMessage,
         updateRestoreProgress,
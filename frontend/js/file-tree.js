@@ -4,6 +4,96 @@
  */
 class FileTreeComponent {
 
+    // 列式文件列表中 flags 字段的位，与 backend/wire_format.py 一致
+    static FLAG_FIELDS = [
+        [1, 'is_dir'], [2, 'is_text'], [4, 'is_cdn'],
+        [8, 'is_minified'], [16, 'is_database'], [32, 'selected']
+    ];
+    // 刷新后已删除的条目只占据其文件ID，解码时跳过
+    static FLAG_REMOVED = 64;
+
+    /**
+     * 将后端的列式文件列表还原为文件对象数组
+     * @param {Object} payload - get_files_columnar 的返回结果
+     * @param {Array} paths - 文件ID -> 相对路径，分页解码时在各页之间共用，用于查找之前页中的父目录
+     * @returns {Array} 文件对象（与 get_files_page 的条目相同，含文件ID id，不含已删除的条目）
+     */
+    static decodeColumnar(payload, paths = []) {
+        const {offset, count, names, parents, size, lines, chars, flags, types, type, sep} = payload;
+        const fullPaths = payload.full_paths || {};
+        let root = payload.root;
+        while (root.endsWith(sep)) {
+            root = root.slice(0, -1);
+        }
+        const rootPrefix = root + sep;
+        const files = [];
+        for (let i = 0; i < count; i++) {
+            const id = offset + i;
+            const parent = parents[i];
+            const path = parent >= 0 ? `${paths[parent]}/${names[i]}` : names[i];
+            paths[id] = path;
+            const bits = flags[i];
+            if (bits & FileTreeComponent.FLAG_REMOVED) {
+                continue;
+            }
+            const file = {
+                id,
+                path,
+                full_path: fullPaths[id] || rootPrefix + (sep === '/' ? path : path.split('/').join(sep)),
+                size: size[i],
+                line_count: lines[i],
+                char_count: chars[i],
+                file_type: types[type[i]]
+            };
+            for (const [bit, field] of FileTreeComponent.FLAG_FIELDS) {
+                file[field] = (bits & bit) !== 0;
+            }
+            files.push(file);
+        }
+        return files;
+    }
+
+    /**
+     * 按扫描的遍历顺序比较两个文件，与 backend/watcher.py 的 file_order_key 一致：
+     * 逐级比较路径，同一目录下目录在前、文件在后，各自按名称排序，目录的子项紧随其后
+     * @returns {number} 负数表示 a 在 b 之前
+     */
+    static compareWalkOrder(a, b) {
+        const partsA = a.path.split('/');
+        const partsB = b.path.split('/');
+        const depth = Math.min(partsA.length, partsB.length);
+        for (let i = 0; i < depth; i++) {
+            const kindA = i < partsA.length - 1 || a.is_dir ? 0 : 1;
+            const kindB = i < partsB.length - 1 || b.is_dir ? 0 : 1;
+            if (kindA !== kindB) {
+                return kindA - kindB;
+            }
+            if (partsA[i] !== partsB[i]) {
+                return partsA[i] < partsB[i] ? -1 : 1;
+            }
+        }
+        return partsA.length - partsB.length;
+    }
+
+    /**
+     * 将新增的文件按遍历顺序合并到已按遍历顺序排列的列表中
+     * @param {Array} files - 按遍历顺序排列的文件列表
+     * @param {Array} added - 新增的文件
+     * @returns {Array} 合并后的新列表，与重新扫描得到的顺序相同
+     */
+    static mergeWalkOrder(files, added) {
+        const sorted = [...added].sort(FileTreeComponent.compareWalkOrder);
+        const merged = [];
+        let next = 0;
+        for (const file of files) {
+            while (next < sorted.length && FileTreeComponent.compareWalkOrder(sorted[next], file) < 0) {
+                merged.push(sorted[next++]);
+            }
+            merged.push(file);
+        }
+        return merged.concat(sorted.slice(next));
+    }
+
     constructor(container) {
         this.container = container;
         this.nodeMap = new Map();  // 节点映射，用于快速查找
@@ -173,6 +263,73 @@ class FileTreeComponent {
         this.container.appendChild(rootNode);
     }
 
+    /**
+     * 增量更新树，只处理新增、删除和修改的节点
+     * @param {Object} delta - 变化集合 {added, removed, modified}
+     */
+    applyDelta(delta) {
+        const rootNode = this.container.querySelector('.tree-root');
+        if (!rootNode) return;
+
+        // 删除节点（删除的目录已包含其所有子项）
+        const removed = new Set(delta.removed);
+        delta.removed.forEach(path => {
+            const nodeData = this.nodeMap.get(path);
+            if (nodeData) {
+                nodeData.node.remove();
+                this.nodeMap.delete(path);
+            }
+        });
+        this.files = this.files.filter(file => !removed.has(file.path));
+
+        // 修改节点，保留选择状态
+        delta.modified.forEach(file => {
+            const nodeData = this.nodeMap.get(file.path);
+            if (!nodeData) return;
+
+            file.selected = nodeData.data.selected;
+            const fileNode = this.createFileNode(file, file.path.split('/').pop());
+            nodeData.node.replaceWith(fileNode);
+            this.nodeMap.set(file.path, {node: fileNode, data: file});
+        });
+        const modified = new Map(delta.modified.map(file => [file.path, file]));
+        this.files = this.files.map(f => modified.get(f.path) || f);
+
+        // 新增节点，目录先于其子项插入
+        const added = this.sortFiles(delta.added, 'folder_first');
+        added.forEach(file => {
+            const parts = file.path.split('/');
+            const name = parts[parts.length - 1];
+            const parentPath = parts.slice(0, -1).join('/');
+            const parentData = parentPath ? this.nodeMap.get(parentPath) : null;
+            const parentFolder = parentData ? parentData.node.querySelector('.tree-folder') : rootNode;
+
+            const node = file.is_dir ? this.createDirNode(file, name) : this.createFileNode(file, name);
+            this._insertSorted(parentFolder, node, file);
+            this.nodeMap.set(file.path, {node, data: file});
+        });
+        this.files = FileTreeComponent.mergeWalkOrder(this.files, delta.added);
+    }
+
+    /**
+     * 按当前排序方式将节点插入到父容器中
+     * @param {HTMLElement} parentFolder - 父容器
+     * @param {HTMLElement} node - 新节点
+     * @param {Object} file - 新节点的文件信息
+     */
+    _insertSorted(parentFolder, node, file) {
+        const siblings = Array.from(parentFolder.children)
+            .filter(n => n.classList && n.classList.contains('tree-node'));
+        for (const sibling of siblings) {
+            const siblingData = this.nodeMap.get(sibling.dataset.path);
+            if (siblingData && this.sortFiles([file, siblingData.data], this.sortKey)[0] === file) {
+                parentFolder.insertBefore(node, sibling);
+                return;
+            }
+        }
+        parentFolder.appendChild(node);
+    }
+
     /**
      * 创建目录节点
      * @param {Object} dirInfo - 目录信息
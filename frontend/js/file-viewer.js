@@ -6,9 +6,27 @@ class FileViewer {
     constructor(elements) {
         this.elements = elements;
         this.currentFile = null;
+        this.contentLoader = null;  // 文件对象没有内容时用于获取内容的函数
+        this.windowState = null;  // 分段预览的状态（大文件只高亮可见的行，滚动时继续获取）
 
         // 初始化复制按钮事件
         this.elements.copyBtn.addEventListener('click', () => this.copyContent());
+
+        // 分段预览时滚动到接近底部继续获取下一段
+        this.elements.codeContainer.addEventListener('scroll', () => {
+            const container = this.elements.codeContainer;
+            if (this.windowState && container.scrollTop + container.clientHeight >= container.scrollHeight - 400) {
+                this.loadNextWindow();
+            }
+        });
+    }
+
+    /**
+     * 设置获取文件内容的函数（预览时未传回内容的文件在复制时使用）
+     * @param {Function} loader - 参数为文件信息，返回内容的Promise
+     */
+    setContentLoader(loader) {
+        this.contentLoader = loader;
     }
 
     /**
@@ -20,7 +38,182 @@ class FileViewer {
     displayFile(file, highlightedCode = null, css = null) {
         if (!file) return;
 
+        this.showFileInfo(file);
+
+        // 显示文件内容
+        if (file.is_text) {
+            // 如果有高亮代码，使用高亮显示，否则使用普通文本
+            if (highlightedCode) {
+                this.setHighlightStyles(css);
+
+                // 设置高亮HTML
+                this.elements.codeContainer.innerHTML = highlightedCode;
+            } else {
+                // 使用预格式化文本显示
+                this.elements.codeContainer.innerHTML = `
+                    <pre style="margin:0;padding:10px;white-space:pre-wrap;word-break:break-all;">${this.escapeHtml(file.content || '')}</pre>
+                `;
+            }
+        } else {
+            // 如果不是文本文件
+            this.elements.codeContainer.innerHTML = `
+                <div style="padding:20px;text-align:center;color:var(--text-secondary);">
+                    <i class="fas fa-file-alt" style="font-size:32px;margin-bottom:10px;"></i>
+                    <p>此文件不是文本文件或无法显示内容</p>
+                </div>
+            `;
+        }
+    }
+
+    /**
+     * 显示词法单元流格式的预览（见 renderTokens）
+     * @param {Object} file - 文件信息
+     * @param {Object} preview - {classes, lines, text, css, skipped}
+     */
+    displayTokens(file, preview) {
+        if (!file) return;
+
+        this.showFileInfo(file);
+        this.setHighlightStyles(preview.css);
+        this.elements.codeContainer.innerHTML = '';
+        this.elements.codeContainer.appendChild(this.renderTokens(preview));
+    }
+
+    /**
+     * 分段显示大文件：先显示第一段，滚动到接近底部时再获取后续的行
+     * @param {Object} file - 文件信息
+     * @param {Function} loadWindow - 参数为 (起始行, 行数)（从0开始），
+     *     返回 {start, count, total_lines, highlighted_code, css} 的Promise
+     *     （或以词法单元流代替 highlighted_code，format 为 'tokens'）
+     * @param {number} windowLines - 每次获取的行数
+     */
+    displayWindowedFile(file, loadWindow, windowLines = 500) {
+        if (!file) return;
+
+        this.showFileInfo(file);
+        this.elements.codeContainer.innerHTML = '';
+        this.elements.codeContainer.scrollTop = 0;
+        this.windowState = { file, loadWindow, windowLines, next: 0, total: null, loading: false };
+        return this.loadNextWindow();
+    }
+
+    /**
+     * 获取并追加下一段高亮的行
+     */
+    async loadNextWindow() {
+        const state = this.windowState;
+        if (!state || state.loading || (state.total !== null && state.next >= state.total)) return;
+
+        state.loading = true;
+        let result;
+        try {
+            result = await state.loadWindow(state.next, state.windowLines);
+        } catch (err) {
+            console.error('Failed to load lines:', err);
+            if (this.windowState === state) {
+                state.loading = false;
+                this.elements.codeContainer.insertAdjacentHTML('beforeend', `
+                    <div style="padding:10px;color:var(--text-secondary);">无法获取第 ${state.next + 1} 行之后的内容</div>
+                `);
+                this.windowState = null;
+            }
+            return;
+        }
+        if (this.windowState !== state) return;  // 已切换到其他文件
+
+        if (state.total === null) {
+            this.setHighlightStyles(result.css);
+        }
+        if (result.format === 'tokens') {
+            this.elements.codeContainer.appendChild(this.renderTokens(result));
+        } else {
+            this.elements.codeContainer.insertAdjacentHTML('beforeend', result.highlighted_code);
+        }
+        state.total = result.total_lines;
+        state.next = result.start + Math.max(result.count, 1);
+        state.loading = false;
+
+        // 内容还不足以滚动时继续获取
+        const container = this.elements.codeContainer;
+        if (container.scrollHeight <= container.clientHeight + 400) {
+            this.loadNextWindow();
+        }
+    }
+
+    /**
+     * 由词法单元流生成高亮代码的DOM，不经HTML解析
+     * 每行是 [类名序号, 长度, ...] 的游程列表（长度为字符串长度，空列表表示整行为普通文本），
+     * 依次从该行文本中截取；行号由CSS计数器生成，不包含在内容中
+     * @param {Object} payload - {classes, lines, text, start, total_lines, skipped}
+     * @returns {HTMLElement} - 高亮代码的元素
+     */
+    renderTokens(payload) {
+        const start = payload.start || 0;
+        const total = payload.total_lines || start + payload.lines.length;
+        const texts = payload.text.split('\n');
+        const classes = payload.classes;
+
+        const view = document.createElement('div');
+        view.className = 'code-highlight token-view';
+        view.style.setProperty('--lineno-width', `${String(total).length}ch`);
+        if (payload.skipped) {
+            const marker = document.createElement('div');
+            marker.className = 'highlight-skipped';
+            marker.textContent = '高亮已跳过：文件过于复杂，以纯文本显示';
+            view.appendChild(marker);
+        }
+
+        const pre = document.createElement('pre');
+        pre.style.counterReset = `line ${start}`;
+        payload.lines.forEach((runs, i) => {
+            const text = texts[i] || '';
+            const line = document.createElement('div');
+            line.className = 'token-line';
+            if (runs.length === 0) {
+                line.textContent = text;
+            } else {
+                let position = 0;
+                for (let j = 0; j < runs.length; j += 2) {
+                    const part = text.slice(position, position + runs[j + 1]);
+                    position += runs[j + 1];
+                    if (runs[j] === 0) {
+                        line.appendChild(document.createTextNode(part));
+                    } else {
+                        const span = document.createElement('span');
+                        span.className = classes[runs[j]];
+                        span.textContent = part;
+                        line.appendChild(span);
+                    }
+                }
+            }
+            pre.appendChild(line);
+        });
+        view.appendChild(pre);
+        return view;
+    }
+
+    /**
+     * 设置高亮代码的CSS样式
+     * @param {string} css - 高亮代码的CSS样式
+     */
+    setHighlightStyles(css) {
+        // 添加样式标签
+        let styleTag = document.getElementById('highlight-styles');
+        if (!styleTag) {
+            styleTag = document.createElement('style');
+            styleTag.id = 'highlight-styles';
+            document.head.appendChild(styleTag);
+        }
+        styleTag.textContent = css;
+    }
+
+    /**
+     * 显示文件名、信息和标签
+     * @param {Object} file - 文件信息
+     */
+    showFileInfo(file) {
         this.currentFile = file;
+        this.windowState = null;
 
         // 隐藏无选择提示，显示文件预览
         this.elements.noSelection.style.display = 'none';
@@ -45,37 +238,6 @@ class FileViewer {
         if (file.is_database) {
             this.addTag('数据库', 'tag-database');
         }
-
-        // 显示文件内容
-        if (file.is_text) {
-            // 如果有高亮代码，使用高亮显示，否则使用普通文本
-            if (highlightedCode) {
-                // 添加样式标签
-                let styleTag = document.getElementById('highlight-styles');
-                if (!styleTag) {
-                    styleTag = document.createElement('style');
-                    styleTag.id = 'highlight-styles';
-                    document.head.appendChild(styleTag);
-                }
-                styleTag.textContent = css;
-
-                // 设置高亮HTML
-                this.elements.codeContainer.innerHTML = highlightedCode;
-            } else {
-                // 使用预格式化文本显示
-                this.elements.codeContainer.innerHTML = `
-                    <pre style="margin:0;padding:10px;white-space:pre-wrap;word-break:break-all;">${this.escapeHtml(file.content)}</pre>
-                `;
-            }
-        } else {
-            // 如果不是文本文件
-            this.elements.codeContainer.innerHTML = `
-                <div style="padding:20px;text-align:center;color:var(--text-secondary);">
-                    <i class="fas fa-file-alt" style="font-size:32px;margin-bottom:10px;"></i>
-                    <p>此文件不是文本文件或无法显示内容</p>
-                </div>
-            `;
-        }
     }
 
     /**
@@ -93,10 +255,21 @@ class FileViewer {
     /**
      * 复制当前文件内容到剪贴板
      */
-    copyContent() {
-        if (!this.currentFile || !this.currentFile.content) return;
+    async copyContent() {
+        const file = this.currentFile;
+        if (!file) return;
+
+        let content = file.content;
+        if (!content && file.is_text && this.contentLoader) {
+            try {
+                content = await this.contentLoader(file);
+            } catch (err) {
+                console.error('Failed to load content:', err);
+            }
+        }
+        if (!content) return;
 
-        navigator.clipboard.writeText(this.currentFile.content)
+        navigator.clipboard.writeText(content)
             .then(() => {
                 // 显示复制成功提示
                 const statusMessage = document.getElementById('statusMessage');
@@ -117,6 +290,7 @@ class FileViewer {
      */
     clear() {
         this.currentFile = null;
+        this.windowState = null;
         this.elements.noSelection.style.display = 'flex';
         this.elements.filePreview.style.display = 'none';
         this.elements.fileName.textContent = '';
@@ -3,15 +3,50 @@ import sys
 import webview
 import logging
 import json
-from backend.file_processor import FileProcessor
+import multiprocessing
+import threading
+import itertools
+from backend.file_processor import FileProcessor, EXPORT_COMPRESSIONS
+from backend.scan_jobs import ScanJobManager
+from backend.highlighter import Highlighter
+from backend.highlight_pool import HighlightPool
+from backend.progress import EventDispatcher
+from backend.content_server import ContentServer, FileResource, BytesResource, StreamResource
+from backend.watcher import DirectoryWatcher, delta_is_empty, delta_to_dict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# File processor instance
+# Highlighting shared by all scan jobs: lexers and CSS are reused, rendered
+# previews are cached by path, mtime and size in memory and on disk
+highlighter = Highlighter(cache_dir=Highlighter.default_cache_dir())
+# Lexing runs in worker processes with a deadline, so a pathological file
+# never blocks the bridge; past the deadline it is shown as plain text
+highlighter.pool = HighlightPool(max_workers=2, deadline=2.0)
+# File processor of the folder shown in the window (replaced when a scan finishes)
 processor = FileProcessor()
+processor.highlighter = highlighter
+# Every scan runs as a job with its own processor, results and cancel event
+scan_jobs = ScanJobManager(max_concurrent=2)
+current_job_id = None  # Job whose progress drives the main window
+# Scan events reach the webview from a dispatcher thread, so a busy renderer
+# never blocks the scan threads; progress events are merged when it lags
+events = EventDispatcher()
+# Localhost HTTP server for large payloads (file content, previews, exports)
+content_server = ContentServer()
+prefetch_limit = 32  # Most previews rendered by one prefetch_previews call
+max_window_lines = 5000  # Most lines highlighted by one preview window request
+# Stop event of the main window's current preview; a new preview cancels it
+preview_stop = threading.Event()
+preview_lock = threading.Lock()
+# Cancel events of running exports by export ID
+exports = {}
+export_ids = itertools.count(1)
+watcher = None
+# Refreshes from the UI and the watcher apply their deltas to the scan job in order
+refresh_lock = threading.Lock()
 current_window = None
 history = []
 current_folder = ""
@@ -89,45 +124,236 @@ def browse_folder():
         return None
 
 
-def process_folder(folder_path):
-    """Process folder"""
-    global current_folder, processor
+def process_folder(folder_path, options=None):
+    """Process folder
+
+    options: optional scan settings, e.g. {'parallel': True} to list
+    directories concurrently on network file systems, or
+    {'metadata_only': True} to load file content lazily, or
+    {'use_cache': True} to reuse results of unchanged files from the
+    on-disk scan cache, or {'watch': True} to keep watching the folder
+    after the scan and push changes through window.app.applyDelta
+    ('watch_polling': False disables the stat-polling fallback used where
+    inotify is unavailable), or
+    {'ignore': True} to skip paths matched by .gitignore/.ignore files and
+    the ignore profiles ('ignore_profiles': ['default', 'build', 'node', ...];
+    'default' only covers VCS metadata, caches and installed dependencies;
+    'ignore_patterns': extra gitignore-style globs), or {'source': 'git'} to
+    enumerate tracked files from the git index instead of walking the folder
+    ('include_untracked': True adds untracked files that are not ignored),
+    or {'processes': 4} to analyze files in a process pool (True uses one
+    process per CPU core). Progress updates are coalesced: at most one per
+    'progress_interval' seconds (default 0.1), plus one every
+    'progress_every' files when set. {'line_index': True} records line
+    offsets while counting newlines, so get_file_lines and windowed previews
+    of large files seek directly to a line range
+
+    The scan runs as a job shown in the main window; a previous scan of the
+    main window is cancelled. Use start_scan for background scans.
+    """
+    global current_folder, current_job_id
 
     if not folder_path or not os.path.isdir(folder_path):
         return {'status': 'error', 'message': '无效的文件夹路径'}
 
+    stop_watching()
+    if current_job_id:
+        scan_jobs.cancel(current_job_id)
     current_folder = folder_path
     add_to_history(folder_path)
+    options = options or {}
 
     # Start processing
     def callback(status, current, total, data):
         """Callback function to update progress and results"""
+        global processor
+        if job.job_id != current_job_id:
+            return  # Superseded by a newer scan of the main window
         if status == 'progress':
             progress = int((current / total) * 100) if total > 0 else 0
             current_window.evaluate_js(f'window.app.updateProgress({current}, {total}, {progress})')
         elif status == 'finished':
-            current_window.evaluate_js(f'window.app.processComplete({json.dumps(data)})')
+            processor = job.processor
+            # Only a handle and totals; the frontend pages the file list via get_files_page
+            current_window.evaluate_js(f'window.app.processComplete({json.dumps(job.summary())})')
+            if options.get('watch'):
+                start_watching(folder_path, options.get('watch_polling', True))
         elif status == 'error':
             current_window.evaluate_js(f'window.app.processError("{data}")')
         elif status == 'stopped':
             current_window.evaluate_js('window.app.processStopped()')
 
-    # Start processing
-    processor.process_directory(folder_path, callback)
-    return {'status': 'processing', 'folder': folder_path}
+    job = _create_scan(folder_path, options, events.callback(callback))
+    current_job_id = job.job_id
+    scan_jobs.start(job)
+    return {'status': 'processing', 'folder': folder_path, 'job_id': job.job_id}
+
+
+def _create_scan(folder_path, options, callback=None):
+    """Create a scan job with its own processor; run it with scan_jobs.start"""
+    job_processor = FileProcessor()
+    job_processor.highlighter = highlighter
+    if 'ignore_profiles' in options:
+        job_processor.ignore_profiles = list(options['ignore_profiles'])
+    if 'ignore_patterns' in options:
+        job_processor.ignore_patterns = list(options['ignore_patterns'])
+    return scan_jobs.create(folder_path, callback, processor=job_processor,
+                            parallel=options.get('parallel'),
+                            metadata_only=options.get('metadata_only'),
+                            use_cache=options.get('use_cache'),
+                            ignore=options.get('ignore'),
+                            source=options.get('source'),
+                            include_untracked=options.get('include_untracked'),
+                            processes=options.get('processes'),
+                            progress_interval=options.get('progress_interval'),
+                            progress_every=options.get('progress_every'),
+                            line_index=options.get('line_index'),
+                            result_dicts=False)
+
+
+def start_scan(folder_path, options=None):
+    """Start a background scan job; poll it with get_scan_progress"""
+    if not folder_path or not os.path.isdir(folder_path):
+        return {'status': 'error', 'message': '无效的文件夹路径'}
+    job = scan_jobs.start(_create_scan(folder_path, options or {}))
+    return {'status': job.status, 'job_id': job.job_id}
+
+
+def get_scan_progress(job_id=None):
+    """Progress of one scan job, or of all jobs when job_id is omitted"""
+    if job_id is None:
+        return {'status': 'success', 'jobs': scan_jobs.jobs()}
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    return job.progress()
+
+
+def get_scan_results(job_id):
+    """Totals of a finished scan job; fetch the files with get_files_page"""
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    if job.status != 'finished':
+        return job.progress()
+    return dict(job.summary(), status='finished')
+
+
+def get_files_page(job_id, offset=0, limit=1000, fields=None):
+    """One page of a finished scan's file list
+
+    fields: keys to include (see FileInfo.DICT_FIELDS); content is left out
+    unless asked for. Every entry carries its file ID as 'id'.
+    """
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    if job.status != 'finished':
+        return job.progress()
+    return {
+        'status': 'success',
+        'job_id': job_id,
+        'offset': offset,
+        'total': len(job.files),
+        'files': job.page(offset, limit, fields),
+    }
+
+
+def get_files_columnar(job_id, offset=0, limit=None):
+    """A finished scan's file list in the compact columnar format
+
+    See backend/wire_format.py: a path table with parent indices, parallel
+    size/lines/chars arrays, bit-packed flags and an interned type table.
+    Pages (offset/limit) reference directories of earlier pages by file ID.
+    """
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    if job.status != 'finished':
+        return job.progress()
+    return dict(job.columnar_page(offset, limit), status='success', job_id=job_id, total=len(job.files))
+
+
+def cancel_scan(job_id):
+    """Cancel a queued or running scan job"""
+    if scan_jobs.cancel(job_id):
+        return {'status': 'stopping', 'job_id': job_id}
+    return {'status': 'error', 'message': '扫描任务不存在或已结束'}
+
+
+def refresh_folder():
+    """Re-check the current folder and return only what changed"""
+    global processor
+    if not current_folder or not os.path.isdir(current_folder):
+        return {'status': 'error', 'message': '无效的文件夹路径'}
+    try:
+        return {'status': 'success', 'delta': _refresh_processor(current_folder)}
+    except Exception as e:
+        logger.error(f"Error refreshing folder: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+def _refresh_processor(folder_path, dirty_dirs=None):
+    """Refresh the main window's file list and give changed files IDs in its scan job
+
+    Returns the delta as a dict whose added and modified entries carry their
+    file ID, so previews and exports by ID keep working after the refresh.
+    """
+    with refresh_lock:
+        delta = processor.refresh(folder_path, dirty_dirs)
+        job = scan_jobs.get(current_job_id)
+        ids = job.apply_delta(delta) if job is not None and job.processor is processor else None
+        return delta_to_dict(delta, ids)
+
+
+def start_watching(folder_path, polling=True):
+    """Watch the folder and push file list deltas to the frontend
+
+    polling: fall back to polling directory stats where inotify is unavailable;
+    when False such folders are not watched.
+
+    Deltas go through the event dispatcher like scan progress, so the frontend
+    receives them in order on the dispatcher thread instead of the watcher's.
+    """
+    global watcher
+    stop_watching()
+
+    def apply_delta(status, delta):
+        current_window.evaluate_js(f'window.app.applyDelta({json.dumps(delta)})')
+
+    def on_change(dirty_dirs):
+        try:
+            delta = _refresh_processor(folder_path, dirty_dirs)
+        except Exception as e:
+            logger.error(f"Error applying file changes: {e}")
+            return
+        if not delta_is_empty(delta):
+            events.post(apply_delta, 'delta', delta)
+
+    watcher = DirectoryWatcher(folder_path, on_change, ignore=processor.is_ignored, polling=polling).start()
+    logger.info(f"Watching {folder_path} ({watcher.mode or 'disabled'})")
+
+
+def stop_watching():
+    """Stop watching the current folder"""
+    global watcher
+    if watcher:
+        watcher.stop()
+        watcher = None
 
 
 def stop_processing():
-    """Stop processing"""
-    global processor
-    processor.stop_processing()
+    """Stop the scan shown in the main window"""
+    if current_job_id:
+        scan_jobs.cancel(current_job_id)
     return {'status': 'stopping'}
 
 
 def highlight_code(content, filename):
     """Highlight code"""
     global processor
-    return processor.highlight_code(content, filename)
+    result = processor.highlight_code(content, filename, stop_event=_begin_preview())
+    return result or {'status': 'cancelled'}
 
 
 def get_file_content(file_path):
@@ -137,8 +363,7 @@ def get_file_content(file_path):
         if not os.path.isfile(file_path):
             return {'status': 'error', 'message': '文件不存在'}
 
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        content = processor.get_file_content(file_path)
 
         # Create file info
         file_info = {
@@ -152,19 +377,373 @@ def get_file_content(file_path):
         }
 
         # Highlight code
-        highlight_result = processor.highlight_code(content, file_path)
+        highlight_result = processor.highlight_file(file_path, content, stop_event=_begin_preview())
+        if highlight_result is None:
+            return {'status': 'cancelled'}
 
         return {
             'status': 'success',
             'file_info': file_info,
             'highlighted_code': highlight_result['highlighted_code'],
-            'css': highlight_result['css']
+            'css': highlight_result['css'],
+            'skipped': highlight_result['skipped']
         }
     except Exception as e:
         logger.error(f"Error getting file content: {e}")
         return {'status': 'error', 'message': str(e)}
 
 
+def get_files_content(file_paths):
+    """Get the content of several files at once, e.g. for export"""
+    global processor
+    contents = {}
+    for file_path in file_paths:
+        try:
+            contents[file_path] = processor.get_file_content(file_path)
+        except Exception as e:
+            logger.error(f"Error reading {file_path}: {e}")
+            contents[file_path] = f"无法读取文件内容: {str(e)}"
+    return contents
+
+
+def get_content_server():
+    """Base URL and session token of the local content server"""
+    return content_server.info()
+
+
+def _job_file(job_id, file_id):
+    """FileInfo of a finished scan job by file ID (raises LookupError)"""
+    job = scan_jobs.get(job_id)
+    if job is None or job.status != 'finished':
+        raise LookupError(job_id)
+    return job, job.file(file_id)
+
+
+def _serve_content(parts, query):
+    """/content/<job_id>/<file_id>: raw file bytes, with Range and ETag"""
+    job, file_info = _job_file(*parts)
+    if file_info.is_dir:
+        return None
+    content_type = 'text/plain; charset=utf-8' if file_info.is_text else 'application/octet-stream'
+    return FileResource(file_info.full_path, content_type)
+
+
+def _serve_text(parts, query):
+    """/text/<job_id>/<file_id>[?start=&count=]: content decoded like the scanner does (UTF-8, \\n newlines)
+
+    With start/count only that line range is read, through the line-offset index.
+    """
+    job, file_info = _job_file(*parts)
+    if file_info.is_dir or not file_info.is_text:
+        return None
+    stat = os.stat(file_info.full_path)
+    etag = f'"t-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    if 'start' in query:
+        start = int(query['start'])
+        count = min(int(query.get('count', 500)), max_window_lines)
+        return BytesResource(
+            lambda: job.processor.get_file_lines(file_info.full_path, start, count)['content'].encode('utf-8'),
+            'text/plain; charset=utf-8', f'"t-{stat.st_size:x}-{stat.st_mtime_ns:x}-{start}-{count}"')
+    return BytesResource(lambda: job.processor.get_file_content(file_info.full_path).encode('utf-8'),
+                         'text/plain; charset=utf-8', etag)
+
+
+def _serve_preview(parts, query):
+    """/preview/<job_id>/<file_id>: highlighted HTML and CSS as JSON"""
+    job, file_info = _job_file(*parts)
+    if file_info.is_dir or not file_info.is_text:
+        return None
+    output = _preview_output(query)
+
+    def render():
+        # Only a preview that is actually rendered supersedes the current one, not a 304 revalidation
+        result = _render_preview(job, file_info, _begin_preview(), output)
+        return None if result is None else json.dumps(result, separators=(',', ':')).encode('utf-8')
+
+    return BytesResource(render, 'application/json', f'"p-{output}-{_preview_etag(file_info)}"')
+
+
+def _serve_window(parts, query):
+    """/window/<job_id>/<file_id>?start=&count=: highlighted line range as JSON"""
+    job, file_info = _job_file(*parts)
+    if file_info.is_dir or not file_info.is_text:
+        return None
+    start = int(query.get('start', 0))
+    count = min(int(query.get('count', 500)), max_window_lines)
+    output = _preview_output(query)
+
+    def render():
+        result = job.processor.highlight_window(file_info.full_path, start, count, _begin_preview(), output)
+        return None if result is None else json.dumps(result, separators=(',', ':')).encode('utf-8')
+
+    return BytesResource(render, 'application/json', f'"w-{output}-{_preview_etag(file_info)}-{start}-{count}"')
+
+
+def _preview_output(query):
+    """Preview encoding requested with ?format=: 'html' (default) or 'tokens'"""
+    output = query.get('format', 'html')
+    if output not in ('html', 'tokens'):
+        raise ValueError(f"Unknown preview format: {output}")
+    return output
+
+
+def _preview_etag(file_info):
+    """Version tag of a file's preview: changes with its size or mtime"""
+    stat = os.stat(file_info.full_path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def _begin_preview():
+    """Cancel the main window's current preview and return the stop event of the next one"""
+    global preview_stop
+    with preview_lock:
+        preview_stop.set()
+        preview_stop = threading.Event()
+        return preview_stop
+
+
+def cancel_preview():
+    """Abandon the preview being highlighted, e.g. when a binary file is selected"""
+    preview_stop.set()
+    return {'status': 'success'}
+
+
+def _render_preview(job, file_info, stop_event=None, output='html'):
+    """Highlighted preview of a scanned file, from the highlight cache when unchanged
+
+    Returns None when stop_event is set before highlighting finishes.
+    """
+    # Content the scanner kept, otherwise the job's content store (loads on demand)
+    return job.processor.highlight_file(file_info.full_path, file_info.content or None, stop_event, output)
+
+
+def get_preview(job_id, file_id, output='html'):
+    """Highlighted preview of a file by scan job and file ID
+
+    output='tokens' returns a compact token stream instead of HTML: 'text'
+    plus per-line run lengths of (class index, length) into 'classes', for
+    the viewer to render with its own line numbers.
+    """
+    return _get_preview(job_id, file_id, _begin_preview(), output)
+
+
+def _get_preview(job_id, file_id, stop_event, output='html'):
+    try:
+        job, file_info = _job_file(job_id, file_id)
+        if file_info.is_dir or not file_info.is_text:
+            return {'status': 'error', 'message': '不是文本文件'}
+        result = _render_preview(job, file_info, stop_event, output)
+        if result is None:
+            return {'status': 'cancelled'}
+        return dict(result, status='success', id=int(file_id))
+    except (LookupError, ValueError, FileNotFoundError):
+        return {'status': 'error', 'message': '文件不存在'}
+    except Exception as e:
+        logger.error(f"Error previewing file: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+def get_preview_window(job_id, file_id, start, count, output='html'):
+    """Highlighted lines [start, start + count) of a large file, numbered from start + 1
+
+    Only that range (and some lines before it for lexer state) is read and
+    highlighted; the result also carries the file's total_lines. output is
+    'html' or 'tokens', as for get_preview.
+    """
+    try:
+        job, file_info = _job_file(job_id, file_id)
+        if file_info.is_dir or not file_info.is_text:
+            return {'status': 'error', 'message': '不是文本文件'}
+        result = job.processor.highlight_window(file_info.full_path, int(start), min(int(count), max_window_lines),
+                                                _begin_preview(), output)
+        if result is None:
+            return {'status': 'cancelled'}
+        return dict(result, status='success', id=int(file_id))
+    except (LookupError, ValueError, FileNotFoundError):
+        return {'status': 'error', 'message': '文件不存在'}
+    except Exception as e:
+        logger.error(f"Error previewing file window: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+def get_file_lines(job_id, file_id, start, count):
+    """Plain text of lines [start, start + count) of a file, numbered from 0
+
+    Uses the line-offset index built during the scan (or built on first use)
+    and reads only that range through mmap; the result also carries the
+    file's total_lines.
+    """
+    try:
+        job, file_info = _job_file(job_id, file_id)
+        if file_info.is_dir or not file_info.is_text:
+            return {'status': 'error', 'message': '不是文本文件'}
+        result = job.processor.get_file_lines(file_info.full_path, int(start), min(int(count), max_window_lines))
+        return dict(result, status='success', id=int(file_id))
+    except (LookupError, ValueError, FileNotFoundError):
+        return {'status': 'error', 'message': '文件不存在'}
+    except Exception as e:
+        logger.error(f"Error reading file lines: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+def prefetch_previews(job_id, file_ids, output='html'):
+    """Render previews of several files (e.g. neighbours of the selection) into the cache
+
+    Returns the IDs that are ready; fetch them with get_preview or /preview
+    in the same output encoding ('html' or 'tokens'). The next preview of the main window stops prefetching, so it never waits
+    for highlight workers busy with neighbours.
+    """
+    stop_event = preview_stop
+    ready = []
+    for file_id in file_ids[:prefetch_limit]:
+        if stop_event.is_set():
+            break
+        if _get_preview(job_id, file_id, stop_event, output).get('status') == 'success':
+            ready.append(file_id)
+    return {'status': 'success', 'ready': ready}
+
+
+def start_export(job_id, file_ids, structure_text):
+    """Prepare a streaming export of the structure and the given files
+
+    Returns a one-shot content-server URL; fetching it streams the export
+    from disk. Progress goes to window.app.updateExportProgress, and
+    cancel_export(export_id) stops it.
+    """
+    job = scan_jobs.get(job_id)
+    if job is None or job.status != 'finished':
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    try:
+        files = [job.file(file_id) for file_id in file_ids]
+    except (LookupError, ValueError):
+        return {'status': 'error', 'message': '文件不存在'}
+
+    export_id = f"export-{next(export_ids)}"
+    stop_event = threading.Event()
+    exports[export_id] = stop_event
+
+    def progress(status, done, total, chars):
+        if status == 'progress':
+            current_window.evaluate_js(f'window.app.updateExportProgress({done}, {total}, {chars})')
+
+    def write_to(sink):
+        try:
+            result = job.processor.export_project(sink, structure_text, files,
+                                                  events.callback(progress, key=export_id), stop_event)
+            if result['stopped']:
+                # End the response without its final chunk so the page sees an incomplete export
+                raise RuntimeError('导出已取消')
+        finally:
+            exports.pop(export_id, None)
+
+    url = content_server.add_stream(StreamResource(write_to, 'text/plain; charset=utf-8'))
+    return {'status': 'success', 'export_id': export_id, 'url': url}
+
+
+def export_to_file(job_id, file_ids, structure_text, compression=None):
+    """Export the structure and the given files to a file chosen in a save dialog
+
+    The export streams from disk to the file in the background with constant
+    memory; compression is None, 'gzip' or 'xz' (by default taken from a
+    .gz/.xz file name). Progress goes to window.app.updateExportProgress and
+    the result, with size and throughput, to window.app.exportFileComplete.
+    cancel_export(export_id) stops it and removes the partial file.
+    """
+    job = scan_jobs.get(job_id)
+    if job is None or job.status != 'finished':
+        return {'status': 'error', 'message': '扫描任务不存在'}
+    try:
+        files = [job.file(file_id) for file_id in file_ids]
+    except (LookupError, ValueError):
+        return {'status': 'error', 'message': '文件不存在'}
+
+    suffix = EXPORT_COMPRESSIONS.get(compression or 'gzip', '')
+    default_name = f"{os.path.basename(job.folder_path.rstrip(os.sep)) or 'project'}.txt{suffix}"
+    try:
+        result = webview.windows[0].create_file_dialog(webview.SAVE_DIALOG, save_filename=default_name)
+    except Exception as e:
+        logger.error(f"Error choosing export file: {e}")
+        return {'status': 'error', 'message': str(e)}
+    if not result:
+        return {'status': 'cancelled'}
+    file_path = result if isinstance(result, str) else result[0]
+    if compression is None:
+        compression = next((name for name, suffix in EXPORT_COMPRESSIONS.items() if file_path.endswith(suffix)), None)
+
+    export_id = f"export-{next(export_ids)}"
+    stop_event = threading.Event()
+    exports[export_id] = stop_event
+
+    def progress(status, done, total, chars):
+        if status == 'progress':
+            current_window.evaluate_js(f'window.app.updateExportProgress({done}, {total}, {chars})')
+
+    def complete(status, result):
+        current_window.evaluate_js(
+            f'window.app.exportFileComplete({json.dumps(dict(result, status=status, export_id=export_id))})')
+
+    def run():
+        try:
+            result = job.processor.export_project_to_file(
+                file_path, structure_text, files, compression, events.callback(progress, key=export_id), stop_event)
+            events.post(complete, 'stopped' if result['stopped'] else 'success', result)
+        except Exception as e:
+            logger.error(f"Error exporting to {file_path}: {e}")
+            events.post(complete, 'error', {'path': file_path, 'message': str(e)})
+        finally:
+            exports.pop(export_id, None)
+
+    threading.Thread(target=run, name=export_id, daemon=True).start()
+    return {'status': 'processing', 'export_id': export_id, 'path': file_path}
+
+
+def cancel_export(export_id):
+    """Stop a running export; the HTTP response ends early"""
+    stop_event = exports.get(export_id)
+    if stop_event is None:
+        return {'status': 'error', 'message': '导出不存在或已结束'}
+    stop_event.set()
+    return {'status': 'stopping'}
+
+
+def browse_project_file():
+    """Choose an exported project file (plain, .gz or .xz) to restore from"""
+    try:
+        result = webview.windows[0].create_file_dialog(
+            webview.OPEN_DIALOG,
+            file_types=('Project text (*.txt;*.gz;*.xz)', 'All files (*.*)')
+        )
+        if result and len(result) > 0:
+            return result[0]
+        return None
+    except Exception as e:
+        logger.error(f"Error browsing project file: {e}")
+        return None
+
+
+def restore_project_from_file(file_path, target_folder):
+    """Restore a project from an exported file; gzip/xz exports are read directly"""
+    global processor
+
+    if not file_path or not os.path.isfile(file_path):
+        return {'status': 'error', 'message': '无效的项目文件路径'}
+    if not target_folder or not os.path.isdir(target_folder):
+        return {'status': 'error', 'message': '无效的目标文件夹路径'}
+
+    def callback(status, current, total, progress, data):
+        """Callback function to update progress"""
+        if status == 'progress':
+            current_window.evaluate_js(f'window.app.updateRestoreProgress({current}, {total}, {progress})')
+
+    try:
+        result = processor.restore_project_from_file(file_path, target_folder, callback)
+    except Exception as e:
+        logger.error(f"Error reading {file_path}: {e}")
+        result = {'status': 'error', 'message': f'无法读取项目文件: {e}'}
+    current_window.evaluate_js(f'window.app.restoreComplete({json.dumps(result)})')
+    return {'status': 'processing', 'target': target_folder}
+
+
 def restore_project_from_text(text_content, target_folder):
     """Restore project from text content to target folder"""
     global processor
@@ -213,15 +792,46 @@ def main():
         clear_history,
         browse_folder,
         process_folder,
+        refresh_folder,
         stop_processing,
+        start_scan,
+        get_scan_progress,
+        get_scan_results,
+        get_files_page,
+        get_files_columnar,
+        get_content_server,
+        get_preview,
+        get_preview_window,
+        get_file_lines,
+        prefetch_previews,
+        cancel_preview,
+        start_export,
+        export_to_file,
+        cancel_export,
+        cancel_scan,
         highlight_code,
         get_file_content,
+        get_files_content,
+        browse_project_file,
+        restore_project_from_file,
         restore_project_from_text  # 更新API名称
     )
 
+    events.start()
+    content_server.route('content', _serve_content)
+    content_server.route('text', _serve_text)
+    content_server.route('preview', _serve_preview)
+    content_server.route('window', _serve_window)
+    content_server.start()
+
     # Start the application - debug=True helps with troubleshooting
     webview.start(debug=False)
+    events.stop(drain=False)
+    content_server.stop()
+    highlighter.pool.close()
 
 
 if __name__ == "__main__":
+    # Analysis worker processes re-import this module in frozen builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,13 +1,13 @@
+import io
 import os
 import sys
 import mimetypes
 import time
 import re
+import threading
 from pathlib import Path
-import pygments
-from pygments import lexers
-from pygments.formatters import HtmlFormatter
 import json
+import multiprocessing
 
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QHBoxLayout, QLabel, QLineEdit, QPushButton, QTreeView, QTreeWidget, QTreeWidgetItem,
@@ -15,10 +15,25 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QStatusBar, QScrollArea, QToolBar, QComboBox,
                                QCheckBox, QProgressBar, QMenu, QMessageBox,
                                QTabWidget, QDialog, QListWidget, QToolButton,
-                               QHeaderView, QGroupBox, QStyle, QSizePolicy)
+                               QHeaderView, QGroupBox, QStyle, QSizePolicy, QProgressDialog)
 from PySide6.QtCore import Qt, QSize, Signal, QThread, QSettings, QTimer, QUrl, QModelIndex
 from PySide6.QtGui import QFont, QColor, QIcon, QPixmap, QAction, QDesktopServices, QStandardItemModel, QStandardItem, \
-    QBrush
+    QBrush, QTextCursor
+
+# 复用项目根目录下的backend模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.watcher import DirectoryWatcher, compute_delta, delta_is_empty, file_order_key
+from backend.ignore_rules import IgnoreRules
+from backend.file_analyzer import ByteAnalyzer, TextDetector
+from backend.progress import EventDispatcher
+from backend.file_processor import ProjectExporter, EXPORT_COMPRESSIONS
+from backend.highlighter import Highlighter
+from backend.highlight_pool import HighlightPool
+
+# 代码高亮服务：复用词法分析器，已渲染的文件按路径、mtime和大小缓存在内存和磁盘中
+highlighter = Highlighter(cache_dir=Highlighter.default_cache_dir())
+# 在工作进程中高亮，超过时限的文件以纯文本显示，界面最多等待这么久
+highlighter.pool = HighlightPool(max_workers=1, deadline=2.0)
 
 
 class FileInfo:
@@ -38,27 +53,51 @@ class FileInfo:
         self.is_database = False  # 是否是数据库文件
         self.content = ''  # 文件内容
         self.is_text = False  # 是否是文本文件
+        self.mtime_ns = 0  # 修改时间（纳秒），用于增量刷新
 
 
 class WorkerThread(QThread):
     """后台处理文件的线程"""
 
     progress_signal = Signal(int, int)  # 当前处理的文件数，总文件数
-    file_signal = Signal(FileInfo)  # 每处理完一个文件发送信号
     finished_signal = Signal(list)  # 文件结构列表
     error_signal = Signal(str)  # 错误消息
 
-    def __init__(self, folder_path):
+    def __init__(self, folder_path, ignore_rules=None):
         super().__init__()
         self.folder_path = folder_path
+        self.ignore_rules = ignore_rules  # IgnoreRules，被忽略的目录整个跳过
         self.files_list = []
         self.stop_flag = False
+        # 信号经事件队列由分发线程发出，只有进度信号可合并，完成和错误信号总会送达
+        self.events = EventDispatcher(mergeable=('progress',), name='worker-events')
 
     def run(self):
+        self.events.start()
+        try:
+            self._run()
+        finally:
+            # 送达队列中剩余的信号后线程才结束
+            self.events.stop()
+
+    def _post(self, name, *args):
+        """通过事件队列发送信号"""
+        self.events.post(self._emit, name, *args)
+
+    def _emit(self, name, *args):
+        getattr(self, f"{name}_signal").emit(*args)
+
+    def _run(self):
         try:
             # 先计算总文件数
             total_files = 0
-            for root, _, files in os.walk(self.folder_path):
+            for root, dirs, files in os.walk(self.folder_path):
+                if self.ignore_rules:
+                    # 不进入被忽略的目录
+                    rel_root = os.path.relpath(root, self.folder_path).replace('\\', '/')
+                    prefix = '' if rel_root == '.' else rel_root + '/'
+                    dirs[:] = [d for d in dirs if not self.ignore_rules.is_ignored(prefix + d, True)]
+                    files = [f for f in files if not self.ignore_rules.is_ignored(prefix + f, False)]
                 total_files += len(files)
                 if self.stop_flag:
                     return
@@ -74,9 +113,9 @@ class WorkerThread(QThread):
                 return
 
             # 发送完成信号
-            self.finished_signal.emit(self.files_list)
+            self._post('finished', self.files_list)
         except Exception as e:
-            self.error_signal.emit(str(e))
+            self._post('error', str(e))
 
     def stop(self):
         """停止线程处理"""
@@ -92,6 +131,8 @@ class WorkerThread(QThread):
             '.tsx', '.yml', '.yaml', '.toml', '.ini', '.cfg', '.conf', '.sh',
             '.bat', '.ps1', '.sql', '.go', '.rb', '.rs', '.dart', '.swift'
         }
+        self.text_detector = TextDetector(self.text_extensions)
+        self.analyzer = ByteAnalyzer()
 
     def _process_directory(self, full_path, rel_path, total_files):
         """处理目录及其文件"""
@@ -106,6 +147,11 @@ class WorkerThread(QThread):
         if self.stop_flag:
             return current_count
 
+        # 跳过被忽略的目录和文件
+        if self.ignore_rules:
+            items = [item for item in items if not self.ignore_rules.is_ignored(
+                f"{rel_path}/{item}" if rel_path else item, os.path.isdir(os.path.join(full_path, item)))]
+
         # 先处理目录
         dirs = sorted([item for item in items if os.path.isdir(os.path.join(full_path, item))])
         for dir_name in dirs:
@@ -148,33 +194,36 @@ class WorkerThread(QThread):
         """处理单个文件"""
         # 创建文件信息对象
         file_info = FileInfo(file_rel_path, file_path)
-        file_info.size = os.path.getsize(file_path)
+        stat = os.stat(file_path)
+        file_info.size = stat.st_size
+        file_info.mtime_ns = stat.st_mtime_ns
         file_info.file_type = os.path.splitext(file_path)[1][1:] if os.path.splitext(file_path)[1] else 'txt'
 
-        # 检查是否为文本文件
-        mime_type, _ = mimetypes.guess_type(file_path)
-        is_text = (mime_type and mime_type.startswith('text')) or file_path.lower().endswith(
-            tuple(self.text_extensions))
+        # 检查是否为文本文件（未知类型检测文件开头的内容）
+        is_text = self.text_detector.is_text(file_path)
         file_info.is_text = is_text
 
         if is_text:
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+                content, stats = self.analyzer.read_text(file_path)
+                if stats.binary:
+                    # 内容检测为二进制文件
+                    file_info.is_text = False
+                else:
                     file_info.content = content
-                    file_info.line_count = content.count('\n') + 1
-                    file_info.char_count = len(content)
+                    file_info.line_count = stats.newlines + 1
+                    file_info.char_count = stats.chars
 
                     # 检查是否是CDN或压缩JS文件
                     file_info.is_cdn = bool(re.search(r'(cdn|unpkg|jsdelivr|cloudflare)', file_rel_path.lower()))
                     file_info.is_minified = file_path.lower().endswith('.min.js') or (
-                            len(content) > 1000 and '.' in file_path and
-                            content.count('\n') < content.count(';') / 10
+                            stats.chars > 1000 and '.' in file_path and
+                            stats.newlines < stats.semicolons / 10
                     )
 
                     # 检查是否是数据库文件 (JSON等大文件)
                     file_info.is_database = (
-                                                    file_path.lower().endswith('.json') and len(content) > 50000
+                                                    file_path.lower().endswith('.json') and stats.chars > 50000
                                             ) or file_path.lower().endswith(('.db', '.sqlite', '.sqlite3'))
             except Exception as e:
                 file_info.content = f"无法读取文件内容: {str(e)}"
@@ -183,16 +232,120 @@ class WorkerThread(QThread):
         # 将文件信息添加到列表
         self.files_list.append(file_info)
 
-        # 发送文件信号
-        self.file_signal.emit(file_info)
-
         # 更新进度
         current_count += 1
-        self.progress_signal.emit(current_count, total_files)
+        self._post('progress', current_count, total_files)
 
         return 1  # 返回处理的文件数
 
 
+class RefreshThread(WorkerThread):
+    """增量刷新线程，只重新读取大小或修改时间发生变化的文件"""
+
+    delta_signal = Signal(list, dict)  # 新的文件列表，变化集合
+
+    def __init__(self, folder_path, old_files, ignore_rules=None):
+        super().__init__(folder_path, ignore_rules)
+        self.old_files = old_files
+        self.old_by_path = {f.path: f for f in old_files}
+
+    def _run(self):
+        try:
+            self._set_mime_types()
+            self._process_directory(self.folder_path, "", 0)
+
+            # 检查是否停止线程
+            if self.stop_flag:
+                return
+
+            self._post('delta', self.files_list, compute_delta(self.old_files, self.files_list))
+        except Exception as e:
+            self._post('error', str(e))
+
+    def _process_directory(self, full_path, rel_path, total_files):
+        # 未变化的目录复用原对象
+        count_before = len(self.files_list)
+        result = super()._process_directory(full_path, rel_path, total_files)
+        for index in range(count_before, len(self.files_list)):
+            file_info = self.files_list[index]
+            if file_info.is_dir:
+                old = self.old_by_path.get(file_info.path)
+                if old is not None and old.is_dir:
+                    self.files_list[index] = old
+        return result
+
+    def _process_file(self, file_path, file_rel_path, current_count, total_files):
+        old = self.old_by_path.get(file_rel_path)
+        if old is not None and not old.is_dir:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return 0
+            if old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                self.files_list.append(old)
+                return 1
+        return super()._process_file(file_path, file_rel_path, current_count, total_files)
+
+
+class ExportThread(QThread):
+    """
+    后台导出线程，由导出引擎从磁盘流式读取所选文件的内容，可以随时取消
+    指定 file_path 时写入文件（可选 gzip/xz 压缩，取消时删除未完成的文件），否则在内存中生成文本
+    """
+
+    progress_signal = Signal(int, int, int)  # 已导出的文件数，文件总数，已写出的字符数
+    # 导出结果：写入文件时见 ProjectExporter.export_to_file，否则见 ProjectExporter.export 并附带文本 'text'
+    finished_signal = Signal(dict)
+    error_signal = Signal(str)  # 错误消息
+
+    def __init__(self, structure_text, files, file_path=None, compression=None):
+        super().__init__()
+        self.structure_text = structure_text
+        self.files = files
+        self.file_path = file_path
+        self.compression = compression
+        self.stop_event = threading.Event()  # 取消导出的信号
+        # 进度信号可合并，完成和错误信号总会送达
+        self.events = EventDispatcher(mergeable=('progress',), name='export-events')
+
+    def run(self):
+        self.events.start()
+        try:
+            self._run()
+        finally:
+            self.events.stop()
+
+    def stop(self):
+        """取消导出"""
+        self.stop_event.set()
+
+    def _post(self, name, *args):
+        """通过事件队列发送信号"""
+        self.events.post(self._emit, name, *args)
+
+    def _emit(self, name, *args):
+        getattr(self, f"{name}_signal").emit(*args)
+
+    def _run(self):
+        try:
+            if self.file_path:
+                result = ProjectExporter().export_to_file(self.file_path, self.structure_text, self.files,
+                                                          self.compression, self._progress, self.stop_event)
+            else:
+                buffer = io.StringIO()
+                result = ProjectExporter().export(buffer, self.structure_text, self.files, self._progress,
+                                                  self.stop_event)
+                result['text'] = buffer.getvalue()
+        except Exception as e:
+            self._post('error', str(e))
+            return
+        self._post('finished', result)
+
+    def _progress(self, status, done, total, chars):
+        if status == 'progress':
+            self._post('progress', done, total, chars)
+
+
 class FileTreeWidget(QTreeWidget):
     """自定义的文件树组件，支持文件选择和颜色标记"""
 
@@ -313,6 +466,63 @@ class FileTreeWidget(QTreeWidget):
             else:
                 item.setForeground(0, QBrush(QColor("#a9b7c6")))  # 默认颜色
 
+    def apply_delta(self, delta, item_factory):
+        """
+        增量更新文件树，只处理新增、删除和修改的条目
+        item_factory: 根据FileInfo创建树节点的函数
+        """
+        # 建立路径到节点的映射
+        items = {}
+        stack = [self.invisibleRootItem()]
+        while stack:
+            parent = stack.pop()
+            for i in range(parent.childCount()):
+                child = parent.child(i)
+                file_info = child.data(0, Qt.UserRole)
+                if file_info:
+                    items[file_info.path] = child
+                stack.append(child)
+
+        # 删除条目（删除的目录已包含其所有子项）
+        for path in delta['removed']:
+            item = items.pop(path, None)
+            if item is None:
+                continue
+            parent = item.parent() or self.invisibleRootItem()
+            parent.removeChild(item)
+
+        # 修改条目，保留选择状态
+        for file_info in delta['modified']:
+            item = items.get(file_info.path)
+            if item is None:
+                continue
+            old_info = item.data(0, Qt.UserRole)
+            file_info.selected = old_info.selected
+            new_item = item_factory(file_info)
+            for column in range(1, 5):
+                item.setText(column, new_item.text(column))
+            item.setData(0, Qt.UserRole, file_info)
+            self.update_item_color(item, file_info)
+
+        # 新增条目，目录先于其子项插入
+        for file_info in sorted(delta['added'], key=file_order_key):
+            parent_path = file_info.path.rsplit('/', 1)[0] if '/' in file_info.path else ""
+            parent = items.get(parent_path, self.invisibleRootItem()) if parent_path else self.invisibleRootItem()
+            item = item_factory(file_info)
+
+            # 按"目录优先、名称排序"插入到合适位置
+            new_key = (not file_info.is_dir, file_info.path.lower())
+            index = parent.childCount()
+            for i in range(parent.childCount()):
+                sibling = parent.child(i).data(0, Qt.UserRole)
+                if sibling and (not sibling.is_dir, sibling.path.lower()) > new_key:
+                    index = i
+                    break
+            parent.insertChild(index, item)
+            items[file_info.path] = item
+            if not file_info.is_dir:
+                self.update_item_color(item, file_info)
+
     def get_file_icon(self, file_type):
         """获取文件类型对应的图标"""
         if file_type in self.file_icons:
@@ -631,9 +841,99 @@ class FileTreeWidget(QTreeWidget):
 class CodeDisplayWidget(QWidget):
     """用于显示带有行号的代码文件的自定义组件"""
 
+    # 高亮代码的CSS样式表
+    STYLE_SHEET = """
+        .code-highlight { font-size: 12px; font-family: Consolas, Monaco, 'Courier New', monospace; }
+        .code-highlight .linenos { 
+            color: #606366; 
+            background-color: #313335; 
+            padding: 0 8px; 
+            border-right: 1px solid #3c3f41;
+            user-select: none;
+            -webkit-user-select: none;
+            text-align: right;
+        }
+        .code-highlight .lineno { 
+            user-select: none;
+            -webkit-user-select: none;
+        }
+        .code-highlight pre { margin: 0; line-height: 140%; }
+        .code-highlight td.code { padding-left: 10px; width: 100%; }
+        .code-highlight { width: 100%; }
+        .highlight-skipped { color: #FFA500; background-color: #313335; padding: 4px 10px; }
+
+        /* 语法高亮样式增强 */
+        .code-highlight .hll { background-color: #49483e }
+        .code-highlight .c { color: #75715e } /* 注释 */
+        .code-highlight .err { color: #960050; background-color: #1e0010 } /* 错误 */
+        .code-highlight .k { color: #66d9ef } /* 关键字 */
+        .code-highlight .l { color: #ae81ff } /* 字面量 */
+        .code-highlight .n { color: #f8f8f2 } /* 名称 */
+        .code-highlight .o { color: #f92672 } /* 运算符 */
+        .code-highlight .p { color: #f8f8f2 } /* 标点符号 */
+        .code-highlight .cm { color: #75715e } /* 多行注释 */
+        .code-highlight .cp { color: #75715e } /* 预处理器 */
+        .code-highlight .c1 { color: #75715e } /* 单行注释 */
+        .code-highlight .cs { color: #75715e } /* 特殊注释 */
+        .code-highlight .gd { color: #f92672 } /* 常规删除 */
+        .code-highlight .ge { font-style: italic } /* 常规强调 */
+        .code-highlight .gi { color: #a6e22e } /* 常规插入 */
+        .code-highlight .gs { font-weight: bold } /* 常规强调 */
+        .code-highlight .kc { color: #66d9ef } /* 关键字常量 */
+        .code-highlight .kd { color: #66d9ef } /* 关键字声明 */
+        .code-highlight .kn { color: #f92672 } /* 关键字命名空间 */
+        .code-highlight .kp { color: #66d9ef } /* 关键字伪 */
+        .code-highlight .kr { color: #66d9ef } /* 关键字保留字 */
+        .code-highlight .kt { color: #66d9ef } /* 关键字类型 */
+        .code-highlight .ld { color: #e6db74 } /* 字面量日期 */
+        .code-highlight .m { color: #ae81ff } /* 字面量数字 */
+        .code-highlight .s { color: #e6db74 } /* 字面量字符串 */
+        .code-highlight .na { color: #a6e22e } /* 名称属性 */
+        .code-highlight .nb { color: #f8f8f2 } /* 名称内建 */
+        .code-highlight .nc { color: #a6e22e } /* 名称类 */
+        .code-highlight .nd { color: #a6e22e } /* 名称装饰器 */
+        .code-highlight .ni { color: #f8f8f2 } /* 名称实体 */
+        .code-highlight .ne { color: #a6e22e } /* 名称异常 */
+        .code-highlight .nf { color: #a6e22e } /* 名称函数 */
+        .code-highlight .nl { color: #f8f8f2 } /* 名称标签 */
+        .code-highlight .nn { color: #f8f8f2 } /* 名称命名空间 */
+        .code-highlight .nx { color: #a6e22e } /* 名称其他 */
+        .code-highlight .py { color: #f8f8f2 } /* 名称属性 */
+        .code-highlight .nt { color: #f92672 } /* 名称标签 */
+        .code-highlight .nv { color: #f8f8f2 } /* 名称变量 */
+        .code-highlight .ow { color: #f92672 } /* 运算符词 */
+        .code-highlight .w { color: #f8f8f2 } /* 文本空白 */
+        .code-highlight .mf { color: #ae81ff } /* 字面量数字浮点 */
+        .code-highlight .mh { color: #ae81ff } /* 字面量数字十六进制 */
+        .code-highlight .mi { color: #ae81ff } /* 字面量数字整数 */
+        .code-highlight .mo { color: #ae81ff } /* 字面量数字八进制 */
+        .code-highlight .sb { color: #e6db74 } /* 字面量字符串反引号 */
+        .code-highlight .sc { color: #e6db74 } /* 字面量字符串字符 */
+        .code-highlight .sd { color: #e6db74 } /* 字面量字符串文档 */
+        .code-highlight .s2 { color: #e6db74 } /* 字面量字符串双引号 */
+        .code-highlight .se { color: #ae81ff } /* 字面量字符串转义 */
+        .code-highlight .sh { color: #e6db74 } /* 字面量字符串引用符 */
+        .code-highlight .si { color: #e6db74 } /* 字面量字符串插值 */
+        .code-highlight .sx { color: #e6db74 } /* 字面量字符串其他 */
+        .code-highlight .sr { color: #e6db74 } /* 字面量字符串正则表达式 */
+        .code-highlight .s1 { color: #e6db74 } /* 字面量字符串单引号 */
+        .code-highlight .ss { color: #e6db74 } /* 字面量字符串符号 */
+        .code-highlight .bp { color: #f8f8f2 } /* 名称内建伪 */
+        .code-highlight .vc { color: #f8f8f2 } /* 名称变量类 */
+        .code-highlight .vg { color: #f8f8f2 } /* 名称变量全局 */
+        .code-highlight .vi { color: #f8f8f2 } /* 名称变量实例 */
+        .code-highlight .il { color: #ae81ff } /* 字面量数字整数长 */
+    """
+
+    # 超过该行数的文件分段高亮，滚动到接近底部时再追加后续的行
+    WINDOWED_LINES = 5000
+    WINDOW_LINES = 500
+
     def __init__(self, file_info, parent=None):
         super().__init__(parent)
         self.file_info = file_info
+        self.next_line = 0  # 分段高亮时下一段的起始行（从0开始）
+        self.total_lines = None  # 分段高亮时文件的总行数，未分段时为None
         self.setup_ui()
         self.highlight_code()
 
@@ -757,6 +1057,9 @@ class CodeDisplayWidget(QWidget):
         font.setStyleHint(QFont.Monospace)
         self.code_browser.setFont(font)
 
+        self.code_browser.document().setDefaultStyleSheet(self.STYLE_SHEET)
+        self.code_browser.verticalScrollBar().valueChanged.connect(self.on_scroll)
+
         code_layout.addWidget(self.code_browser)
 
         layout.addWidget(header_container)
@@ -766,120 +1069,44 @@ class CodeDisplayWidget(QWidget):
         self.copy_btn.clicked.connect(self.copy_content)
 
     def highlight_code(self):
-        """高亮显示代码"""
-        try:
-            # 尝试根据文件扩展名获取合适的词法分析器
-            lexer = lexers.get_lexer_for_filename(self.file_info.path, stripall=False)
-        except pygments.util.ClassNotFound:
-            # 如果找不到匹配的词法分析器，尝试根据文件类型获取
-            try:
-                if self.file_info.file_type and self.file_info.file_type != 'txt':
-                    lexer = lexers.get_lexer_by_name(self.file_info.file_type, stripall=False)
-                else:
-                    lexer = lexers.get_lexer_by_name('text', stripall=False)
-            except pygments.util.ClassNotFound:
-                lexer = lexers.get_lexer_by_name('text', stripall=False)
-
-        # 使用IDE风格的格式化器，并设置行号
-        formatter = HtmlFormatter(
-            style='monokai',
-            linenos='table',  # 表格样式的行号
-            linenostart=1,
-            linespans='line',
-            cssclass='code-highlight',
-            full=False
-        )
+        """高亮显示代码，文件未变化时使用缓存的结果；大文件只高亮第一段"""
+        self.total_lines = None
+        if self.file_info.line_count > self.WINDOWED_LINES and os.path.isfile(self.file_info.full_path):
+            self.next_line = 0
+            self.code_browser.clear()
+            self.load_next_window()
+            return
 
-        # 生成高亮代码
-        highlighted_code = pygments.highlight(self.file_info.content, lexer, formatter)
-
-        # 添加CSS样式表
-        css = """
-                        <style>
-                            .code-highlight { font-size: 12px; font-family: Consolas, Monaco, 'Courier New', monospace; }
-                            .code-highlight .linenos { 
-                                color: #606366; 
-                                background-color: #313335; 
-                                padding: 0 8px; 
-                                border-right: 1px solid #3c3f41;
-                                user-select: none;
-                                -webkit-user-select: none;
-                                text-align: right;
-                            }
-                            .code-highlight .lineno { 
-                                user-select: none;
-                                -webkit-user-select: none;
-                            }
-                            .code-highlight pre { margin: 0; line-height: 140%; }
-                            .code-highlight td.code { padding-left: 10px; width: 100%; }
-                            .code-highlight { width: 100%; }
-
-                            /* 语法高亮样式增强 */
-                            .code-highlight .hll { background-color: #49483e }
-                            .code-highlight .c { color: #75715e } /* 注释 */
-                            .code-highlight .err { color: #960050; background-color: #1e0010 } /* 错误 */
-                            .code-highlight .k { color: #66d9ef } /* 关键字 */
-                            .code-highlight .l { color: #ae81ff } /* 字面量 */
-                            .code-highlight .n { color: #f8f8f2 } /* 名称 */
-                            .code-highlight .o { color: #f92672 } /* 运算符 */
-                            .code-highlight .p { color: #f8f8f2 } /* 标点符号 */
-                            .code-highlight .cm { color: #75715e } /* 多行注释 */
-                            .code-highlight .cp { color: #75715e } /* 预处理器 */
-                            .code-highlight .c1 { color: #75715e } /* 单行注释 */
-                            .code-highlight .cs { color: #75715e } /* 特殊注释 */
-                            .code-highlight .gd { color: #f92672 } /* 常规删除 */
-                            .code-highlight .ge { font-style: italic } /* 常规强调 */
-                            .code-highlight .gi { color: #a6e22e } /* 常规插入 */
-                            .code-highlight .gs { font-weight: bold } /* 常规强调 */
-                            .code-highlight .kc { color: #66d9ef } /* 关键字常量 */
-                            .code-highlight .kd { color: #66d9ef } /* 关键字声明 */
-                            .code-highlight .kn { color: #f92672 } /* 关键字命名空间 */
-                            .code-highlight .kp { color: #66d9ef } /* 关键字伪 */
-                            .code-highlight .kr { color: #66d9ef } /* 关键字保留字 */
-                            .code-highlight .kt { color: #66d9ef } /* 关键字类型 */
-                            .code-highlight .ld { color: #e6db74 } /* 字面量日期 */
-                            .code-highlight .m { color: #ae81ff } /* 字面量数字 */
-                            .code-highlight .s { color: #e6db74 } /* 字面量字符串 */
-                            .code-highlight .na { color: #a6e22e } /* 名称属性 */
-                            .code-highlight .nb { color: #f8f8f2 } /* 名称内建 */
-                            .code-highlight .nc { color: #a6e22e } /* 名称类 */
-                            .code-highlight .nd { color: #a6e22e } /* 名称装饰器 */
-                            .code-highlight .ni { color: #f8f8f2 } /* 名称实体 */
-                            .code-highlight .ne { color: #a6e22e } /* 名称异常 */
-                            .code-highlight .nf { color: #a6e22e } /* 名称函数 */
-                            .code-highlight .nl { color: #f8f8f2 } /* 名称标签 */
-                            .code-highlight .nn { color: #f8f8f2 } /* 名称命名空间 */
-                            .code-highlight .nx { color: #a6e22e } /* 名称其他 */
-                            .code-highlight .py { color: #f8f8f2 } /* 名称属性 */
-                            .code-highlight .nt { color: #f92672 } /* 名称标签 */
-                            .code-highlight .nv { color: #f8f8f2 } /* 名称变量 */
-                            .code-highlight .ow { color: #f92672 } /* 运算符词 */
-                            .code-highlight .w { color: #f8f8f2 } /* 文本空白 */
-                            .code-highlight .mf { color: #ae81ff } /* 字面量数字浮点 */
-                            .code-highlight .mh { color: #ae81ff } /* 字面量数字十六进制 */
-                            .code-highlight .mi { color: #ae81ff } /* 字面量数字整数 */
-                            .code-highlight .mo { color: #ae81ff } /* 字面量数字八进制 */
-                            .code-highlight .sb { color: #e6db74 } /* 字面量字符串反引号 */
-                            .code-highlight .sc { color: #e6db74 } /* 字面量字符串字符 */
-                            .code-highlight .sd { color: #e6db74 } /* 字面量字符串文档 */
-                            .code-highlight .s2 { color: #e6db74 } /* 字面量字符串双引号 */
-                            .code-highlight .se { color: #ae81ff } /* 字面量字符串转义 */
-                            .code-highlight .sh { color: #e6db74 } /* 字面量字符串引用符 */
-                            .code-highlight .si { color: #e6db74 } /* 字面量字符串插值 */
-                            .code-highlight .sx { color: #e6db74 } /* 字面量字符串其他 */
-                            .code-highlight .sr { color: #e6db74 } /* 字面量字符串正则表达式 */
-                            .code-highlight .s1 { color: #e6db74 } /* 字面量字符串单引号 */
-                            .code-highlight .ss { color: #e6db74 } /* 字面量字符串符号 */
-                            .code-highlight .bp { color: #f8f8f2 } /* 名称内建伪 */
-                            .code-highlight .vc { color: #f8f8f2 } /* 名称变量类 */
-                            .code-highlight .vg { color: #f8f8f2 } /* 名称变量全局 */
-                            .code-highlight .vi { color: #f8f8f2 } /* 名称变量实例 */
-                            .code-highlight .il { color: #ae81ff } /* 字面量数字整数长 */
-                        </style>
-                        """
+        try:
+            highlighted_code = highlighter.highlight_file(
+                self.file_info.full_path, self.file_info.content)['highlighted_code']
+        except OSError:
+            highlighted_code = highlighter.highlight(self.file_info.content, self.file_info.path)['highlighted_code']
 
         # 设置HTML内容
-        self.code_browser.setHtml(css + highlighted_code)
+        self.code_browser.setHtml(highlighted_code)
+
+    def load_next_window(self):
+        """高亮并追加下一段行"""
+        if self.total_lines is not None and self.next_line >= self.total_lines:
+            return
+        try:
+            result = highlighter.highlight_window(self.file_info.full_path, self.next_line, self.WINDOW_LINES)
+        except OSError:
+            self.total_lines = self.next_line  # 文件已无法读取，不再继续获取
+            return
+
+        cursor = QTextCursor(self.code_browser.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(result['highlighted_code'])
+        self.total_lines = result['total_lines']
+        self.next_line = result['start'] + max(result['count'], 1)
+
+    def on_scroll(self, value):
+        """分段高亮时滚动到接近底部，追加下一段"""
+        scroll_bar = self.code_browser.verticalScrollBar()
+        if self.total_lines is not None and value >= scroll_bar.maximum() - scroll_bar.pageStep():
+            self.load_next_window()
 
     def copy_content(self):
         """复制当前文件内容到剪贴板"""
@@ -1011,6 +1238,8 @@ class FileContentDisplay(QScrollArea):
 class FileStructureGenerator(QMainWindow):
     """主应用窗口类"""
 
+    watch_signal = Signal()  # 监视的目录发生变化（从监视线程发出）
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("ProjecTxt")
@@ -1033,10 +1262,19 @@ class FileStructureGenerator(QMainWindow):
 
         # 当前工作线程
         self.worker = None
+        self.export_thread = None  # 正在运行的导出线程
 
         # 文件信息列表
         self.files_list = []
 
+        # 目录监视和增量刷新
+        self.loaded_folder = None  # 当前文件树对应的文件夹
+        self.watcher = None
+        self.refresh_worker = None
+        self.refresh_pending = False
+        self.ignore_rules = None  # 当前文件树使用的忽略规则
+        self.watch_signal.connect(self.refresh_structure)
+
         # 添加分割器性能优化相关变量
         self.splitter_moving = False
         self.splitter_timer = QTimer()
@@ -1243,8 +1481,15 @@ class FileStructureGenerator(QMainWindow):
         self.stop_btn.setVisible(False)
         self.stop_btn.clicked.connect(self.stop_processing)
 
+        # 忽略规则开关（.gitignore/.ignore 和内置规则，如node_modules、__pycache__）
+        self.ignore_check = QCheckBox("应用忽略规则")
+        self.ignore_check.setToolTip("跳过 .gitignore/.ignore 中的文件以及 node_modules、__pycache__ 等依赖和缓存目录")
+        self.ignore_check.setChecked(self.settings.value("use_ignore_rules", True, type=bool))
+        self.ignore_check.toggled.connect(lambda checked: self.settings.setValue("use_ignore_rules", checked))
+
         top_layout.addWidget(folder_label)
         top_layout.addWidget(self.path_edit, 1)
+        top_layout.addWidget(self.ignore_check)
         top_layout.addWidget(browse_btn)
         top_layout.addWidget(refresh_btn)
         top_layout.addWidget(self.stop_btn)
@@ -1430,6 +1675,11 @@ class FileStructureGenerator(QMainWindow):
         copy_action.setToolTip("将所选文件复制到剪贴板")
         copy_action.triggered.connect(self.copy_to_clipboard)
 
+        # 导出到文件按钮
+        export_action = QAction("导出到文件", self)
+        export_action.setToolTip("将所选文件导出到文本文件（.gz/.xz 扩展名时压缩）")
+        export_action.triggered.connect(self.export_to_file)
+
         # 复制结构按钮
         copy_structure_action = QAction("复制结构", self)
         copy_structure_action.setToolTip("仅复制文件结构到剪贴板")
@@ -1472,6 +1722,7 @@ class FileStructureGenerator(QMainWindow):
         toolbar.addAction(new_action)
         toolbar.addSeparator()
         toolbar.addAction(copy_action)
+        toolbar.addAction(export_action)
         toolbar.addSeparator()
         toolbar.addAction(copy_structure_action)
         toolbar.addSeparator()
@@ -1624,6 +1875,8 @@ class FileStructureGenerator(QMainWindow):
         # 如果有线程正在运行，停止它
         if self.worker and self.worker.isRunning():
             self.stop_processing()
+        self.stop_watching()
+        self.loaded_folder = None
 
         self.file_tree.clear()
         self.content_display.clear_contents()
@@ -1788,6 +2041,13 @@ class FileStructureGenerator(QMainWindow):
         # 添加到历史记录
         self.save_to_history(folder_path)
 
+        # 已加载的文件夹只刷新变化的部分
+        if (self.files_list and folder_path == self.loaded_folder and
+                self.ignore_check.isChecked() == (self.ignore_rules is not None)):
+            self.refresh_structure()
+            return
+        self.stop_watching()
+
         # 清空现有内容
         self.clear_all()
 
@@ -1798,9 +2058,9 @@ class FileStructureGenerator(QMainWindow):
         self.status_bar.showMessage("正在分析文件结构...", 0)
 
         # 创建工作线程
-        self.worker = WorkerThread(folder_path)
+        self.ignore_rules = IgnoreRules(folder_path) if self.ignore_check.isChecked() else None
+        self.worker = WorkerThread(folder_path, self.ignore_rules)
         self.worker.progress_signal.connect(self.update_progress)
-        self.worker.file_signal.connect(self.process_file)
         self.worker.finished_signal.connect(self.handle_result)
         self.worker.error_signal.connect(self.handle_error)
 
@@ -1814,15 +2074,11 @@ class FileStructureGenerator(QMainWindow):
             self.progress_bar.setValue(progress)
             self.status_bar.showMessage(f"处理文件 {current}/{total}...", 0)
 
-    def process_file(self, file_info):
-        """处理单个文件（在后台线程处理中）"""
-        # 在这里可以实时处理文件信息，如果需要的话
-        pass
-
     def handle_result(self, files_list):
         """处理生成结果"""
         # 保存文件列表
         self.files_list = files_list
+        self.loaded_folder = self.worker.folder_path if self.worker else None
 
         # 构建文件树
         self.build_file_tree(files_list)
@@ -1847,6 +2103,74 @@ class FileStructureGenerator(QMainWindow):
             5000
         )
 
+        # 监视文件夹变化
+        if self.loaded_folder:
+            self.start_watching(self.loaded_folder)
+
+    def start_watching(self, folder_path):
+        """监视文件夹，变化时增量刷新文件树"""
+        self.stop_watching()
+        # 回调在监视线程中执行，通过信号切换到界面线程
+        self.watcher = DirectoryWatcher(folder_path, lambda dirty_dirs: self.watch_signal.emit(),
+                                        ignore=self.is_ignored).start()
+
+    def is_ignored(self, rel_path, is_dir):
+        """判断相对路径是否被当前的忽略规则排除"""
+        return self.ignore_rules is not None and self.ignore_rules.is_ignored(rel_path, is_dir)
+
+    def stop_watching(self):
+        """停止监视文件夹"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def refresh_structure(self):
+        """增量刷新文件结构，只重新读取变化的文件"""
+        if not self.loaded_folder or (self.worker and self.worker.isRunning()):
+            return
+        if self.refresh_worker and self.refresh_worker.isRunning():
+            # 正在刷新时合并到下一次刷新
+            self.refresh_pending = True
+            return
+
+        self.refresh_pending = False
+        if self.ignore_rules and self.ignore_rules.files_changed():
+            # 忽略文件发生变化，重新加载规则
+            self.ignore_rules = IgnoreRules(self.loaded_folder)
+        self.refresh_worker = RefreshThread(self.loaded_folder, self.files_list, self.ignore_rules)
+        self.refresh_worker.delta_signal.connect(self.handle_delta)
+        self.refresh_worker.error_signal.connect(self.handle_error)
+        self.refresh_worker.finished.connect(self._after_refresh)
+        self.refresh_worker.start()
+
+    def _after_refresh(self):
+        """刷新线程结束后处理合并的刷新请求"""
+        if self.refresh_pending:
+            self.refresh_structure()
+
+    def handle_delta(self, files_list, delta):
+        """应用增量刷新结果"""
+        if delta_is_empty(delta):
+            self.status_bar.showMessage("文件没有变化", 2000)
+            return
+
+        self.files_list = files_list
+        self.file_tree.apply_delta(delta, self.create_tree_item)
+        self.update_file_types_combo()
+        self.update_stats()
+
+        # 当前预览的文件被修改时更新预览
+        preview = self.content_display.preview_code
+        if preview.isVisible():
+            modified = {f.path: f for f in delta['modified']}
+            if preview.file_info.path in delta['removed']:
+                self.content_display.clear_contents()
+            elif preview.file_info.path in modified:
+                self.content_display.preview_file(modified[preview.file_info.path])
+
+        changed = len(delta['added']) + len(delta['removed']) + len(delta['modified'])
+        self.status_bar.showMessage(f"文件已更新: {changed} 项变化", 3000)
+
     def update_file_types_combo(self):
         """根据实际文件类型更新下拉列表"""
         # 保存当前选择
@@ -2000,64 +2324,50 @@ class FileStructureGenerator(QMainWindow):
             sorted_files = sorted(files_list, key=lambda f: (not f.is_dir, f.path.lower()))
 
         for file_info in sorted_files:
-            if file_info.is_dir:
-                # 处理目录
-                parts = file_info.path.split('/')
-                dir_name = parts[-1]
-                parent_path = '/'.join(parts[:-1]) if len(parts) > 1 else ""
-
-                # 创建目录项
-                item = QTreeWidgetItem([dir_name, "目录", "", "", ""])
-                item.setData(0, Qt.ItemDataRole.UserRole, file_info)
+            parts = file_info.path.split('/')
+            parent_path = '/'.join(parts[:-1]) if len(parts) > 1 else ""
+            item = self.create_tree_item(file_info)
 
-                # 右对齐后面的列
-                for i in range(1, 5):
-                    item.setTextAlignment(i, Qt.AlignRight)
-
-                # 设置目录图标
-                item.setIcon(0, self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
-
-                # 添加到父目录或树的顶层
-                if parent_path and parent_path in dir_items:
-                    dir_items[parent_path].addChild(item)
-                else:
-                    self.file_tree.addTopLevelItem(item)
+            # 添加到父目录或树的顶层
+            if parent_path and parent_path in dir_items:
+                dir_items[parent_path].addChild(item)
+            else:
+                self.file_tree.addTopLevelItem(item)
 
+            if file_info.is_dir:
                 # 保存目录项引用
                 dir_items[file_info.path] = item
             else:
-                # 处理文件
-                parts = file_info.path.split('/')
-                file_name = parts[-1]
-                parent_path = '/'.join(parts[:-1]) if len(parts) > 1 else ""
-
-                # 创建文件项
-                size_str = self.format_size(file_info.size)
-                item = QTreeWidgetItem([
-                    file_name,
-                    file_info.file_type,
-                    size_str,
-                    str(file_info.line_count),
-                    str(file_info.char_count)
-                ])
-                item.setData(0, Qt.ItemDataRole.UserRole, file_info)
-
-                # 右对齐后面的列
-                for i in range(1, 5):
-                    item.setTextAlignment(i, Qt.AlignRight)
-
-                # 设置文件图标
-                item.setIcon(0, self.file_tree.get_file_icon(file_info.file_type))
-
-                # 添加到父目录或树的顶层
-                if parent_path and parent_path in dir_items:
-                    dir_items[parent_path].addChild(item)
-                else:
-                    self.file_tree.addTopLevelItem(item)
-
                 # 根据文件类型设置颜色
                 self.file_tree.update_item_color(item, file_info)
 
+    def create_tree_item(self, file_info):
+        """根据文件信息创建树节点"""
+        name = file_info.path.split('/')[-1]
+        if file_info.is_dir:
+            # 创建目录项
+            item = QTreeWidgetItem([name, "目录", "", "", ""])
+            # 设置目录图标
+            item.setIcon(0, self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
+        else:
+            # 创建文件项
+            size_str = self.format_size(file_info.size)
+            item = QTreeWidgetItem([
+                name,
+                file_info.file_type,
+                size_str,
+                str(file_info.line_count),
+                str(file_info.char_count)
+            ])
+            # 设置文件图标
+            item.setIcon(0, self.file_tree.get_file_icon(file_info.file_type))
+        item.setData(0, Qt.ItemDataRole.UserRole, file_info)
+
+        # 右对齐后面的列
+        for i in range(1, 5):
+            item.setTextAlignment(i, Qt.AlignRight)
+        return item
+
     def format_size(self, size_bytes):
         """格式化文件大小显示"""
         if size_bytes < 1024:
@@ -2084,26 +2394,89 @@ class FileStructureGenerator(QMainWindow):
             QMessageBox.warning(self, "警告", "请先选择要复制的文件（在文件树中点击文件名选择）")
             return
 
-        # 获取文件结构
-        structure_text = self.get_structure_text()
-        clipboard_text = f"文件结构:\n\n{structure_text}\n\n文件内容:\n\n"
+        def copied(result):
+            # 复制到剪贴板
+            clipboard = QApplication.clipboard()
+            clipboard.setText(result['text'])
+
+            # 显示复制成功的消息
+            QMessageBox.information(
+                self,
+                "复制成功",
+                f"已将{len(selected_files)}个文件的内容复制到剪贴板！\n"
+                f"总计 {sum(f.line_count for f in selected_files)} 行代码, "
+                f"{sum(f.char_count for f in selected_files)} 个字符。"
+            )
 
-        # 添加文件内容到剪贴板文本
-        for file_info in selected_files:
-            clipboard_text += f"--- {file_info.path} ({file_info.line_count}行) ---\n{file_info.content}\n\n"
+        # 在后台线程中由导出引擎从磁盘流式读取文件内容
+        self.start_export(ExportThread(self.get_structure_text(), selected_files), "正在读取文件内容...", copied)
 
-        # 复制到剪贴板
-        clipboard = QApplication.clipboard()
-        clipboard.setText(clipboard_text)
+    def start_export(self, thread, label, on_finished):
+        """
+        运行导出线程，进度对话框显示进度并可以取消
+        on_finished: 导出完成（未被取消）时以导出结果调用
+        """
+        if self.export_thread and self.export_thread.isRunning():
+            QMessageBox.warning(self, "警告", "正在导出，请等待当前导出完成")
+            return
 
-        # 显示复制成功的消息
-        QMessageBox.information(
-            self,
-            "复制成功",
-            f"已将{len(selected_files)}个文件的内容复制到剪贴板！\n"
-            f"总计 {sum(f.line_count for f in selected_files)} 行代码, "
-            f"{sum(f.char_count for f in selected_files)} 个字符。"
-        )
+        dialog = QProgressDialog(label, "取消", 0, len(thread.files), self)
+        dialog.setWindowTitle("导出")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(thread.stop)
+
+        def progress(done, total, chars):
+            dialog.setValue(done)
+            dialog.setLabelText(f"{label}\n{done}/{total} 个文件，{chars} 个字符")
+
+        def finished(result):
+            dialog.close()
+            if result['stopped']:
+                self.status_bar.showMessage("已取消导出", 3000)
+            else:
+                on_finished(result)
+
+        def failed(error_msg):
+            dialog.close()
+            QMessageBox.critical(self, "错误", f"导出失败: {error_msg}")
+
+        thread.progress_signal.connect(progress)
+        thread.finished_signal.connect(finished)
+        thread.error_signal.connect(failed)
+        self.export_thread = thread
+        thread.start()
+
+    def export_to_file(self):
+        """将所选文件导出到文件，文件名以 .gz/.xz 结尾时流式压缩"""
+        selected_files = self.file_tree.get_selected_files()
+
+        if not selected_files:
+            QMessageBox.warning(self, "警告", "请先选择要导出的文件（在文件树中点击文件名选择）")
+            return
+
+        default_name = f"{os.path.basename((self.loaded_folder or '').rstrip(os.sep)) or 'project'}.txt.gz"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出到文件", default_name, "文本文件 (*.txt *.txt.gz *.txt.xz);;所有文件 (*)")
+        if not file_path:
+            return
+        compression = next((name for name, suffix in EXPORT_COMPRESSIONS.items() if file_path.endswith(suffix)), None)
+
+        def exported(result):
+            self.status_bar.showMessage(f"已导出到 {file_path}", 5000)
+            QMessageBox.information(
+                self,
+                "导出成功",
+                f"已将{result['files']}个文件的内容导出到:\n{file_path}\n"
+                f"{result['chars']} 个字符，文件大小 {self.format_size(result['bytes'])}，"
+                f"用时 {result['seconds']:.1f} 秒（{result['throughput'] / 1024 / 1024:.1f} M字符/秒）。"
+            )
+
+        # 在后台线程中流式写出，进度对话框显示进度并可以取消
+        thread = ExportThread(self.get_structure_text(), selected_files, file_path, compression)
+        self.start_export(thread, f"正在导出到 {file_path}...", exported)
 
     def copy_structure_to_clipboard(self):
         """只复制文件结构到剪贴板"""
@@ -2353,6 +2726,9 @@ class FileStructureGenerator(QMainWindow):
 
 
 if __name__ == "__main__":
+    # 高亮工作进程以 spawn 方式启动，打包后的程序需要由此进入工作进程
+    multiprocessing.freeze_support()
+
     # 确保Qt使用高DPI缩放
     QApplication.setHighDpiScaleFactorRoundingPolicy(
         Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
@@ -2369,4 +2745,6 @@ if __name__ == "__main__":
     window = FileStructureGenerator()
     window.show()
 
-    sys.exit(app.exec())
\ No newline at end of file
+    exit_code = app.exec()
+    highlighter.pool.close()
+    sys.exit(exit_code)
\ No newline at end of file